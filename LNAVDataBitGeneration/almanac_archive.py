@@ -0,0 +1,187 @@
+import datetime
+import os
+import re
+
+import compressed
+import numpy as np
+from bit_generator import xPI
+from gps_time import GPS_EPOCH, SECS_PER_WEEK, gps_seconds
+from records import AlmanacEntry
+
+
+NUM_PRNS = 32
+INT_FIELDS = ("SVID", "URA", "health", "config")
+FLOAT_FIELDS = ("e", "delta_i", "OmegaDot", "sqrtA", "Omega0", "omega", "M0", "Af0", "Af1")
+
+SEM_TOKENS_PER_SV = 14          ### PRN, SVN, URA, 9 orbit/clock values, health, config
+YUMA_VALUES_PER_SV = 13         ### ID, health, e, toa, i, OmegaDot, sqrtA, Omega0, omega, M0, Af0, Af1, week
+YUMA_VALUE = re.compile(r":\s*(\S+)")
+YUMA_CONFIG = 9                 ### YUMA has no SV configuration, A-S on and block II - IIF is assumed
+SEM_I0 = 0.3                    ### SEM inclinations are offsets from 0.3 semicircles
+
+
+def parse_sem(text):
+    """Parse SEM almanac text without relying on its blank lines.
+
+    Returns (WNa, toa, prns, ints, floats) where ints/floats are (SVs, len(INT_FIELDS/FLOAT_FIELDS)) arrays.
+    """
+    lines = text.split("\n", 2)
+    week, toa = lines[1].split()[:2]
+    tokens = np.array(lines[2].split(), dtype=np.float64).reshape(-1, SEM_TOKENS_PER_SV)
+    prns = tokens[:, 0].astype(np.int64)
+    ints = tokens[:, [1, 2, 12, 13]].astype(np.int64)
+    return int(week), int(toa), prns, ints, tokens[:, 3:12]
+
+
+def parse_yuma(text):
+    ### Same as parse_sem, with YUMA's radians converted to SEM's semicircles
+    values = np.array(YUMA_VALUE.findall(text), dtype=np.float64).reshape(-1, YUMA_VALUES_PER_SV)
+    prns = values[:, 0].astype(np.int64)
+    ints = np.zeros((len(values), len(INT_FIELDS)), dtype=np.int64)
+    ints[:, 2] = values[:, 1]
+    ints[:, 3] = YUMA_CONFIG
+    floats = np.stack([
+        values[:, 2],
+        values[:, 4] / xPI - SEM_I0,
+        values[:, 5] / xPI,
+        values[:, 6],
+        values[:, 7] / xPI,
+        values[:, 8] / xPI,
+        values[:, 9] / xPI,
+        values[:, 10],
+        values[:, 11],
+    ], axis=1)
+    return int(values[0, 12]), int(values[0, 3]), prns, ints, floats
+
+
+def parse_almanac_file(path):
+    with compressed.open_text(path) as file:
+        text = file.read()
+    return parse_yuma(text) if "ID:" in text else parse_sem(text)
+
+
+def full_week(week, reference_week):
+    ### Almanac weeks are transmitted modulo 1024, take the one closest to reference_week
+    return week + 1024 * round((reference_week - week) / 1024)
+
+
+class AlmanacArchive:
+    """Almanacs of many SEM/YUMA files, stored as struct-of-arrays sorted by (WNa, toa).
+
+    Row i holds one almanac: week[i] (full GPS week), toa[i], and per field a (almanacs, 32) array indexed by PRN - 1,
+    present[i] tells which PRNs the almanac has. at(time) returns the almanac whose reference time is closest to
+    time, in O(log n), in the format readSemAlmanac returns.
+    """
+
+    def __init__(self, week, toa, present, ints, floats, sources):
+        order = np.lexsort((toa, week))
+        self.week = np.asarray(week, dtype=np.int64)[order]
+        self.toa = np.asarray(toa, dtype=np.int64)[order]
+        self.present = np.asarray(present, dtype=bool)[order]
+        self.ints = np.asarray(ints, dtype=np.int64)[order]             ### (almanacs, 32, len(INT_FIELDS))
+        self.floats = np.asarray(floats, dtype=np.float64)[order]       ### (almanacs, 32, len(FLOAT_FIELDS))
+        self.sources = [sources[i] for i in order]
+        self.reference = self.week * SECS_PER_WEEK + self.toa
+
+
+    @classmethod
+    def from_paths(cls, paths, reference_time=None):
+        """Ingest SEM and YUMA files, directories are searched recursively. Files that can't be parsed are skipped.
+
+        Almanac weeks are resolved to full GPS weeks around reference_time (default: now). The same (WNa, toa)
+        found in several files is only kept once.
+        """
+        reference_time = reference_time or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        reference_week = int(gps_seconds(reference_time) // SECS_PER_WEEK)
+
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for directory, _, names in sorted(os.walk(path)):
+                    files += [os.path.join(directory, name) for name in sorted(names)]
+            else:
+                files.append(path)
+
+        weeks, toas, present, ints, floats, sources = [], [], [], [], [], []
+        seen = set()
+        for fname in files:
+            try:
+                week, toa, prns, sv_ints, sv_floats = parse_almanac_file(fname)
+            except (ValueError, IndexError, UnicodeDecodeError, EOFError, OSError):     ### OSError/EOFError: corrupt compressed file
+                continue
+            week = full_week(week, reference_week)
+            valid = (prns >= 1) & (prns <= NUM_PRNS)
+            if (week, toa) in seen or not valid.any():
+                continue
+            seen.add((week, toa))
+
+            rows = prns[valid] - 1
+            present.append(np.zeros(NUM_PRNS, dtype=bool))
+            present[-1][rows] = True
+            ints.append(np.zeros((NUM_PRNS, len(INT_FIELDS)), dtype=np.int64))
+            ints[-1][rows] = sv_ints[valid]
+            floats.append(np.zeros((NUM_PRNS, len(FLOAT_FIELDS)), dtype=np.float64))
+            floats[-1][rows] = sv_floats[valid]
+            weeks.append(week)
+            toas.append(toa)
+            sources.append(fname)
+
+        if not weeks:
+            raise ValueError(f"No SEM or YUMA almanac found in {paths}")
+        return cls(weeks, toas, present, ints, floats, sources)
+
+
+    @classmethod
+    def load(cls, fname):
+        ### Archive written by save(), no almanac text is read again
+        with np.load(fname) as data:
+            return cls(data["week"], data["toa"], data["present"], data["ints"], data["floats"], data["sources"].tolist())
+
+
+    @classmethod
+    def open(cls, path, reference_time=None):
+        ### An .npz archive written by save(), otherwise a directory/file of SEM and YUMA almanacs
+        if path.endswith(".npz"):
+            return cls.load(path)
+        return cls.from_paths([path], reference_time)
+
+
+    def save(self, fname):
+        np.savez(fname, week=self.week, toa=self.toa, present=self.present, ints=self.ints, floats=self.floats,
+                 sources=np.array(self.sources))
+
+
+    def __len__(self):
+        return len(self.week)
+
+
+    def index(self, time):
+        ### Row of the almanac whose reference time (WNa, toa) is the closest to time
+        t = gps_seconds(time)
+        i = int(np.searchsorted(self.reference, t))
+        if i == len(self.reference) or (i > 0 and t - self.reference[i - 1] <= self.reference[i] - t):
+            i -= 1
+        return i
+
+
+    def almanac(self, i):
+        ### Row i in the format readSemAlmanac returns
+        prns = np.flatnonzero(self.present[i]) + 1
+        almanac = {
+            "num_svs"   :   len(prns),
+            "WNa"       :   int(self.week[i]) % 1024,
+            "toa"       :   int(self.toa[i]),
+        }
+        ints = self.ints[i].tolist()
+        floats = self.floats[i].tolist()
+        for prn in prns.tolist():
+            almanac["G%02d" % prn] = AlmanacEntry(id=prn, **dict(zip(INT_FIELDS, ints[prn - 1])), **dict(zip(FLOAT_FIELDS, floats[prn - 1])))
+        return almanac
+
+
+    def at(self, time):
+        return self.almanac(self.index(time))
+
+
+    def reference_time(self, i):
+        return GPS_EPOCH + datetime.timedelta(seconds=int(self.reference[i]))
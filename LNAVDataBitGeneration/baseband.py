@@ -0,0 +1,142 @@
+import argparse
+import datetime
+import itertools
+import math
+import time
+
+import numpy as np
+from gps_time import GPS_EPOCH, gps_seconds
+from nav_message import NavMessage
+from profiling import PROFILER
+from streaming import iter_subframes
+
+
+### L1 C/A signal structure (IS-GPS-200, 3.2.1 and 3.3.2)
+CHIP_RATE = 1023000             ### chips/s
+CODE_LENGTH = 1023              ### chips, one code epoch lasts 1 ms
+BIT_RATE = 50                   ### bps
+EPOCHS_PER_BIT = 20             ### C/A code epochs per navigation bit
+EPOCH_RATE = CHIP_RATE // CODE_LENGTH
+CHUNK_SAMPLES = 1 << 24         ### Samples rendered at once, bounds the memory a file of any length takes
+FRAME_SECONDS = 30
+SUBFRAMES_PER_MASTER_FRAME = 125
+
+### G1 = 1 + x^3 + x^10, G2 = 1 + x^2 + x^3 + x^6 + x^8 + x^9 + x^10, stages numbered from 1 as in IS-GPS-200
+G1_FEEDBACK = (3, 10)
+G2_FEEDBACK = (2, 3, 6, 8, 9, 10)
+
+### G2 stages added together (code phase selection) per PRN, IS-GPS-200 Table 3-Ia
+G2_TAPS = {
+     1: (2, 6),   2: (3, 7),   3: (4, 8),   4: (5, 9),   5: (1, 9),   6: (2, 10),  7: (1, 8),   8: (2, 9),
+     9: (3, 10), 10: (2, 3),  11: (3, 4),  12: (5, 6),  13: (6, 7),  14: (7, 8),  15: (8, 9),  16: (9, 10),
+    17: (1, 4),  18: (2, 5),  19: (3, 6),  20: (4, 7),  21: (5, 8),  22: (6, 9),  23: (1, 3),  24: (4, 6),
+    25: (5, 7),  26: (6, 8),  27: (7, 9),  28: (8, 10), 29: (1, 6),  30: (2, 7),  31: (3, 8),  32: (4, 9),
+}
+
+code_cache = {}
+
+
+def lfsr(feedback, taps):
+    ### One period (1023 chips, 0/1) of a 10 stage shift register starting from all ones, output = sum of taps
+    stages = [1] * 10
+    chips = np.zeros(CODE_LENGTH, dtype=np.uint8)
+    for i in range(CODE_LENGTH):
+        chips[i] = sum(stages[tap - 1] for tap in taps) & 1
+        stages = [sum(stages[stage - 1] for stage in feedback) & 1] + stages[:-1]
+    return chips
+
+
+def ca_code(prn):
+    ### The 1023 chips of prn's C/A code as int8 NRZ (see nrz)
+    if prn not in code_cache:
+        if prn not in G2_TAPS:
+            raise ValueError(f"No C/A code for PRN {prn}, 1 - 32 are defined")
+        chips = lfsr(G1_FEEDBACK, (10,)) ^ lfsr(G2_FEEDBACK, G2_TAPS[prn])
+        code_cache[prn] = nrz(chips)
+    return code_cache[prn]
+
+
+def nrz(bits):
+    ### 0/1 bits -> int8 NRZ symbols, logic 0 -> +1 and logic 1 -> -1, so the modulo 2 sum of data and code chips is
+    ### the product of their symbols
+    return (1 - 2 * np.asarray(bits, dtype=np.int8)).astype(np.int8)
+
+
+def epoch_symbols(nav_message):
+    ### NRZ symbol of every 1 ms C/A code epoch of the stream, each bit repeated over its 20 epochs
+    return np.repeat(nrz(nav_message.bits()), EPOCHS_PER_BIT)
+
+
+def epoch_samples(prn, sample_rate):
+    ### The samples of one code epoch of prn's C/A code at sample_rate, the same for every epoch
+    if sample_rate % EPOCH_RATE:
+        raise ValueError(f"The sample rate ({sample_rate} Hz) has to be a multiple of {EPOCH_RATE} Hz, so every 1 ms code epoch is sampled the same way")
+    samples_per_epoch = sample_rate // EPOCH_RATE
+    chips = np.arange(samples_per_epoch, dtype=np.int64) * CHIP_RATE // sample_rate
+    return ca_code(prn)[chips]
+
+
+def num_samples(nav_message, sample_rate=None):
+    epochs = len(nav_message) * EPOCHS_PER_BIT
+    return epochs if not sample_rate else epochs * (sample_rate // EPOCH_RATE)
+
+
+def broadcast_message(rinex_file, alm_file, prn, time, master_frames=1, message="No message sent"):
+    ### NavMessage of the master_frames * 25 frames prn transmits from the first frame boundary at or after time, taken
+    ### from iter_subframes: the TOW counts on and the ephemeris changes as new ones are uploaded, as on a real signal
+    start = GPS_EPOCH + datetime.timedelta(seconds=math.ceil(gps_seconds(time) / FRAME_SECONDS) * FRAME_SECONDS)
+    subframes = itertools.islice(iter_subframes(rinex_file, alm_file, prn, start, message=message), master_frames * SUBFRAMES_PER_MASTER_FRAME)
+    return NavMessage([words for _, _, _, words in subframes])
+
+
+def write_baseband(fname, nav_message, prn, sample_rate=None, chunk=CHUNK_SAMPLES):
+    """Write nav_message as int8 baseband samples to a memory mapped .npy file, returns the number of samples.
+
+    Without sample_rate that's one NRZ symbol per C/A code epoch (1 kHz). With it, the symbols modulate prn's C/A code
+    sampled at sample_rate Hz (a multiple of 1 kHz): a code epoch's samples are computed once and every epoch is that
+    row times its symbol, written chunk epochs at a time. Sample 0 is the start of the first bit.
+    """
+    symbols = epoch_symbols(nav_message)
+    with PROFILER.stage("write"):
+        if not sample_rate:
+            samples = np.lib.format.open_memmap(fname, mode="w+", dtype=np.int8, shape=symbols.shape)
+            samples[:] = symbols
+        else:
+            code = epoch_samples(prn, sample_rate)
+            samples = np.lib.format.open_memmap(fname, mode="w+", dtype=np.int8, shape=(symbols.size * code.size,))
+            epochs = samples.reshape(symbols.size, code.size)
+            step = max(1, chunk // code.size)
+            for start in range(0, symbols.size, step):
+                np.multiply(symbols[start:start + step, None], code, out=epochs[start:start + step])
+        samples.flush()
+        PROFILER.count("bytes_written", samples.nbytes)
+    return samples.size
+
+
+def read_baseband(fname):
+    ### Samples of a file written by write_baseband, memory mapped read only
+    return np.load(fname, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the navigation messages of GPS satellites as int8 baseband samples (NRZ symbols per C/A code epoch, or C/A code modulated at a sample rate), one memory mapped .npy file per PRN")
+    parser.add_argument("-r", "--rinex_path", help="Path of the RINEX file", type=str, required=True)
+    parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file", type=str, required=True)
+    parser.add_argument("-t", "--time", help="YYYY-MM-DDTHH:MM:SS", type=str, required=True)
+    parser.add_argument("-p", "--prns", help="PRNs to render (default: every PRN with a valid ephemeris)", type=int, nargs="+", default=None)
+    parser.add_argument("-m", "--message", help="Subframe 4 page 17 message (optional)", type=str, default="No Message")
+    parser.add_argument("--sample-rate", help="Samples/s of the C/A code modulated output, a multiple of 1000 (default: one NRZ symbol per 1 ms code epoch)", type=int, default=None)
+    parser.add_argument("--master-frames", help="12.5 min master frames (25 frames) to render from the first frame boundary at or after --time (default=1)", type=int, default=1)
+    parser.add_argument("-f", "--file_name", help="Output files are '<file_name> G05.npy', ...(default=Baseband)", type=str, default="Baseband")
+    args = parser.parse_args()
+
+    from constellation import ConstellationGenerator
+    t0 = time.perf_counter()
+    start = datetime.datetime.strptime(args.time, "%Y-%m-%dT%H:%M:%S")
+    constellation = ConstellationGenerator(args.rinex_path, args.almanac, start)
+    prns = constellation.prns if args.prns is None else args.prns
+    total = 0
+    for prn in prns:
+        nav_message = broadcast_message(constellation.store, constellation.alm, prn, start, args.master_frames, args.message)
+        total += write_baseband(f"{args.file_name} G{prn:02d}.npy", nav_message, prn, args.sample_rate)
+    print(f"{len(prns)} PRNs, {total} samples in {time.perf_counter() - t0:.2f} s")
@@ -0,0 +1,103 @@
+### Ingesting a synthetic archive of SEM and YUMA almanacs (the example almanac re-dated every day, every other
+### one written as YUMA) against reading every file with read_sem_almanac, lookups by time and reloading the archive
+### from .npz. Also checks the archive returns exactly what read_sem_almanac does for the SEM files.
+### Run from anywhere: python benchmarks/bench_almanac_archive.py
+import datetime
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+from almanac_archive import SEM_I0, AlmanacArchive
+from bit_generator import read_sem_almanac, xPI
+from gps_time import GPS_EPOCH, SECS_PER_WEEK
+
+
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+YUMA_RECORD = """******** Week {week} almanac for PRN-{id:02d} ********
+ID:                         {id:02d}
+Health:                     {health:03d}
+Eccentricity:               {e:.10E}
+Time of Applicability(s):  {toa:.4f}
+Orbital Inclination(rad):   {i:.10f}
+Rate of Right Ascen(r/s):  {OmegaDot:.10E}
+SQRT(A)  (m 1/2):           {sqrtA:.6f}
+Right Ascen at Week(rad):   {Omega0:.10E}
+Argument of Perigee(rad):   {omega:.9f}
+Mean Anom(rad):             {M0:.10E}
+Af0(s):                     {Af0:.10E}
+Af1(s/s):                  {Af1:.10E}
+week:                        {week}
+
+"""
+
+
+def write_archive(directory, count, first_week=2163):
+    with open(ALM_FILE) as file:
+        lines = file.read().split("\n")
+    alm = read_sem_almanac(ALM_FILE)
+    svs = [sv for sv in alm if sv.startswith("G")]
+
+    for k in range(count):
+        seconds = first_week * SECS_PER_WEEK + k * 86400
+        week, toa = divmod(seconds, SECS_PER_WEEK)
+        toa -= toa % 4096
+        if k % 2 == 0:
+            lines[1] = f" {week % 1024:03d} {toa}"
+            with open(os.path.join(directory, f"almanac_{k:05d}.al3"), "w") as file:
+                file.write("\n".join(lines))
+        else:
+            with open(os.path.join(directory, f"almanac_{k:05d}.alm"), "w") as file:
+                for sv in svs:
+                    a = alm[sv]
+                    file.write(YUMA_RECORD.format(week=week % 1024, toa=toa, id=a["id"], health=a["health"], e=a["e"],
+                                                  i=(a["delta_i"] + SEM_I0) * xPI, OmegaDot=a["OmegaDot"] * xPI,
+                                                  sqrtA=a["sqrtA"], Omega0=a["Omega0"] * xPI, omega=a["omega"] * xPI,
+                                                  M0=a["M0"] * xPI, Af0=a["Af0"], Af1=a["Af1"]))
+
+
+def bench(count=2000):
+    reference_time = GPS_EPOCH + datetime.timedelta(weeks=2163 + count // 14)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_archive(tmp, count)
+        sem_files = sorted(os.path.join(tmp, name) for name in os.listdir(tmp) if name.endswith(".al3"))
+
+        t0 = time.perf_counter()
+        legacy = [read_sem_almanac(fname) for fname in sem_files]
+        legacy_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        archive = AlmanacArchive.from_paths([tmp], reference_time)
+        ingest_time = time.perf_counter() - t0
+
+        for fname, alm in zip(sem_files, legacy):
+            i = archive.sources.index(fname)
+            assert archive.almanac(i) == alm
+        yuma = archive.almanac(1)
+        sem = archive.almanac(0)
+        assert all(np.isclose(yuma["G05"][key], sem["G05"][key], rtol=1e-8, atol=1e-15) for key in ("e", "delta_i", "OmegaDot", "M0"))
+
+        times = [reference_time + datetime.timedelta(hours=h) for h in np.random.default_rng(0).uniform(-5e4, 5e4, 1000)]
+        lookup_time = min(timeit.repeat(lambda: [archive.index(t) for t in times], number=1, repeat=5)) / len(times)
+        at_time = min(timeit.repeat(lambda: archive.at(times[0]), number=100, repeat=5)) / 100
+
+        fname = os.path.join(tmp, "archive.npz")
+        archive.save(fname)
+        load_time = min(timeit.repeat(lambda: AlmanacArchive.load(fname), number=1, repeat=5))
+
+    return {"almanacs": len(archive), "sem_files": len(sem_files), "legacy": legacy_time, "ingest": ingest_time,
+            "lookup": lookup_time, "at": at_time, "load": load_time}
+
+
+if __name__ == "__main__":
+    result = bench()
+    print(f"{result['almanacs']} almanacs: ingest {result['ingest'] * 1e3:.0f} ms (read_sem_almanac on the {result['sem_files']} SEM files "
+          f"alone {result['legacy'] * 1e3:.0f} ms) | lookup {result['lookup'] * 1e6:.1f} us | at() {result['at'] * 1e6:.0f} us | "
+          f"reload .npz {result['load'] * 1e3:.1f} ms")
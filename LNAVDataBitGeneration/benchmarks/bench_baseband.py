@@ -0,0 +1,94 @@
+### Rendering navigation messages for a signal generator: baseband.write_baseband against the Python glue it replaces
+### (0/1 list -> +-1 list, each bit repeated over its 20 code epochs, chip by chip C/A modulation), for a 12.5 min,
+### 32 PRN scenario at one symbol per code epoch and for one 30 s frame of C/A code at 2.046 MHz. The glue's
+### modulation is timed on 20 ms and scaled. Also checks the files hold the samples the glue computes, and that a
+### span of several master frames (baseband.broadcast_message) keeps counting the TOW with valid parity.
+### Run from anywhere: python benchmarks/bench_baseband.py
+import datetime
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import baseband
+import decoder
+from constellation import ConstellationGenerator
+from nav_message import NavMessage
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+PRNS = 32
+SAMPLE_RATE = 2046000
+GLUE_MS = 20
+SPAN_MASTER_FRAMES = 10              ### 2 h 5 min, longer than the 2 h between ephemeris uploads
+
+
+def glue_symbols(bits):
+    symbols = [1 if bit == 0 else -1 for bit in bits]
+    return [symbol for symbol in symbols for _ in range(baseband.EPOCHS_PER_BIT)]
+
+
+def glue_modulate(symbols, code, sample_rate, count):
+    ### The first count samples, one at a time
+    samples = []
+    for k in range(count):
+        chip = k * baseband.CHIP_RATE // sample_rate
+        samples.append(symbols[chip // baseband.CODE_LENGTH] * int(code[chip % baseband.CODE_LENGTH]))
+    return samples
+
+
+def bench():
+    constellation = ConstellationGenerator(RINEX_FILE, ALM_FILE, TIME)
+    messages = {prn: baseband.broadcast_message(constellation.store, constellation.alm, prn, TIME, message="No Message")
+                for prn in constellation.prns}
+    ### The example has fewer PRNs with an ephemeris, their messages are reused for the rest of the 32
+    scenario = [(prn, messages[constellation.prns[i % len(constellation.prns)]]) for i, prn in enumerate(range(1, PRNS + 1))]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        glue = {prn: glue_symbols(nav_message.to_list()) for prn, nav_message in scenario}
+        results["glue_symbols"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for prn, nav_message in scenario:
+            baseband.write_baseband(os.path.join(tmp, f"G{prn:02d}.npy"), nav_message, prn)
+        results["symbols"] = time.perf_counter() - t0
+        for prn, _ in scenario:
+            assert np.array_equal(baseband.read_baseband(os.path.join(tmp, f"G{prn:02d}.npy")), glue[prn])
+
+        prn, nav_message = scenario[4]
+        frame = NavMessage(nav_message.words[:1])
+        count = GLUE_MS * SAMPLE_RATE // 1000
+        t0 = time.perf_counter()
+        reference = glue_modulate(glue[prn], baseband.ca_code(prn), SAMPLE_RATE, count)
+        results["glue_frame"] = (time.perf_counter() - t0) * baseband.num_samples(frame, SAMPLE_RATE) / count
+
+        fname = os.path.join(tmp, "frame.npy")
+        t0 = time.perf_counter()
+        samples = baseband.write_baseband(fname, frame, prn, SAMPLE_RATE)
+        results["frame"] = time.perf_counter() - t0
+        results["frame_samples"] = samples
+        assert np.array_equal(baseband.read_baseband(fname)[:count], reference)
+
+    span = baseband.broadcast_message(constellation.store, constellation.alm, constellation.prns[0], TIME, SPAN_MASTER_FRAMES)
+    decoded = decoder.decode(span.words.reshape(-1, 10))
+    assert decoded["parity_ok"].all() and np.all(np.diff(decoded["TOW"].astype(np.int64)) == 1)
+    assert len(np.unique(decoded["subframe2"]["IODE"])) > 1             ### Spans an ephemeris upload
+    return results
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    t = bench()
+    print(f"12.5 min x {PRNS} PRNs, 1 symbol per code epoch: glue {t['glue_symbols']:.2f} s | write_baseband {t['symbols']:.3f} s")
+    print(f"30 s frame at {SAMPLE_RATE / 1e6:.3f} MHz ({t['frame_samples'] / 1e6:.0f} M samples): glue ~{t['glue_frame']:.0f} s (scaled from {GLUE_MS} ms) | "
+          f"write_baseband {t['frame']:.3f} s ({t['frame_samples'] / t['frame'] / 1e6:.0f} M samples/s)")
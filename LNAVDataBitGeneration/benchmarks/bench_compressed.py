@@ -0,0 +1,99 @@
+### Parsing gzip, bzip2 and compress (.Z) RINEX navigation files: streamed through compressed.open_text (and with the
+### decompression on a background thread) against decompressing to a temporary file first and parsing that, for the
+### example file and for 8 days of records. Also checks every way returns the records of the uncompressed file.
+### .Z files need the compress command or the ncompress package to be written, they're skipped otherwise.
+### Run from anywhere: python benchmarks/bench_compressed.py
+import bz2
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import compressed
+import rinex_reader
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+DAYS = 8
+
+
+def lzw_compress(data):
+    if shutil.which("compress"):
+        return subprocess.run(["compress", "-c"], input=data, capture_output=True, check=True).stdout
+    try:
+        import ncompress
+    except ImportError:
+        return None
+    return ncompress.compress(data)
+
+
+COMPRESSORS = {
+    "gz"    :   gzip.compress,
+    "bz2"   :   bz2.compress,
+    "Z"     :   lzw_compress,
+}
+
+
+def example_text(days):
+    ### The example file with its records repeated days times
+    with open(RINEX_FILE, "rb") as file:
+        text = file.read()
+    end = text.index(b"END OF HEADER")
+    end = text.index(b"\n", end) + 1
+    return text[:end] + text[end:] * days
+
+
+def decompress_then_parse(path, tmp):
+    fname = os.path.join(tmp, "decompressed.rnx")
+    with compressed.open_binary(path) as source, open(fname, "wb") as target:
+        target.write(source.read())
+    return rinex_reader.read_gps_nav(fname)
+
+
+def bench(days, repeat=5):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        text = example_text(days)
+        plain = os.path.join(tmp, "plain.rnx")
+        with open(plain, "wb") as file:
+            file.write(text)
+        expected = rinex_reader.read_gps_nav(plain)
+        results["plain"] = {"parse": min(timeit.repeat(lambda: rinex_reader.read_gps_nav(plain), number=1, repeat=repeat))}
+
+        for extension, compress in COMPRESSORS.items():
+            data = compress(text)
+            if data is None:
+                continue
+            path = os.path.join(tmp, f"nav.rnx.{extension}")
+            with open(path, "wb") as file:
+                file.write(data)
+            ways = {
+                "decompress_then_parse": lambda: decompress_then_parse(path, tmp),
+                "stream": lambda: rinex_reader.read_gps_nav(path),
+                "stream_thread": lambda: list(rinex_reader.iter_gps_nav(compressed.open_text(path, background=True))),
+            }
+            results[extension] = {"ratio": len(text) / len(data)}
+            for name, fn in ways.items():
+                assert fn() == expected, (extension, name)
+                results[extension][name] = min(timeit.repeat(fn, number=1, repeat=repeat))
+    return len(text), results
+
+
+if __name__ == "__main__":
+    for days in (1, DAYS):
+        size, results = bench(days)
+        print(f"{days} day(s), {size / 1e6:.2f} MB: plain parse {results['plain']['parse'] * 1e3:.1f} ms")
+        for extension in COMPRESSORS:
+            if extension not in results:
+                print(f"  .{extension:3s}: skipped, no compress command or ncompress package")
+                continue
+            t = results[extension]
+            print(f"  .{extension:3s} (x{t['ratio']:.1f}): decompress then parse {t['decompress_then_parse'] * 1e3:7.1f} ms | "
+                  f"streamed {t['stream'] * 1e3:7.1f} ms | streamed, background thread {t['stream_thread'] * 1e3:7.1f} ms")
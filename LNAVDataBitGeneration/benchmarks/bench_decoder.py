@@ -0,0 +1,77 @@
+### Decoding and parity checking a day of every PRN's stream (the master frame of each PRN repeated 115 times),
+### against a per-bit reference check, plus the preamble search on an unaligned bit stream.
+### Run from anywhere: python benchmarks/bench_decoder.py
+import datetime
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import decoder
+from constellation import ConstellationGenerator
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+MASTER_FRAMES_PER_DAY = 115
+
+
+def reference_parity_errors(bits):
+    ### Per bit check of IS-GPS-200 Table 20-XIV, the way a receiver would do it
+    from parity import PARITY_INDICES
+    errors = 0
+    D29_star = D30_star = 0
+    for start in range(0, len(bits), 30):
+        D = bits[start:start + 30]
+        d = [D[i] ^ D30_star for i in range(24)]
+        stars = (D29_star, D30_star, D29_star, D30_star, D30_star, D29_star)
+        expected = [stars[j] ^ (sum(d[i] for i in indices) & 1) for j, indices in enumerate(PARITY_INDICES)]
+        errors += expected != list(D[24:30])
+        D29_star, D30_star = D[28], D[29]
+    return errors
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def bench(master_frames=MASTER_FRAMES_PER_DAY):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        words = ConstellationGenerator(RINEX_FILE, ALM_FILE, TIME).gen_words("benchmark")
+    words = np.tile(words.reshape(words.shape[0], -1, 10), (1, master_frames, 1))
+
+    results = {"prns": words.shape[0], "subframes": words.shape[0] * words.shape[1]}
+    results["check_parity"], (ok, _) = timed(lambda: decoder.check_parity(words.reshape(-1, 10)))
+    assert ok.all()
+    results["decode"], decoded = timed(lambda: [decoder.decode(prn_words) for prn_words in words])
+    assert all(d["parity_ok"].all() for d in decoded)
+
+    one_prn = words[0, :125].reshape(-1)
+    bits = decoder.NavMessage(one_prn).bits()
+    reference_time, errors = timed(lambda: reference_parity_errors(bits.tolist()))
+    assert errors == 0
+    results["reference_check_parity"] = reference_time * results["subframes"] / 125      ### Extrapolated to all subframes
+
+    unaligned = np.concatenate([np.random.default_rng(0).integers(0, 2, 157, dtype=np.uint8),
+                                decoder.NavMessage(words[0]).bits()])
+    results["find_preamble"], offset = timed(lambda: decoder.to_subframes(unaligned))
+    return results
+
+
+if __name__ == "__main__":
+    result = bench()
+    words = result["subframes"] * 10
+    print(f"{result['prns']} PRNs, {result['subframes']} subframes: "
+          f"check_parity {result['check_parity'] * 1e3:.0f} ms ({words / result['check_parity'] / 1e6:.0f} Mwords/s) | "
+          f"decode {result['decode'] * 1e3:.0f} ms | per bit reference ~{result['reference_check_parity']:.0f} s | "
+          f"aligning one PRN day {result['find_preamble'] * 1e3:.1f} ms")
@@ -0,0 +1,33 @@
+### Sweeps a whole day in 6 s steps: one parse of the RINEX file, then one lookup per SV and step.
+### Run from anywhere: python benchmarks/bench_ephemeris_store.py
+import datetime
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+from ephemeris_store import EphemerisStore
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+START = datetime.datetime(2024, 3, 23, 0, 0, 0)
+
+
+def bench(steps=14400, step=6):
+    t0 = time.perf_counter()
+    store = EphemerisStore.from_rinex(RINEX_FILE)
+    t1 = time.perf_counter()
+    lookups = 0
+    for k in range(steps):
+        lookups += len(store.at(START + datetime.timedelta(seconds=k * step)))
+    t2 = time.perf_counter()
+    return {"parse": t1 - t0, "sweep": t2 - t1, "steps": steps, "lookups": lookups}
+
+
+if __name__ == "__main__":
+    result = bench()
+    print(f"parse {result['parse'] * 1e3:.2f} ms | {result['steps']} steps, {result['lookups']} ephemerides "
+          f"in {result['sweep']:.2f} s ({result['sweep'] / result['lookups'] * 1e6:.1f} us per lookup)")
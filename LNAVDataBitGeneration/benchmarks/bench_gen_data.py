@@ -0,0 +1,59 @@
+### gen_data against encoding every subframe of the 25 frames (what it did before the subframe cache): with a cold
+### cache (a single first call, the 3 ephemeris subframes and 50 almanac pages are encoded once each), with only the
+### almanac pages cached (the next PRN of a ConstellationGenerator, they share them) and with a warm one (only the HOW
+### of every subframe encoded, e.g. when generating again for a later time or another message).
+### Run from anywhere: python benchmarks/bench_gen_data.py
+import datetime
+import os
+import sys
+import timeit
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+from bit_generator import Bitgenerator
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+
+
+def bench(prn=5, repeat=10):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        bit_generator = Bitgenerator(RINEX_FILE, ALM_FILE, TIME, prn)
+
+        def uncached():
+            words = []
+            for frame in range(1, 26):
+                for subframe in range(1, 6):
+                    bit_generator.clear_cache()
+                    words.append(bit_generator.encoded_subframe(subframe, frame))
+            return words
+
+        def cold():
+            bit_generator.clear_cache()
+            return bit_generator.gen_data(packed=True)
+
+        def shared_almanac():
+            bit_generator.eph_cache.clear()
+            return bit_generator.gen_data(packed=True)
+
+        assert [word for subframe in uncached() for word in subframe] == cold().words.ravel().tolist()
+        uncached_time = min(timeit.repeat(uncached, number=1, repeat=repeat))
+        cold_time = min(timeit.repeat(cold, number=1, repeat=repeat))
+        shared_time = min(timeit.repeat(shared_almanac, number=1, repeat=repeat))
+        warm_time = min(timeit.repeat(lambda: bit_generator.gen_data(packed=True), number=1, repeat=repeat))
+        warm_list_time = min(timeit.repeat(bit_generator.gen_data, number=1, repeat=repeat))
+    return {"uncached": uncached_time, "cold": cold_time, "shared": shared_time, "warm": warm_time, "warm_list": warm_list_time}
+
+
+if __name__ == "__main__":
+    result = bench()
+    uncached = result["uncached"]
+    print(f"every subframe encoded {uncached * 1e3:.2f} ms | gen_data cold {result['cold'] * 1e3:.2f} ms (x{uncached / result['cold']:.1f}) | "
+          f"almanac pages cached {result['shared'] * 1e3:.2f} ms (x{uncached / result['shared']:.1f}) | "
+          f"warm {result['warm'] * 1e3:.2f} ms (x{uncached / result['warm']:.1f}) | warm, as list {result['warm_list'] * 1e3:.2f} ms")
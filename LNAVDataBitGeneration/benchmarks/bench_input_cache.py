@@ -0,0 +1,56 @@
+### Loading the example RINEX and SEM files by parsing them against a warm input cache (memory mapped .npy entries),
+### and a check that the cached inputs are the parsed ones. Run from anywhere: python benchmarks/bench_input_cache.py
+import math
+import os
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import input_cache
+from bit_generator import read_sem_almanac
+from ephemeris_store import EphemerisStore
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+
+
+def load():
+    return EphemerisStore.from_rinex(RINEX_FILE), read_sem_almanac(ALM_FILE)
+
+
+def same(a, b):
+    return a == b or (isinstance(a, float) and math.isnan(a) and math.isnan(b))
+
+
+def bench(repeat=20):
+    input_cache.disable()
+    parsed_store, parsed_alm = load()
+    parse_time = min(timeit.repeat(load, number=1, repeat=repeat))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = input_cache.enable(tmp)
+        try:
+            miss_time = min(timeit.repeat(lambda: (cache.clear(), load()), number=1, repeat=repeat))
+            store, alm = load()
+            hit_time = min(timeit.repeat(load, number=1, repeat=repeat))
+            entries = len(os.listdir(tmp))
+        finally:
+            input_cache.disable()
+
+    assert alm == parsed_alm
+    assert list(parsed_store.records) == list(store.records)
+    for sv, records in parsed_store.records.items():
+        for parsed, cached in zip(records.tolist(), store.records[sv].tolist()):
+            assert all(same(a, b) for a, b in zip(parsed, cached))
+    return {"parse": parse_time, "miss": miss_time, "hit": hit_time, "entries": entries}
+
+
+if __name__ == "__main__":
+    result = bench()
+    print(f"RINEX + SEM: parsed {result['parse'] * 1e3:.2f} ms | cache miss {result['miss'] * 1e3:.2f} ms | "
+          f"cache hit {result['hit'] * 1e3:.2f} ms (x{result['parse'] / result['hit']:.1f}), {result['entries']} entries")
@@ -0,0 +1,100 @@
+### Skyplot of a user position over a full day at 1 s steps, end to end (parameters, propagation and az/el in one
+### timing): every SV of the example almanac and every SV of the example RINEX file. The RINEX positions are checked
+### against a textbook per-sample implementation (IS-GPS-200 Table 20-IV with math) on a subset of the samples, and
+### consecutive ephemerides of an SV against each other where their fit intervals overlap.
+### Run from anywhere: python benchmarks/bench_orbit.py
+import datetime
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import orbit
+from ephemeris_store import EphemerisStore
+from bit_generator import MU, OmegaDotE, read_sem_almanac
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+LAT, LON, HEIGHT = 22.3085316, 39.104593, 0.0       ### Discussions/Week1.md
+
+
+def reference_position(p, t):
+    ### One SV at one time, p a dict of scalars as in orbit.eph_params
+    A = p["sqrtA"] ** 2
+    tk = t - p["toe"]
+    M = p["M0"] + (math.sqrt(MU / A ** 3) + p["Delta_n"]) * tk
+    E = M
+    for _ in range(20):
+        E = M + p["e"] * math.sin(E)
+    nu = math.atan2(math.sqrt(1 - p["e"] ** 2) * math.sin(E), math.cos(E) - p["e"])
+    phi = nu + p["omega"]
+    u = phi + p["C_us"] * math.sin(2 * phi) + p["C_uc"] * math.cos(2 * phi)
+    r = A * (1 - p["e"] * math.cos(E)) + p["C_rs"] * math.sin(2 * phi) + p["C_rc"] * math.cos(2 * phi)
+    i = p["i0"] + p["IDOT"] * tk + p["C_is"] * math.sin(2 * phi) + p["C_ic"] * math.cos(2 * phi)
+    Omega = p["Omega"] + (p["OmegaDot"] - OmegaDotE) * tk - OmegaDotE * (p["toe"] % 604800)
+    x, y = r * math.cos(u), r * math.sin(u)
+    return (x * math.cos(Omega) - y * math.cos(i) * math.sin(Omega),
+            x * math.sin(Omega) + y * math.cos(i) * math.cos(Omega),
+            y * math.sin(i))
+
+
+def skyplot_time(eph, t, alm=None, repeat=3):
+    ### Best of repeat end to end skyplots -> (seconds, (svs, azimuth, elevation))
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = orbit.skyplot(eph, t, LAT, LON, HEIGHT, alm=alm)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench(step=1.0, reference_samples=2000):
+    store = EphemerisStore.from_rinex(RINEX_FILE)
+    alm = read_sem_almanac(ALM_FILE)
+    t = orbit.time_grid(TIME, TIME + datetime.timedelta(days=1), step)
+
+    almanac_time, (alm_svs, _, _) = skyplot_time(None, t, alm=alm)
+    rinex_time, (svs, azimuth, elevation) = skyplot_time(store.at(TIME), t)
+    _, params = orbit.eph_params(store.at(TIME))
+    xyz, clock = orbit.propagate(params, t)
+
+    rng = np.random.default_rng(0)
+    samples = [(rng.integers(len(svs)), rng.integers(t.size)) for _ in range(reference_samples)]
+    scalars = [{name: float(value[k]) for name, value in params.items()} for k in range(len(svs))]
+    t0 = time.perf_counter()
+    reference = np.array([reference_position(scalars[k], t[j]) for k, j in samples])
+    reference_time = (time.perf_counter() - t0) / reference_samples * xyz.shape[0] * xyz.shape[1]
+    error = np.max(np.abs(reference - np.array([xyz[k, j] for k, j in samples])))
+
+    ### Consecutive ephemerides of the same SV, 1 h after the second one's Toe
+    handover = []
+    later = store.at(TIME + datetime.timedelta(hours=2))
+    now = store.at(TIME)
+    check_time = [TIME + datetime.timedelta(hours=3)]
+    for sv in svs:
+        if sv in later and later[sv]["IODE"] != now[sv]["IODE"]:
+            a, _ = orbit.propagate(orbit.eph_params({sv: now[sv]})[1], check_time)
+            b, _ = orbit.propagate(orbit.eph_params({sv: later[sv]})[1], check_time)
+            handover.append(float(np.linalg.norm(a - b)))
+
+    return {"alm_svs": len(alm_svs), "almanac": almanac_time, "svs": len(svs), "rinex": rinex_time,
+            "samples": xyz.shape[0] * xyz.shape[1], "reference": reference_time, "max_error_m": float(error), "handover_max_m": max(handover, default=0.0),
+            "visible_mean": float(np.mean(np.sum(elevation > 0, axis=0)))}
+
+
+if __name__ == "__main__":
+    result = bench()
+    print(f"Skyplot, 1 day at 1 s: almanac, {result['alm_svs']} SVs {result['almanac'] * 1e3:.0f} ms | "
+          f"RINEX, {result['svs']} SVs {result['rinex'] * 1e3:.0f} ms")
+    print(f"RINEX positions ({result['samples']}): per sample reference ~{result['reference']:.0f} s | "
+          f"max difference {result['max_error_m'] * 1e3:.3f} mm")
+    print(f"Consecutive ephemerides differ by at most {result['handover_max_m']:.2f} m | "
+          f"{result['visible_mean']:.1f} SVs above the horizon on average at {LAT}, {LON}")
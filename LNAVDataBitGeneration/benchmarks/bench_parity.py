@@ -0,0 +1,84 @@
+### Per word cost of the integer parity engine against the per-bit list XORs it replaced.
+### Also checks both give the same bits on random words for all D29*/D30* combinations.
+### Run from anywhere: python benchmarks/bench_parity.py
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import parity
+
+
+def legacy_gen_p(bits_1_24, D29_star, D30_star):
+    D25 = D29_star ^ bits_1_24[0] ^ bits_1_24[1] ^ bits_1_24[2] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[9] ^ bits_1_24[10] ^ bits_1_24[11] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[16] ^ bits_1_24[17] ^ bits_1_24[19] ^ bits_1_24[22]
+    D26 = D30_star ^ bits_1_24[1] ^ bits_1_24[2] ^ bits_1_24[3] ^ bits_1_24[5] ^ bits_1_24[6] ^ bits_1_24[10] ^ bits_1_24[11] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[17] ^ bits_1_24[18] ^ bits_1_24[20] ^ bits_1_24[23]
+    D27 = D29_star ^ bits_1_24[0] ^ bits_1_24[2] ^ bits_1_24[3] ^ bits_1_24[4] ^ bits_1_24[6] ^ bits_1_24[7] ^ bits_1_24[11] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[15] ^ bits_1_24[18] ^ bits_1_24[19] ^ bits_1_24[21]
+    D28 = D30_star ^ bits_1_24[1] ^ bits_1_24[3] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[7] ^ bits_1_24[8] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[15] ^ bits_1_24[16] ^ bits_1_24[19] ^ bits_1_24[20] ^ bits_1_24[22]
+    D29 = D30_star ^ bits_1_24[0] ^ bits_1_24[2] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[6] ^ bits_1_24[8] ^ bits_1_24[9] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[15] ^ bits_1_24[16] ^ bits_1_24[17] ^ bits_1_24[20] ^ bits_1_24[21] ^ bits_1_24[23]
+    D30 = D29_star ^ bits_1_24[2] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[7] ^ bits_1_24[8] ^ bits_1_24[9] ^ bits_1_24[10] ^ bits_1_24[12] ^ bits_1_24[14] ^ bits_1_24[18] ^ bits_1_24[21] ^ bits_1_24[22] ^ bits_1_24[23]
+    return [D25, D26, D27, D28, D29, D30]
+
+
+def legacy_gen_t(bits1_22, D29_star, D30_star):
+    d24 = D30_star ^ bits1_22[0] ^ bits1_22[2] ^ bits1_22[4] ^ bits1_22[5] ^ bits1_22[6] ^ bits1_22[8] ^ bits1_22[9] ^ bits1_22[13] ^ bits1_22[14] ^ bits1_22[15] ^ bits1_22[16] ^ bits1_22[17] ^ bits1_22[20] ^ bits1_22[21]
+    d23 = D29_star ^ bits1_22[2] ^ bits1_22[4] ^ bits1_22[5] ^ bits1_22[7] ^ bits1_22[8] ^ bits1_22[9] ^ bits1_22[10] ^ bits1_22[12] ^ bits1_22[14] ^ bits1_22[18] ^ bits1_22[21] ^ d24
+    return [d23, d24]
+
+
+def legacy_gen_word(bits, D30_star, D29_star):
+    parity_bits = legacy_gen_p(bits, D29_star=D29_star, D30_star=D30_star)
+    if D30_star == 1:
+        return (np.bitwise_not(bits) + 2).tolist() + parity_bits
+    return bits + parity_bits
+
+
+def check(samples=20000, seed=0):
+    rng = random.Random(seed)
+    for _ in range(samples):
+        data = rng.getrandbits(24)
+        bits = parity.int_to_bits(data, 24)
+        for stars in range(4):
+            D29_star, D30_star = stars >> 1, stars & 1
+            expected = legacy_gen_word(bits, D30_star=D30_star, D29_star=D29_star)
+            assert parity.int_to_bits(parity.encode_word(data, D29_star, D30_star), 30) == expected
+            assert parity.int_to_bits(parity.solve_t(data >> 2, D29_star, D30_star), 2) == legacy_gen_t(bits[:22], D29_star, D30_star)
+
+
+def bench(number=20000):
+    rng = random.Random(1)
+    words = [rng.getrandbits(24) for _ in range(1000)]
+    word_bits = [parity.int_to_bits(word, 24) for word in words]
+    results = {
+        "legacy_gen_word": lambda: [legacy_gen_word(bits, 1, 0) for bits in word_bits],
+        "list_gen_word": lambda: [parity.int_to_bits(parity.encode_word(parity.bits_to_int(bits), 0, 1), 30) for bits in word_bits],
+        "int_encode_word": lambda: [parity.encode_word(word, 0, 1) for word in words],
+    }
+    repeat = max(1, number // len(words))
+    return {name: min(timeit.repeat(fn, number=1, repeat=repeat)) / len(words) for name, fn in results.items()}
+
+
+def bench_batch(prns=32, frames=25, repeat=3):
+    ### Whole master frames of many PRNs, one encode_subframe call per subframe against one encode_subframes call
+    rng = np.random.default_rng(2)
+    data = rng.integers(0, 1 << 24, size=(prns, frames, 5, 10), dtype=np.uint32)
+    data[..., 1] &= ~np.uint32(0b11)
+    data[..., 9] &= ~np.uint32(0b11)
+    subframes = data.reshape(-1, 10).tolist()
+    scalar = min(timeit.repeat(lambda: [parity.encode_subframe(subframe) for subframe in subframes], number=1, repeat=repeat))
+    batch = min(timeit.repeat(lambda: parity.encode_subframes(data), number=1, repeat=repeat))
+    return {"words": data.size, "encode_subframe": scalar, "encode_subframes": batch}
+
+
+if __name__ == "__main__":
+    check()
+    result = bench()
+    for name, seconds in result.items():
+        print(f"{name:16s} {seconds * 1e9:9.0f} ns/word | x{result['legacy_gen_word'] / seconds:.1f}")
+    result = bench_batch()
+    print(f"{result['words']} words: encode_subframe {result['encode_subframe'] * 1e3:.2f} ms | "
+          f"encode_subframes {result['encode_subframes'] * 1e3:.2f} ms")
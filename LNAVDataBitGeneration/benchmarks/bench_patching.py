@@ -0,0 +1,73 @@
+### Updating the page 17 message, one SV health or one almanac entry of a written stream: StreamPatcher against
+### generating the whole stream again and rewriting the file, for one master frame and for 10 (tiled), .txt and .bin.
+### Also checks the patched files are byte for byte the ones a full regeneration writes.
+### Run from anywhere: python benchmarks/bench_patching.py
+import datetime
+import os
+import sys
+import tempfile
+import timeit
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import writers
+from constellation import ConstellationGenerator
+from nav_message import NavMessage
+from patching import StreamPatcher
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+PRN = 5
+MESSAGES = ("first message", "second message")
+
+
+def stream(bit_generator, message, master_frames):
+    return NavMessage(np.tile(bit_generator.gen_message(message).words, (master_frames, 1, 1)))
+
+
+def bench(master_frames, extension, repeat=20):
+    constellation = ConstellationGenerator(RINEX_FILE, ALM_FILE, TIME)
+    write = writers.WRITERS[extension]
+    with tempfile.TemporaryDirectory() as tmp:
+        fname = os.path.join(tmp, f"stream.{extension}")
+        bit_generator = constellation.generator(PRN)
+        nav_message = stream(bit_generator, MESSAGES[0], master_frames)
+        write(fname, nav_message, PRN, 0)
+        patcher = StreamPatcher(bit_generator, nav_message, MESSAGES[0], fname)
+
+        def regenerate(message):
+            bit_generator.clear_cache()
+            write(fname, stream(bit_generator, message, master_frames), PRN, 0)
+
+        counter = iter(range(1, 10**6))
+        times = {
+            "regenerate": min(timeit.repeat(lambda: regenerate(MESSAGES[1]), number=1, repeat=repeat)),
+            "message": min(timeit.repeat(lambda: patcher.set_message(f"message {next(counter)}"), number=1, repeat=repeat)),
+            "health": min(timeit.repeat(lambda: patcher.set_health(7, next(counter) % 2 * 21), number=1, repeat=repeat)),
+            "almanac": min(timeit.repeat(lambda: patcher.set_almanac_entry(7, e=next(counter) % 2 * 1e-3), number=1, repeat=repeat)),
+        }
+
+        patcher.set_message(MESSAGES[1])
+        with open(fname, "rb") as file:
+            patched = file.read()
+        regenerate(MESSAGES[1])
+        with open(fname, "rb") as file:
+            assert file.read() == patched
+    return times
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    for master_frames in (1, 10):
+        for extension in ("txt", "bin"):
+            t = bench(master_frames, extension)
+            print(f"{master_frames:2d} master frame(s) .{extension}: regenerate + rewrite {t['regenerate'] * 1e3:7.2f} ms | "
+                  f"patch message {t['message'] * 1e3:.2f} ms, health {t['health'] * 1e3:.2f} ms, "
+                  f"almanac entry {t['almanac'] * 1e3:.2f} ms")
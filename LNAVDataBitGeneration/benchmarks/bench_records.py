@@ -0,0 +1,82 @@
+### Typed ephemeris records: records.from_georinex (one selection, one array per field) against the per SV, per field
+### scalar extraction readRinexFileGeorinex did, on the example file loaded once. And the memory 8 days of ephemerides
+### take as rinex_reader dicts, as Ephemeris objects and as EPH_DTYPE rows. Also checks both extractions agree.
+### Run from anywhere: python benchmarks/bench_records.py
+import datetime
+import math
+import os
+import sys
+import timeit
+import tracemalloc
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import records
+import rinex_reader
+from gps_time import GPS_EPOCH, LEAP_SECONDS, SECS_PER_WEEK
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+DAYS = 8
+
+
+def scalar(dataset, time):
+    ### What readRinexFileGeorinex did: a selection per SV and a float() per field
+    eph = {}
+    toc = (time - GPS_EPOCH).total_seconds() % SECS_PER_WEEK + LEAP_SECONDS
+    for svn in range(1, 33):
+        sv = "G%02d" % svn
+        if sv not in dataset.sv:
+            continue
+        eph_t = dataset.sel(sv=sv, time=time)
+        if math.isnan(float(eph_t["IODE"])):
+            continue
+        eph[sv] = {field: float(eph_t[name]) for field, name in records.GEORINEX_NAMES.items()}
+        eph[sv]["toc"] = toc
+    return eph
+
+
+def allocated(build):
+    ### Bytes still allocated by what build returns
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def bench(repeat=5):
+    import georinex as gr
+    import pandas as pd
+
+    dataset = gr.load(RINEX_FILE)
+    time = pd.Timestamp(TIME)
+    bulk = records.from_georinex(dataset, time)
+    assert scalar(dataset, time) == bulk
+    results = {
+        "svs": len(bulk),
+        "scalar": min(timeit.repeat(lambda: scalar(dataset, time), number=1, repeat=repeat)),
+        "bulk": min(timeit.repeat(lambda: records.from_georinex(dataset, time), number=1, repeat=repeat)),
+    }
+
+    parsed = rinex_reader.read_gps_nav(RINEX_FILE) * DAYS
+    array = records.records_to_array(parsed)
+    results["records"] = len(parsed)
+    ### Both built from the rows, so each holds its own float objects
+    results["dicts"] = allocated(lambda: [dict(zip(records.EPH_FIELDS, row.tolist()[2:] + (0.0,))) for row in array])
+    results["objects"] = allocated(lambda: [records.Ephemeris(*row.tolist()[2:], 0.0) for row in array])
+    results["array"] = allocated(lambda: array.copy())
+    return results
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    t = bench()
+    print(f"georinex, {t['svs']} SVs at {TIME}: scalar {t['scalar'] * 1e3:.1f} ms | from_georinex {t['bulk'] * 1e3:.1f} ms")
+    print(f"{t['records']} ephemerides ({DAYS} days): dicts {t['dicts'] / 1e6:.2f} MB | Ephemeris {t['objects'] / 1e6:.2f} MB | "
+          f"EPH_DTYPE rows {t['array'] / 1e6:.2f} MB")
@@ -0,0 +1,88 @@
+### Compares the native streaming RINEX 3 parser with the georinex path on the example files. Also checks a RINEX 2
+### copy of the first one goes through EphemerisStore.load to the same constellation messages.
+### Run from anywhere: python benchmarks/bench_rinex.py
+import datetime
+import os
+import sys
+import tempfile
+import timeit
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import numpy as np
+import records
+from constellation import ConstellationGenerator
+from ephemeris_store import EphemerisStore
+
+
+RINEX_FILES = {
+    "GODS00USA_R_20240830000_01D_GN.rnx": datetime.datetime(2024, 3, 23, 2, 0, 0),
+    "GODN00USA_R_20240940000_01D_GN.rnx": datetime.datetime(2024, 4, 3, 2, 0, 0),
+}
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+
+
+def write_rinex2(rinex_file, fname):
+    ### RINEX 2.11 copy of a RINEX 3 GPS navigation file: 2 digit PRN and year, continuation lines one column left
+    with open(rinex_file) as file:
+        lines = file.read().splitlines()
+    body = lines[[i for i, line in enumerate(lines) if "END OF HEADER" in line][0] + 1:]
+    out = ["     2.11           N: GPS NAV DATA                         RINEX VERSION / TYPE",
+           "                                                            END OF HEADER"]
+    for line in body:
+        if line.startswith("G"):
+            year, month, day, hour, minute, second = (int(x) for x in line[4:23].split())
+            out.append("%2d %02d %2d %2d %2d %2d%5.1f" % (int(line[1:3]), year % 100, month, day, hour, minute, second) + line[23:])
+        elif line.startswith(" "):
+            out.append(line[1:])
+    with open(fname, "w") as file:
+        file.write("\n".join(out) + "\n")
+
+
+def georinex_at(rinex_file, time):
+    ### The ephemerides at time straight from georinex, without a store
+    import georinex as gr
+    import pandas as pd
+    return records.from_georinex(gr.load(rinex_file), pd.Timestamp(time))
+
+
+def check_rinex2(rinex_file, time):
+    ### ConstellationGenerator on the RINEX 2 copy (georinex fallback) -> the same messages as on the RINEX 3 file
+    rinex3 = os.path.join(EXAMPLE, rinex_file)
+    with tempfile.TemporaryDirectory() as directory:
+        rinex2 = os.path.join(directory, "gods0830.24n")
+        write_rinex2(rinex3, rinex2)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = ConstellationGenerator(rinex3, ALM_FILE, time).gen_messages("RINEX 2")
+            messages = ConstellationGenerator(rinex2, ALM_FILE, time).gen_messages("RINEX 2")
+            load = min(timeit.repeat(lambda: EphemerisStore.load(rinex2), number=1, repeat=3))
+    assert messages.keys() == expected.keys()
+    for prn in expected:
+        assert np.array_equal(messages[prn].words, expected[prn].words), prn
+    return {"prns": len(messages), "load": load}
+
+
+def bench(repeat=5):
+    results = {}
+    for rinex_file, time in RINEX_FILES.items():
+        path = os.path.join(EXAMPLE, rinex_file)
+        native = min(timeit.repeat(lambda: EphemerisStore.load(path).at(time), number=1, repeat=repeat))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            georinex = min(timeit.repeat(lambda: georinex_at(path, time), number=1, repeat=repeat))
+        results[rinex_file] = {"native": native, "georinex": georinex}
+    results["rinex2"] = check_rinex2(*next(iter(RINEX_FILES.items())))
+    return results
+
+
+if __name__ == "__main__":
+    results = bench()
+    rinex2 = results.pop("rinex2")
+    for rinex_file, result in results.items():
+        print(f"{rinex_file}: native {result['native'] * 1e3:8.2f} ms | georinex {result['georinex'] * 1e3:8.2f} ms "
+              f"| speedup x{result['georinex'] / result['native']:.1f}")
+    print(f"RINEX 2 copy: EphemerisStore.load {rinex2['load'] * 1e3:.2f} ms, same messages for {rinex2['prns']} PRNs")
@@ -0,0 +1,85 @@
+### Getting the subframe transmitted at an arbitrary GPS time: Bitgenerator.subframe_at against generating the 25 frame
+### stream and slicing the subframe out of it, on a fresh generator (nothing cached) and on a warm one.
+### Also checks both give the same words at every subframe of the stream, and that every PRN's generator can seek to
+### its own time at epochs all over the file.
+### Run from anywhere: python benchmarks/bench_seek.py
+import datetime
+import os
+import random
+import sys
+import timeit
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+from constellation import ConstellationGenerator
+from ephemeris_store import EphemerisStore
+from gps_time import GPS_EPOCH
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+PRN = 5
+MESSAGE = "No Message"
+
+
+def sliced(bit_generator, time):
+    ### What callers did before: the whole stream, then the subframe at time
+    frame, subframe, _ = bit_generator.subframe_position(time)
+    return bit_generator.gen_message(MESSAGE).subframe(frame, subframe).tolist()
+
+
+def check_epochs(step=900):
+    ### subframe_at(time) of the generator of every PRN at time, every step seconds of the file's day. Within the 25
+    ### frames it's the subframe of gen_message
+    store = EphemerisStore.load(RINEX_FILE)
+    day = datetime.datetime(TIME.year, TIME.month, TIME.day)
+    cases = 0
+    for k in range(0, 86400, step):
+        time = day + datetime.timedelta(seconds=k)
+        constellation = ConstellationGenerator(store, ALM_FILE, time)
+        for prn in constellation.prns:
+            bit_generator = constellation.generator(prn)
+            words = bit_generator.subframe_at(time, MESSAGE)
+            frame, _, _ = bit_generator.subframe_position(time)
+            if 1 <= frame <= 25:
+                assert words == sliced(bit_generator, time), (time, prn)
+            cases += 1
+    return cases
+
+
+def bench(repeat=20):
+    constellation = ConstellationGenerator(RINEX_FILE, ALM_FILE, TIME)
+    start = constellation.generator(PRN).stream_start()
+    random.seed(0)
+    times = [GPS_EPOCH + datetime.timedelta(seconds=start + random.uniform(0, 750)) for _ in range(repeat)]
+
+    def fresh():
+        bit_generator = constellation.generator(PRN)
+        bit_generator.alm_cache = {}            ### Not the page cache the constellation shares
+        return bit_generator
+
+    warm = constellation.generator(PRN)
+    warm.gen_message(MESSAGE)
+    for i in range(125):
+        time = GPS_EPOCH + datetime.timedelta(seconds=start + 6 * i + 3)
+        assert warm.subframe_at(time, MESSAGE) == sliced(warm, time)
+
+    cases = {
+        "slice_cold": lambda: [sliced(fresh(), time) for time in times],
+        "seek_cold": lambda: [fresh().subframe_at(time, MESSAGE) for time in times],
+        "slice_warm": lambda: [sliced(warm, time) for time in times],
+        "seek_warm": lambda: [warm.subframe_at(time, MESSAGE) for time in times],
+    }
+    return {name: min(timeit.repeat(fn, number=1, repeat=5)) / repeat for name, fn in cases.items()}
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    print(f"subframe_at(time) of every PRN at {check_epochs()} epoch/PRN cases OK")
+    t = bench()
+    print(f"fresh generator: generate + slice {t['slice_cold'] * 1e3:.3f} ms | subframe_at {t['seek_cold'] * 1e3:.3f} ms")
+    print(f"warm generator : generate + slice {t['slice_warm'] * 1e3:.3f} ms | subframe_at {t['seek_warm'] * 1e3:.3f} ms")
@@ -0,0 +1,80 @@
+### Repeated requests for the same streams: a main.py process per request against the resident service, with the
+### service's LRU cache cold and warm, for concurrent clients over loopback TCP. Also checks the service returns
+### exactly the .bin file main.py writes.
+### Run from anywhere: python benchmarks/bench_service.py
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+EXAMPLE = os.path.join(ROOT, "Example")
+
+import service
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = "2024-03-23T02:00:00"
+MESSAGE = "benchmark"
+PRNS = (5, 6, 7, 9, 10, 11)
+PORT = 8621
+
+
+def run_main(prn, fname):
+    subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "-r", RINEX_FILE, "-a", ALM_FILE, "-t", TIME, "-p", str(prn),
+                    "-m", MESSAGE, "-f", fname, "--format", "bin"], check=True, capture_output=True)
+    with open(fname + ".bin", "rb") as file:
+        return file.read()
+
+
+async def clients(requests, concurrency):
+    ### requests spread over concurrency clients -> (seconds, bodies)
+    t0 = time.perf_counter()
+    bodies = await asyncio.gather(*[
+        asyncio.gather(*[service.get(path, port=PORT) for path in requests[i::concurrency]]) for i in range(concurrency)
+    ])
+    return time.perf_counter() - t0, [body for group in bodies for status, body in group]
+
+
+async def bench_service(requests, concurrency):
+    bitstream_service = service.BitstreamService(RINEX_FILE, ALM_FILE)
+    server = asyncio.create_task(bitstream_service.serve(port=PORT))
+    await asyncio.sleep(0.2)
+    try:
+        cold, bodies = await clients(requests, concurrency)
+        warm, _ = await clients(requests, concurrency)
+        stats = json.loads((await service.get("/stats", port=PORT))[1])
+    finally:
+        server.cancel()
+    return cold, warm, bodies, stats
+
+
+def bench(rounds=5, concurrency=8):
+    requests = [f"/data?prn={prn}&time={TIME}&message={MESSAGE}" for prn in PRNS] * rounds
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        files = {prn: run_main(prn, os.path.join(tmp, f"G{prn:02d}")) for prn in PRNS}
+        process_time = (time.perf_counter() - t0) / len(PRNS)
+
+    cold, warm, bodies, stats = asyncio.run(bench_service(requests, concurrency))
+    expected = [files[prn] for i in range(concurrency) for prn in (PRNS * rounds)[i::concurrency]]
+    assert bodies == expected
+    return {"requests": len(requests), "process": process_time, "cold": cold / len(requests), "warm": warm / len(requests),
+            "stats": stats}
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    result = bench()
+    cache = result["stats"]["cache"]
+    print(f"main.py per request {result['process'] * 1e3:.0f} ms | service, {result['requests']} requests from 8 clients: "
+          f"cold cache {result['cold'] * 1e3:.2f} ms/request, warm {result['warm'] * 1e3:.2f} ms/request")
+    print(f"cache hits {cache['hits']}, misses {cache['misses']} ({result['stats']['coalesced']} coalesced) | "
+          f"/data p50 {result['stats']['latency']['/data']['p50_ms']:.2f} ms, p95 {result['stats']['latency']['/data']['p95_ms']:.2f} ms")
@@ -0,0 +1,82 @@
+### Startup cost of the CLI: `python -X importtime` of the core modules against a budget, a check that pandas/xarray/
+### georinex stay out of it, and the wall time of complete main.py runs as batch scripts call it.
+### Exits 1 when the import budget is exceeded or a heavy module is imported. Run from anywhere: python benchmarks/bench_startup.py
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+EXAMPLE = os.path.join(ROOT, "Example")
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+
+CORE_MODULES = ("bit_generator", "writers", "decoder")
+HEAVY_MODULES = ("pandas", "xarray", "georinex")
+IMPORT_BUDGET = 0.25            ### Seconds for importing the CLI's modules, numpy included
+
+
+def import_times(modules, repeat=5):
+    ### Fastest cumulative import time of every top level module, in seconds, as reported by -X importtime
+    code = "import sys; import " + ", ".join(modules) + "; print(' '.join(sorted(sys.modules)))"
+    best, loaded = {}, set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        loaded = set(result.stdout.split())
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if not name.startswith("  "):         ### Top level imports only, nested ones are part of their parent
+                name = name.strip()
+                best[name] = min(best.get(name, float("inf")), int(cumulative) / 1e6)
+    return best, loaded
+
+
+def run_time(args, repeat=5):
+    ### Fastest wall time of the interpreter run with args
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, check=True)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def cli_time(args, repeat=5):
+    return run_time([os.path.join(ROOT, "main.py")] + args, repeat)
+
+
+def bench():
+    times, loaded = import_times(CORE_MODULES)
+    with tempfile.TemporaryDirectory() as tmp:
+        run = ["-r", RINEX_FILE, "-a", ALM_FILE, "-t", "2024-03-23T02:00:00", "-p", "5", "-f", os.path.join(tmp, "out")]
+        return {
+            "imports": sum(times[module] for module in CORE_MODULES),
+            "top_imports": sorted(times.items(), key=lambda item: -item[1])[:5],
+            "heavy_loaded": [module for module in HEAVY_MODULES if module in loaded],
+            "python": run_time(["-c", "pass"]),
+            "cli_help": cli_time(["-h"]),
+            "cli_txt": cli_time(run),
+            "cli_bin": cli_time(run + ["--format", "bin"]),
+        }
+
+
+if __name__ == "__main__":
+    result = bench()
+    print(f"import {', '.join(CORE_MODULES)}: {result['imports'] * 1e3:.0f} ms (budget {IMPORT_BUDGET * 1e3:.0f} ms) | "
+          + ", ".join(f"{name} {seconds * 1e3:.0f} ms" for name, seconds in result["top_imports"]))
+    print(f"bare interpreter {result['python'] * 1e3:.0f} ms | main.py -h {result['cli_help'] * 1e3:.0f} ms | "
+          f"one PRN to .txt {result['cli_txt'] * 1e3:.0f} ms | to .bin {result['cli_bin'] * 1e3:.0f} ms")
+
+    failed = False
+    if result["heavy_loaded"]:
+        print(f"The core imports {', '.join(result['heavy_loaded'])}")
+        failed = True
+    if result["imports"] > IMPORT_BUDGET:
+        print("Import time over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,113 @@
+### Sweeping the example navigation files every 30 min (every PRN with an ephemeris at every epoch): sweep.py on one
+### process and on every core, against one main.py process per (file, epoch, PRN) job, measured on a sample of jobs.
+### Also checks a sweep stopped halfway and resumed writes the same files as an uninterrupted one, and that manifest
+### jobs on the same file with other PRNs/messages, or on files of the same name, keep their own outputs on resume.
+### Run from anywhere: python benchmarks/bench_sweep.py
+import filecmp
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+EXAMPLE = os.path.join(ROOT, "Example")
+
+import sweep
+
+
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+STEP = 1800
+SAMPLE_JOBS = 5
+
+
+def specs():
+    return [{"rinex": path, "almanac": ALM_FILE, "start": None, "end": None, "step": STEP, "prns": None, "message": "No Message"}
+            for path in sweep.nav_files([EXAMPLE])]
+
+
+def outputs(directory):
+    return sorted(os.path.relpath(os.path.join(d, name), directory) for d, _, names in os.walk(directory)
+                  for name in names if name.endswith(".npy") and not d.endswith("cache"))
+
+
+def check_manifest_jobs(tmp):
+    ### Four jobs at one epoch that would all write <file name>/<epoch>.npy if only the file name and epoch told them apart
+    rinex_file = "GODS00USA_R_20240830000_01D_GN.rnx"
+    for directory in ("a", "b"):
+        os.makedirs(os.path.join(tmp, directory))
+        shutil.copy(os.path.join(EXAMPLE, rinex_file), os.path.join(tmp, directory))
+    epoch = {"start": "2024-03-23T02:00:00"}
+    manifest = os.path.join(tmp, "manifest.json")
+    with open(manifest, "w") as file:
+        json.dump([dict(epoch, rinex=f"a/{rinex_file}", prns=[5], message="First"),
+                   dict(epoch, rinex=f"a/{rinex_file}", prns=[5, 13], message="Second"),
+                   dict(epoch, rinex=f"a/{rinex_file}"),
+                   dict(epoch, rinex=f"b/{rinex_file}")], file)
+    defaults = {"almanac": ALM_FILE, "start": None, "end": None, "step": STEP, "prns": None, "message": "No Message"}
+    out = os.path.join(tmp, "manifest")
+
+    first = sweep.sweep(sweep.load_manifest(manifest, defaults), out, processes=2)
+    written = {f: np.load(os.path.join(out, f)) for f in outputs(out)}
+    resumed = sweep.sweep(sweep.load_manifest(manifest, defaults), out, processes=2)
+    assert first["done"] == len(written) == 4 and resumed["skipped"] == 4 and resumed["done"] == 0
+    assert outputs(out) == sorted(written)
+    assert all(np.array_equal(np.load(os.path.join(out, f)), array) for f, array in written.items())
+    assert [len(array) for array in written.values()].count(1) == 1        ### prns=[5]
+
+
+def main_per_job(tmp, jobs):
+    ### Seconds per job of one main.py process per (file, epoch, PRN)
+    t0 = time.perf_counter()
+    for i, (rinex_file, epoch, prn) in enumerate(jobs):
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "-r", rinex_file, "-a", ALM_FILE, "-t", epoch, "-p", str(prn),
+                        "-f", os.path.join(tmp, f"job{i}"), "--format", "bin"], check=True, capture_output=True)
+    return (time.perf_counter() - t0) / len(jobs)
+
+
+def bench():
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for processes in sorted({1, os.cpu_count()}):
+            out = os.path.join(tmp, f"p{processes}")
+            results[processes] = sweep.sweep(specs(), out, processes=processes, cache_dir=os.path.join(out, "cache"))
+
+        ### Stop after half the tasks by giving only half the epochs, then resume with all of them
+        out = os.path.join(tmp, "resumed")
+        half = []
+        for spec in specs():
+            epochs = sweep.plan_file(spec)
+            half.append(dict(spec, start=epochs[0], end=epochs[len(epochs) // 2]))
+        first = sweep.sweep(half, out, processes=os.cpu_count())
+        resumed = sweep.sweep(specs(), out, processes=os.cpu_count())
+        reference = os.path.join(tmp, "p1")
+        assert outputs(out) == outputs(reference)
+        assert all(filecmp.cmp(os.path.join(out, f), os.path.join(reference, f), shallow=False) for f in outputs(out))
+        assert resumed["skipped"] == first["done"]
+        check_manifest_jobs(tmp)
+
+        epochs = [(spec, epoch) for spec in specs() for epoch in sweep.plan_file(spec)]
+        jobs = []
+        for spec, epoch in epochs[::len(epochs) // SAMPLE_JOBS][:SAMPLE_JOBS]:
+            prn = int(np.load(os.path.join(reference, sweep.task_key(spec, epoch) + ".npy"))[0, 0])
+            jobs.append((spec["rinex"], epoch, prn))
+        per_job = main_per_job(tmp, jobs)
+    return results, per_job
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    results, per_job = bench()
+    for processes, summary in results.items():
+        print(f"sweep, {processes} process(es): {summary['done']} epochs, {summary['streams']} streams in {summary['seconds']:.2f} s "
+              f"({summary['seconds'] / summary['streams'] * 1e3:.2f} ms/stream)")
+    streams = next(iter(results.values()))["streams"]
+    print(f"main.py per job: {per_job * 1e3:.0f} ms/stream, {per_job * streams:.0f} s for the same {streams} streams | "
+          f"resumed sweep matches the uninterrupted one")
@@ -0,0 +1,60 @@
+### Output writers on a constellation worth of streams: the legacy per-bit str() loop, the text writer,
+### packed .bin files and one memory mapped .npy file. Run from anywhere: python benchmarks/bench_writers.py
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import writers
+from nav_message import NavMessage
+
+
+def legacy_write(fname, navigation_message):
+    with open(fname, "w", newline="") as file:
+        for frame in range(1, 26):
+            for sf in range(1,6):
+                file.write(f"F-{frame} SF-{sf} \n")
+                for w in range(1, 11):
+                    ws = (frame - 1) * 1500 + (sf - 1) * 300 + (w-1) * 30
+                    we = ws + 30
+                    word = [str(a) for a in navigation_message[ws:we]]
+                    file.write("".join(word) + '\n')
+                file.write("\n")
+
+
+def random_messages(prns, frames):
+    rng = np.random.default_rng(0)
+    return {prn: NavMessage(rng.integers(0, 1 << 30, size=(frames, 5, 10), dtype=np.uint32)) for prn in range(1, prns + 1)}
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench(prns=32, frames=25):
+    messages = random_messages(prns, frames)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = lambda prn, ext: os.path.join(tmp, f"G{prn:02d}.{ext}")
+        if frames == 25:
+            lists = {prn: m.to_list() for prn, m in messages.items()}
+            results["legacy_txt"] = timed(lambda: [legacy_write(path(prn, "txt"), lists[prn]) for prn in lists])
+        results["txt"] = timed(lambda: [writers.write_text(path(prn, "txt"), m) for prn, m in messages.items()])
+        results["bin"] = timed(lambda: [writers.write_binary(path(prn, "bin"), m, prn) for prn, m in messages.items()])
+        results["npy"] = timed(lambda: writers.write_npy(os.path.join(tmp, "all.npy"), {prn: (m, 0) for prn, m in messages.items()}))
+        results["npy_bytes"] = os.path.getsize(os.path.join(tmp, "all.npy"))
+    return results
+
+
+if __name__ == "__main__":
+    for frames, label in ((25, "one master frame"), (25 * 115, "one day")):
+        result = bench(frames=frames)
+        timings = " | ".join(f"{name} {seconds * 1e3:.1f} ms" for name, seconds in result.items() if name != "npy_bytes")
+        print(f"32 PRNs, {label}: {timings} | npy {result['npy_bytes'] / result['npy'] / 1e6:.0f} MB/s")
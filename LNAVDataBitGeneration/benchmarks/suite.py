@@ -0,0 +1,280 @@
+### Benchmark suite on the example data: parsing, bit encoding, subframe/frame/message generation, streaming and the
+### writers, from one PRN to all PRNs and from one frame to many master frames. Every result is compared with the
+### stored baseline and the run fails (exit code 1) when one is slower than threshold x its baseline and by more than
+### NOISE_FLOOR.
+###   python benchmarks/suite.py                        compare with benchmarks/baseline.json
+###   python benchmarks/suite.py --save                 store the results of this machine as the baseline
+###   python benchmarks/suite.py -k gen_sf -k write     only the benchmarks whose name contains gen_sf or write
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import warnings
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+EXAMPLE = os.path.join(os.path.dirname(HERE), "Example")
+
+import packing
+import writers
+from bit_generator import dec_bin, read_sem_almanac
+from constellation import ConstellationGenerator
+from ephemeris_store import EphemerisStore
+from nav_message import NavMessage
+from streaming import iter_subframes
+
+
+RINEX_FILE = os.path.join(EXAMPLE, "GODS00USA_R_20240830000_01D_GN.rnx")
+ALM_FILE = os.path.join(EXAMPLE, "gpsAlmanac.txt")
+TIME = datetime.datetime(2024, 3, 23, 2, 0, 0)
+PRN = 5
+MESSAGE = "benchmark"
+
+BASELINE = os.path.join(HERE, "baseline.json")
+THRESHOLD = 1.5
+NOISE_FLOOR = 1e-4          ### s, sub-millisecond cases move by this much with the allocator and file system state alone
+MIN_TIME = 0.2              ### Seconds of repeats per benchmark, the fastest run is kept
+MAX_REPEAT = 5000
+SAVE_ROUNDS = 5             ### A saved baseline is the median of this many measurements, not one lucky run
+
+
+class Inputs:
+    ### Everything parsed once and shared by the benchmarks
+    def __init__(self):
+        self.constellation = ConstellationGenerator(RINEX_FILE, ALM_FILE, TIME)
+        self.generators = {prn: self.constellation.generator(prn) for prn in self.constellation.prns}
+        self.messages = {prn: g.gen_message(MESSAGE) for prn, g in self.generators.items()}
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def prns(self, prns):
+        return [PRN] if prns == 1 else self.constellation.prns
+
+
+BENCHMARKS = {}
+
+
+def benchmark(**params):
+    ### Registers fn(inputs, **params) -> callable to time, once per combination of params
+    def register(fn):
+        BENCHMARKS[fn.__name__] = (fn, params)
+        return fn
+    return register
+
+
+@benchmark()
+def readRinexFile(inputs):
+    ### What Bitgenerator.readRinexFile does on its first call
+    return lambda: EphemerisStore.load(RINEX_FILE).at(TIME)
+
+
+@benchmark()
+def readSemAlmanac(inputs):
+    return lambda: read_sem_almanac(ALM_FILE)
+
+
+@benchmark()
+def dec_bin_1000(inputs):
+    values = np.random.default_rng(0).uniform(-2**-10, 2**-10, 1000).tolist()
+    return lambda: [dec_bin(value, 22, 2**-31) for value in values]
+
+
+@benchmark()
+def pack_sf2_1000(inputs):
+    ### Subframe 2 words of 1000 ephemerides in one call, fields given as arrays
+    eph = inputs.generators[PRN].sv_eph
+    values = {field.name: np.full(1000, eph.get(field.name, 0), dtype=np.float64) for field in packing.SUBFRAMES[2].fields}
+    return lambda: packing.SUBFRAMES[2].pack(values)
+
+
+@benchmark()
+def gen_word_1000(inputs):
+    generator = inputs.generators[PRN]
+    words = [dec_bin(value, 24) for value in np.random.default_rng(1).integers(0, 2**24, 1000).tolist()]
+    return lambda: [generator.gen_word(word, 1, 0) for word in words]
+
+
+@benchmark()
+def gen_p_1000(inputs):
+    generator = inputs.generators[PRN]
+    words = [dec_bin(value, 24) for value in np.random.default_rng(2).integers(0, 2**24, 1000).tolist()]
+    return lambda: [generator.gen_p(word, 0, 1) for word in words]
+
+
+def gen_subframe(subframe):
+    ### Cold: the cached subframe bodies are dropped first, so every subframe is quantized and encoded again
+    def setup(inputs, prns):
+        generators = [inputs.generators[prn] for prn in inputs.prns(prns)]
+
+        def run():
+            for generator in generators:
+                generator.clear_cache()
+                generator.gen_subframe(subframe, 18, MESSAGE)
+        return run
+    setup.__name__ = f"gen_sf{subframe}"
+    return benchmark(prns=(1, "all"))(setup)
+
+
+for _subframe in range(1, 6):
+    gen_subframe(_subframe)
+
+
+@benchmark(prns=(1, "all"))
+def gen_frame(inputs, prns):
+    generators = [inputs.generators[prn] for prn in inputs.prns(prns)]
+
+    def run():
+        for generator in generators:
+            generator.clear_cache()
+            generator.gen_frame(18, MESSAGE)
+    return run
+
+
+@benchmark(prns=(1, "all"), cache=("cold", "warm"))
+def gen_data(inputs, prns, cache):
+    generators = [inputs.generators[prn] for prn in inputs.prns(prns)]
+
+    def run():
+        for generator in generators:
+            if cache == "cold":
+                generator.clear_cache()
+            generator.gen_data(MESSAGE, packed=True)
+    return run
+
+
+@benchmark(prns=(1, "all"), master_frames=(1, 10))
+def stream(inputs, prns, master_frames):
+    ### Consecutive subframes over master_frames x 12.5 min, ephemeris switches included
+    end = TIME + datetime.timedelta(seconds=750 * master_frames)
+    store = inputs.constellation.store
+    return lambda: [sum(1 for _ in iter_subframes(store, inputs.constellation.alm, prn, TIME, end, MESSAGE))
+                    for prn in inputs.prns(prns)]
+
+
+def tiled(inputs, prns, master_frames):
+    return {prn: NavMessage(np.tile(inputs.messages[prn].words, (master_frames, 1, 1))) for prn in inputs.prns(prns)}
+
+
+@benchmark(prns=(1, "all"), master_frames=(1, 10))
+def write_txt(inputs, prns, master_frames):
+    messages = tiled(inputs, prns, master_frames)
+    path = os.path.join(inputs.tmp.name, "G%02d.txt")
+    return lambda: [writers.write_text(path % prn, message) for prn, message in messages.items()]
+
+
+@benchmark(prns=(1, "all"), master_frames=(1, 10))
+def write_bin(inputs, prns, master_frames):
+    messages = tiled(inputs, prns, master_frames)
+    path = os.path.join(inputs.tmp.name, "G%02d.bin")
+    return lambda: [writers.write_binary(path % prn, message, prn) for prn, message in messages.items()]
+
+
+@benchmark(prns=(1, "all"), master_frames=(1, 10))
+def write_npy(inputs, prns, master_frames):
+    messages = tiled(inputs, prns, master_frames)
+    path = os.path.join(inputs.tmp.name, "all.npy")
+    return lambda: writers.write_npy(path, {prn: (message, 0) for prn, message in messages.items()})
+
+
+def cases(patterns=None):
+    ### (key, fn, params) of every benchmark selected by patterns, e.g. "gen_data[prns=all,cache=cold]"
+    for name, (fn, params) in BENCHMARKS.items():
+        for values in itertools.product(*params.values()):
+            kwargs = dict(zip(params, values))
+            key = name + ("[" + ",".join(f"{k}={v}" for k, v in kwargs.items()) + "]" if kwargs else "")
+            if not patterns or any(pattern in key for pattern in patterns):
+                yield key, fn, kwargs
+
+
+def measure(fn, min_time=MIN_TIME):
+    ### Fastest of as many runs as fit in min_time (at least 3, at most MAX_REPEAT)
+    t0 = time.perf_counter()
+    fn()
+    first = time.perf_counter() - t0
+    repeat = max(3, int(min_time / max(first, 1e-6)))
+    return min([first] + timeit.repeat(fn, number=1, repeat=min(repeat, MAX_REPEAT)))
+
+
+def regressed(seconds, reference, threshold=THRESHOLD):
+    return reference is not None and seconds > threshold * reference and seconds - reference > NOISE_FLOOR
+
+
+def machine():
+    return {"node": platform.node(), "python": platform.python_version(), "numpy": np.__version__, "processor": platform.machine()}
+
+
+def run(patterns=None, baseline=None, threshold=THRESHOLD, retries=2, rounds=1):
+    ### Benchmarks slower than threshold x their baseline are measured again up to retries times before they count
+    ### as regressions, over longer and longer runs: a slow measurement is usually noise from the machine. Each result
+    ### is the median of rounds measurements
+    baseline = baseline or {}
+    results = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        inputs = Inputs()
+        try:
+            for key, fn, kwargs in cases(patterns):
+                timed = fn(inputs, **kwargs)
+                results[key] = float(np.median([measure(timed) for _ in range(rounds)]))
+                for retry in range(retries):
+                    if not regressed(results[key], baseline.get(key), threshold):
+                        break
+                    results[key] = min(results[key], measure(timed, MIN_TIME * (retry + 2)))
+        finally:
+            inputs.tmp.cleanup()
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    ### -> [(key, seconds, baseline seconds, ratio)], and the keys that regressed (see regressed)
+    rows, regressions = [], []
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        ratio = seconds / reference if reference else None
+        rows.append((key, seconds, reference, ratio))
+        if regressed(seconds, reference, threshold):
+            regressions.append(key)
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare it with the stored baseline")
+    parser.add_argument("-k", help="Only run benchmarks whose name contains this (can be repeated)", action="append", dest="patterns")
+    parser.add_argument("--save", help="Store the results as the new baseline (merged with the stored one)", action="store_true")
+    parser.add_argument("--baseline", help=f"Baseline file (default={BASELINE})", type=str, default=BASELINE)
+    parser.add_argument("--threshold", help=f"Fail when a benchmark takes more than this times its baseline, and {NOISE_FLOOR * 1e3:g} ms more (default={THRESHOLD})", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    stored = {"machine": None, "results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            stored = json.load(file)
+
+    if args.save:
+        results = run(args.patterns, rounds=SAVE_ROUNDS)
+    else:
+        results = run(args.patterns, stored["results"], args.threshold)
+    rows, regressions = compare(results, stored["results"], args.threshold)
+    for key, seconds, reference, ratio in rows:
+        versus = f"{reference * 1e3:10.3f} ms  x{ratio:.2f}" if reference else "       (no baseline)"
+        flag = "  REGRESSION" if key in regressions else ""
+        print(f"{key:45s} {seconds * 1e3:10.3f} ms  {versus}{flag}")
+
+    if stored["machine"] and stored["machine"] != machine():
+        print(f"Baseline was recorded on {stored['machine']}, this is {machine()}")
+
+    if args.save:
+        stored = {"machine": machine(), "results": dict(stored["results"], **results)}
+        with open(args.baseline, "w") as file:
+            json.dump(stored, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than x{args.threshold} (and {NOISE_FLOOR * 1e3:g} ms)")
+        sys.exit(1)
@@ -1,25 +1,39 @@
-import math
-import georinex as gr
 import datetime
 import numpy as np
-import pandas as pd
 import warnings
+import compressed
+import input_cache
+import packing
+import parity
+import records
+from layouts import xPI
+from nav_message import NavMessage
+from ephemeris_store import EphemerisStore
+from gps_time import SECS_PER_WEEK, gps_seconds
+from profiling import PROFILER
 
 
-GPS_EPOCH = datetime.datetime(1980, 1, 6, 0, 0, 0, 0)
-LEAP_SECONDS = 18
-SECS_PER_WEEK = (7 * 24 * 3600)
 MU = 3.986005E+14
 C = 2.99792458E+8
 AREF = 26559710
 J_ITER = 5
 REL_FACTOR = -2 * np.sqrt(MU) / (C*C)
-xPI = 3.1415926535898
 OmegaDotE = 7.2921151467E-5
 OmegaDotREF = -2.6E-9
 
 PREAMBLE = [1,0,0,0,1,0,1,1]
 TLM_WORD = PREAMBLE + [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,0,0,1,0]
+TLM_ENCODED = parity.bits_to_int(TLM_WORD)
+TLM_DATA = TLM_ENCODED >> 6
+
+DATA_ID = 1                                 ### Bits 1, 2 of word 3 of subframes 4, 5: LNAV data structure (per my understanding of pg.113 IS-GPS-200 August 2022)
+HOW_TOW_SHIFT = packing.HOW.shift("TOW")
+TOW_COUNTS_PER_WEEK = SECS_PER_WEEK // 6
+SUBFRAME_SECONDS = 6
+PAGES = 25
+BIT_RATE = 50
+HOW_SUBFRAME_SHIFT = packing.HOW.shift("subframe")
+DUMMY_ALMANAC_WORDS = [(DATA_ID << 22) | 0xAAAA] + [0xAAAAAA] * 6 + [0xAAAAA8]    ### Alternating 1s and 0s after the page ID
 
 def dec_bin(num, bits, scale_factor=1):
     numx = round(num / scale_factor)
@@ -49,337 +63,256 @@ def to_ascii(text):
     return letters_ascii_bin
 
 
+def read_sem_almanac(alm_file):
+    ### {"num_svs", "WNa", "toa", sv: AlmanacEntry} of a SEM almanac file, through the input cache when it's enabled
+    if input_cache.CACHE is not None:
+        return input_cache.CACHE.almanac(alm_file, lambda: parse_sem_almanac(alm_file))
+    return parse_sem_almanac(alm_file)
+
+
+def parse_sem_almanac(alm_file):
+    with PROFILER.stage("load_almanac"), compressed.open_text(alm_file) as file:
+        lines = file.readlines()
+
+    lines = [a.replace("\n", "").strip() for a in lines]
+
+    temp_list = []
+    sections = []
+    for line in lines:
+        if line == "":
+            sections.append(temp_list)
+            temp_list = []
+        else:
+            temp_list.append(line)
+    sections.append(temp_list)
+    almanac = {
+        "num_svs"   :   int(sections[0][0][:2]),
+        "WNa"       :   int(sections[0][1][:3]),
+        "toa"       :   int(sections[0][1][4:]),
+    }
+
+    sections = sections[1:]
+    for section in sections:
+        line1 = [float(x) for x in section[3].split()]
+        line2 = [float(x) for x in section[4].split()]
+        line3 = [float(x) for x in section[5].split()]
+        sv_alm = records.AlmanacEntry(
+            id          =   int(section[0]),
+            SVID        =   int(section[1]),
+            URA         =   int(section[2]),
+            e           =   line1[0],
+            delta_i     =   line1[1],
+            OmegaDot    =   line1[2],
+            sqrtA       =   line2[0],
+            Omega0      =   line2[1],
+            omega       =   line2[2],
+            M0          =   line3[0],
+            Af0         =   line3[1],
+            Af1         =   line3[2],
+            health      =   int(section[6]),
+            config      =   int(section[7]),
+        )
+        almanac["G%02d" % sv_alm.id] = sv_alm
+    
+    return almanac
+
+
 
 class Bitgenerator:
     def __init__(self, rinex_file,alm_file, time, prn) -> None:
         self.sv = "G%02d" % prn
         self.time = time
 
+        ### rinex_file can also be an EphemerisStore that was already built, or the ephemerides already selected at time
+        ### ({sv: eph}), and alm_file an almanac returned by readSemAlmanac, so they're parsed only once for many times/PRNs
         self.rinex_file = rinex_file
-        self.eph = self.readRinexFile()
-        self.sv_eph = self.eph[self.sv]
+        self.store = rinex_file if isinstance(rinex_file, EphemerisStore) else None
+        self.eph = rinex_file if isinstance(rinex_file, dict) else self.readRinexFile()
+        self.sv_eph = records.Ephemeris.from_mapping(self.eph[self.sv])
 
         self.alm_file = alm_file
-        self.alm = self.readSemAlmanac()
+        self.alm = records.as_almanac(alm_file) if isinstance(alm_file, dict) else self.readSemAlmanac()
         
-        self.how_tow = round(self.sv_eph["TransTime"] / 6)
+        ### TransTime is counted from the week of the Toe, it's negative for an ephemeris sent just before a rollover
+        self.how_tow = round(self.sv_eph.TransTime / 6) % TOW_COUNTS_PER_WEEK
 
+        ### Encoded words 3 - 10 of subframes that don't change between frames, see encoded_subframe
+        self.eph_cache = {}
+        self.alm_cache = {}
 
-    def readSemAlmanac(self):
-        with open(self.alm_file, "r") as file:
-            lines = file.readlines()
-
-        lines = [a.replace("\n", "").strip() for a in lines]
-
-        temp_list = []
-        sections = []
-        for line in lines:
-            if line == "":
-                sections.append(temp_list)
-                temp_list = []
-            else:
-                temp_list.append(line)
-        sections.append(temp_list)
-        almanac = {
-            "num_svs"   :   int(sections[0][0][:2]),
-            "WNa"       :   int(sections[0][1][:3]),
-            "toa"       :   int(sections[0][1][4:]),
-        }
 
-        sections = sections[1:]
-        for section in sections:
-            line1 = [float(x) for x in section[3].split()]
-            line2 = [float(x) for x in section[4].split()]
-            line3 = [float(x) for x in section[5].split()]
-            sv_alm = {
-                "id"        :   int(section[0]),
-                "SVID"      :   int(section[1]),
-                "URA"       :   int(section[2]),
-                "e"         :   line1[0],
-                "delta_i"   :   line1[1],
-                "OmegaDot"  :   line1[2],
-                "sqrtA"     :   line2[0],
-                "Omega0"    :   line2[1],
-                "omega"     :   line2[2],
-                "M0"        :   line3[0],
-                "Af0"       :   line3[1],
-                "Af1"       :   line3[2],
-                "health"    :   int(section[6]),
-                "config"    :   int(section[7]),   
-            } 
-            almanac["G%02d" % sv_alm["id"]] = sv_alm
-        
-        return almanac
+    def set_time(self, time):
+        ### Selects the ephemerides valid at a new time without reloading the RINEX file
+        sv_eph = self.sv_eph
+        self.time = time
+        self.eph = self.readRinexFile()
+        self.sv_eph = records.Ephemeris.from_mapping(self.eph[self.sv])
+        self.how_tow = round(self.sv_eph.TransTime / 6) % TOW_COUNTS_PER_WEEK
+        if self.sv_eph != sv_eph and sv_eph.IODE == self.sv_eph.IODE:      ### Same IODE with new data, the cache key can't tell
+            self.eph_cache.clear()
+
+
+    def set_almanac(self, alm):
+        self.alm = records.as_almanac(alm)
+        self.alm_cache.clear()
+
+
+    def clear_cache(self):
+        ### Has to be called after self.sv_eph or self.alm were modified in place
+        self.eph_cache.clear()
+        self.alm_cache.clear()
+
+
+    def readSemAlmanac(self):
+        return read_sem_almanac(self.alm_file)
 
 
     def readRinexFile(self):
-        rinex_nav_file = gr.load(self.rinex_file)
-        user_tx = pd.Timestamp(datetime.datetime.strftime(self.time, "%Y-%m-%d %H:%M:%S")) 
-
-        eph = {}
-
-        # Load ephemeris for all space vehicles at user time
-        for svn in range(1,33):
-            sv_prn = "G%02d" % svn
-            eph_t = rinex_nav_file.sel(sv=sv_prn, time=user_tx)
-            # n=0
-            # while math.isnan(eph_t.isel(time=n)["IODE"]):
-            #     n+=1
-            # eph_t = eph_t.isel(time=n)
-            iode = float(eph_t["IODE"]) 
-            toc = (user_tx - GPS_EPOCH).total_seconds() % SECS_PER_WEEK + LEAP_SECONDS
-            if math.isnan(iode):
-                # print("PRN not found: ", sv_prn)
-                continue
-            else:
-                
-                keyx = list(eph_t.keys())
-                eph_x = {
-                    "Af0"           :   float(eph_t["SVclockBias"]),
-                    "Af1"           :   float(eph_t["SVclockDrift"]),
-                    "Af2"           :   float(eph_t["SVclockDriftRate"]),
-                    "toc"           :   toc,
-                    "C_rs"          :   float(eph_t[keyx[4]]),
-                    "Delta_n"       :   float(eph_t[keyx[5]]),
-                    "M0"            :   float(eph_t[keyx[6]]),
-                    "C_uc"          :   float(eph_t[keyx[7]]), 
-                    "e"             :   float(eph_t[keyx[8]]),
-                    "C_us"          :   float(eph_t[keyx[9]]),
-                    "sqrtA"         :   float(eph_t[keyx[10]]),
-                    "toe"           :   float(eph_t["Toe"]),
-                    "C_ic"          :   float(eph_t[keyx[12]]),
-                    "Omega"         :   float(eph_t[keyx[13]]),
-                    "C_is"          :   float(eph_t[keyx[14]]),
-                    "i0"            :   float(eph_t[keyx[15]]),
-                    "C_rc"          :   float(eph_t[keyx[16]]),
-                    "omega"         :   float(eph_t[keyx[17]]),
-                    "OmegaDot"      :   float(eph_t[keyx[18]]),
-                    "IDOT"          :   float(eph_t[keyx[19]]),
-                    "GPSWeek"       :   float(eph_t[keyx[21]]),
-                    "IODE"          :   iode,
-                    "IODC"          :   float(eph_t["IODC"]),
-                    "L2PDataFlag"   :   float(eph_t["L2Pflag"]),
-                    "L2ChannelCode" :   float(eph_t["CodesL2"]),
-                    "SVAcc"         :   float(eph_t["SVacc"]),
-                    "health"        :   float(eph_t["health"]),
-                    "TGD"           :   float(eph_t["TGD"]),
-                    "GPSWeek"       :   float(eph_t["GPSWeek"]),
-                    "FitInterval"   :   float(eph_t["FitIntvl"]),
-                    "TransTime"     :   float(eph_t["TransTime"]),
-                }
-                eph[sv_prn] = eph_x
-        
+        if self.store is None:
+            with PROFILER.stage("load_rinex"):
+                self.store = EphemerisStore.load(self.rinex_file)
+
+        # Ephemeris every space vehicle is transmitting at user time (see EphemerisStore.broadcast), so the stream
+        # gen_message starts at its TransTime doesn't start after user time
+        with PROFILER.stage("select_ephemerides"):
+            eph = self.store.broadcast_at(self.time)
+        PROFILER.count("svs_loaded", len(eph))
         return eph
-    
 
-    def gen_word(self, bits, D30_star, D29_star):
-        parity_bits = self.gen_p(bits, D29_star=D29_star, D30_star=D30_star)
-
-        if D30_star == 1:
-            return (np.bitwise_not(bits) + 2).tolist() + parity_bits
 
-        return bits + parity_bits
+    def gen_word(self, bits, D30_star, D29_star):
+        word = parity.encode_word(parity.bits_to_int(bits), D29_star=D29_star, D30_star=D30_star)
+        return parity.int_to_bits(word, 30)
 
 
     def gen_t(self, bits1_22, D29_star, D30_star):
-        # if D30_star == 1:
-        #     bits1_22 = np.bitwise_not(bits1_22) + 2
-        tmp_D29 = D30_star ^ bits1_22[0] ^ bits1_22[2] ^ bits1_22[4] ^ bits1_22[5] ^ bits1_22[6] ^ bits1_22[8] ^ bits1_22[9] ^ bits1_22[13] ^ bits1_22[14] ^ bits1_22[15] ^ bits1_22[16] ^ bits1_22[17] ^ bits1_22[20] ^ bits1_22[21]  
-        d24 = tmp_D29
-        tmp_D30 = D29_star ^ bits1_22[2] ^ bits1_22[4] ^ bits1_22[5] ^ bits1_22[7] ^ bits1_22[8] ^ bits1_22[9] ^ bits1_22[10] ^ bits1_22[12] ^ bits1_22[14] ^ bits1_22[18] ^ bits1_22[21] ^ d24
-        d23 = tmp_D30
-        return [d23, d24] 
+        return parity.int_to_bits(parity.solve_t(parity.bits_to_int(bits1_22), D29_star, D30_star), 2)
 
 
     def gen_p(self, bits_1_24, D29_star, D30_star):
-        # if D30_star == 1:
-        #     bits_1_24 = np.bitwise_not(bits_1_24)
-        #     bits_1_24 += 2
-        D25 = D29_star ^ bits_1_24[0] ^ bits_1_24[1] ^ bits_1_24[2] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[9] ^ bits_1_24[10] ^ bits_1_24[11] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[16] ^ bits_1_24[17] ^ bits_1_24[19] ^ bits_1_24[22]
-        D26 = D30_star ^ bits_1_24[1] ^ bits_1_24[2] ^ bits_1_24[3] ^ bits_1_24[5] ^ bits_1_24[6] ^ bits_1_24[10] ^ bits_1_24[11] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[17] ^ bits_1_24[18] ^ bits_1_24[20] ^ bits_1_24[23]
-        D27 = D29_star ^ bits_1_24[0] ^ bits_1_24[2] ^ bits_1_24[3] ^ bits_1_24[4] ^ bits_1_24[6] ^ bits_1_24[7] ^ bits_1_24[11] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[15] ^ bits_1_24[18] ^ bits_1_24[19] ^ bits_1_24[21]
-        D28 = D30_star ^ bits_1_24[1] ^ bits_1_24[3] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[7] ^ bits_1_24[8] ^ bits_1_24[12] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[15] ^ bits_1_24[16] ^ bits_1_24[19] ^ bits_1_24[20] ^ bits_1_24[22]
-        D29 = D30_star ^ bits_1_24[0] ^ bits_1_24[2] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[6] ^ bits_1_24[8] ^ bits_1_24[9] ^ bits_1_24[13] ^ bits_1_24[14] ^ bits_1_24[15] ^ bits_1_24[16] ^ bits_1_24[17] ^ bits_1_24[20] ^ bits_1_24[21] ^ bits_1_24[23]
-        D30 = D29_star ^ bits_1_24[2] ^ bits_1_24[4] ^ bits_1_24[5] ^ bits_1_24[7] ^ bits_1_24[8] ^ bits_1_24[9] ^ bits_1_24[10] ^ bits_1_24[12] ^ bits_1_24[14] ^ bits_1_24[18] ^ bits_1_24[21] ^ bits_1_24[22] ^ bits_1_24[23]
+        return parity.int_to_bits(parity.parity(parity.bits_to_int(bits_1_24), D29_star, D30_star), 6)
+
 
-        return [D25, D26, D27, D28, D29, D30]
+    def how_word(self, subframe, frame, how_tow=None):
+        ### Source data of word 2, how_tow overrides the TOW count otherwise derived from self.how_tow and the frame.
+        ### Bits 23, 24 are left 0 for the parity encoder to solve for, the alert and anti-spoof flags are 0
+        if how_tow is None:
+            how_tow = (self.how_tow + (frame - 1) * 5 + subframe) % TOW_COUNTS_PER_WEEK
+        if not 0 <= how_tow < 2**17:
+            raise ValueError(f"{how_tow} is too large to be represented in 17 bits")
+        return (how_tow << HOW_TOW_SHIFT) | (subframe << HOW_SUBFRAME_SHIFT)
+
+
+    def how_data(self, subframe, frame):
+        return dec_bin(self.how_word(subframe, frame), bits=24)
 
 
     def gen_how(self, subframe, frame):
-        how_tow = self.how_tow + (frame - 1) * 5 + subframe 
-        how_tow_bin = dec_bin(how_tow, bits=17)
-        alert_flag = [0]
-        as_flag = [0]
-        sf_id = dec_bin(subframe, bits=3)
-        bits_1_22 = how_tow_bin + alert_flag + as_flag + sf_id
+        bits_1_22 = self.how_data(subframe, frame)[:22]
         bits_23_24 = self.gen_t(bits1_22=bits_1_22, D29_star=TLM_WORD[-2], D30_star=TLM_WORD[-1])
         bits_1_24 = bits_1_22 + bits_23_24
         how = self.gen_word(bits_1_24, D29_star=TLM_WORD[-2], D30_star=TLM_WORD[-1])
         return how
     
 
-    def gen_sv_health(self, prn):
+    def sv_health(self, prn):
+        sv = "G%02d" % prn
+        return self.alm[sv].health if sv in self.alm else 63
+
 
+    def sv_config(self, prn):
         sv = "G%02d" % prn
-        sv_health = self.alm[sv]["health"] if sv in self.alm else 63
-        return dec_bin(sv_health, bits=6)
+        return self.alm[sv].config if sv in self.alm else 15
+
+
+    def gen_sv_health(self, prn):
+        return dec_bin(self.sv_health(prn), bits=6)
 
 
     def gen_sv_config(self, prn):
-        sv = "G%02d" % prn
-        sv_config = self.alm[sv]["config"] if sv in self.alm else 15
-        return dec_bin(sv_config, bits=4)
+        return dec_bin(self.sv_config(prn), bits=4)
 
 
-    def gen_alm_sv(self, prn, how):
-        data_id = [0, 1]
+    def alm_sv_data(self, prn):
+        ### Words 3 - 10 of an almanac page (subframe 4 pages 2-5, 7-10 and subframe 5 pages 1-24)
         sv = "G%02d" % prn
 
         if sv not in self.alm:
-            sv_id = [0] * 6
-            dummy_data_w3 = self.gen_word(data_id + sv_id +[1,0] * 8, D29_star=how[-2], D30_star=how[-1])
-            dummy_data_w4_9 = self.gen_word([1,0]*12, D29_star=dummy_data_w3[-2], D30_star=dummy_data_w3[-1]) * 6
-            dummy_data_w10 = self.gen_word([1,0]*11 + self.gen_t([1,0]*11, D29_star=dummy_data_w4_9[-2], D30_star=dummy_data_w4_9[-1]), D29_star=dummy_data_w4_9[-2], D30_star=dummy_data_w4_9[-1])
-            dummy_data = dummy_data_w3 + dummy_data_w4_9 + dummy_data_w10
             warnings.warn(f"{sv} isn't available in the almanac. Dummy data was filled in its place") 
-            return TLM_WORD + how + dummy_data 
+            PROFILER.count("dummy_pages")
+            return DUMMY_ALMANAC_WORDS
         
-        sv_id = dec_bin(prn, bits=6)
-        # sv_id = dec_bin(self.alm[sv]["SVID"], bits=6)
-
-        e = dec_bin(self.alm[sv]["e"], bits=16, scale_factor=2**-21)
-        toa = dec_bin(self.alm["toa"], bits=8, scale_factor=2**12)
-        di = dec_bin(self.alm[sv]["delta_i"] , bits=16, scale_factor=2**-19)
-        OmegaDot = dec_bin(self.alm[sv]["OmegaDot"] , bits=16, scale_factor=2**-38)
-        sv_health = dec_bin(self.alm[sv]["health"], bits=8)
-        sv_health = [0] * 3 + sv_health[3:]
-        sqrtA = dec_bin(self.alm[sv]["sqrtA"], bits=24, scale_factor=2**-11)
-        Omega0 = dec_bin(self.alm[sv]["Omega0"] , bits=24, scale_factor=2**-23)
-        omega= dec_bin(self.alm[sv]["omega"] , bits=24, scale_factor=2**-23)
-        m0 = dec_bin(self.alm[sv]["M0"] , bits=24, scale_factor=2**-23)
-        af0 = dec_bin(self.alm[sv]["Af0"], bits=11, scale_factor=2**-20)
-        af1 = dec_bin(self.alm[sv]["Af1"], bits=11, scale_factor=2**-38)
-
-        w3 = self.gen_word(data_id + sv_id + e, D29_star=how[-2], D30_star=how[-1])
-        w4 = self.gen_word(toa + di, D29_star=w3[-2], D30_star=w3[-1])
-        w5 = self.gen_word(OmegaDot + sv_health, D29_star=w4[-2], D30_star=w4[-1])
-        w6 = self.gen_word(sqrtA, D29_star=w5[-2], D30_star=w5[-1])
-        w7 = self.gen_word(Omega0, D29_star=w6[-2], D30_star=w6[-1])
-        w8 = self.gen_word(omega, D29_star=w7[-2], D30_star=w7[-1])
-        w9 = self.gen_word(m0, D29_star=w8[-2], D30_star=w8[-1])
-        
-        w10 = self.gen_word(af0[:8] + af1 + af0[8:] + self.gen_t(af0[:8] + af1 + af0[8:], D29_star=w9[-2], D30_star=w9[-1]), D29_star=w9[-2], D30_star=w9[-1])
-
-        return TLM_WORD + how + w3 + w4 + w5 + w6 + w7 + w8 + w9 + w10
+        sv_alm = self.alm[sv]
+        values = {
+            "data_id"   :   DATA_ID,
+            "sv_id"     :   prn,                ### Not sv_alm.SVID
+            "e"         :   sv_alm.e,
+            "toa"       :   self.alm["toa"],
+            "delta_i"   :   sv_alm.delta_i,
+            "OmegaDot"  :   sv_alm.OmegaDot,
+            "health"    :   sv_alm.health & 0x1F,       ### The 3 NAV data health bits are sent as 0
+            "sqrtA"     :   sv_alm.sqrtA,
+            "Omega0"    :   sv_alm.Omega0,
+            "omega"     :   sv_alm.omega,
+            "M0"        :   sv_alm.M0,
+            "Af0"       :   sv_alm.Af0,
+            "Af1"       :   sv_alm.Af1,
+        }
+        return packing.PAGES[prn].pack(values)[2:]
     
 
-    def gen_sf1(self, frame):                                   
-        how = self.gen_how(subframe=1, frame=frame)
-
-        gps_week_bin = dec_bin(int(self.sv_eph["GPSWeek"]) % 1024, bits=10)
-        w3_bits_11_22 = dec_bin(self.sv_eph["L2ChannelCode"], bits=2) + [0] * 10
-        IODC = dec_bin(self.sv_eph["IODC"], bits=10)
-        w3_bits_1_24 = gps_week_bin + w3_bits_11_22 + IODC[:2]
-        w3 = self.gen_word(w3_bits_1_24, D29_star=how[-2], D30_star=how[-1])
-
-        w4_bits_1_24 = [int(self.sv_eph["L2PDataFlag"])] + [0] * 23
-        w4 = self.gen_word(bits=w4_bits_1_24, D29_star=w3[-2], D30_star= w3[-1])
-
-        w5 = self.gen_word([0] * 24, D29_star=w4[-2], D30_star=w4[-1])
-
-        w6 = self.gen_word([0] * 24, D29_star=w5[-2], D30_star=w5[-1])
-
-        w7_bits_1_24 = [0] * 16 + dec_bin(self.sv_eph["TGD"], bits=8, scale_factor=2**-31)
-        w7 = self.gen_word(bits=w7_bits_1_24, D29_star=w6[-2], D30_star= w6[-1])
-
-        w8_bits_1_24 = IODC[2:] + dec_bin(self.sv_eph["toc"], bits=16, scale_factor= 2**4)
-        w8 = self.gen_word(bits=w8_bits_1_24, D29_star=w7[-2], D30_star= w7[-1])
-
-        af2_bin = dec_bin(self.sv_eph["Af2"], bits=8,scale_factor=2**-55)
-        af1_bin = dec_bin(self.sv_eph["Af1"], bits=16, scale_factor=2**-43)
-        af0_bin = dec_bin(self.sv_eph["Af0"], bits=22, scale_factor=2**-31)
-        w9 = self.gen_word(af2_bin + af1_bin, D29_star=w8[-2], D30_star=w8[-1])
-
-        w10_bits_1_24 = af0_bin + self.gen_t(af0_bin, D29_star=w9[-2], D30_star=w9[-1])
-        w10 = self.gen_word(bits=w10_bits_1_24, D29_star=w9[-2], D30_star= w9[-1])
-
-        return TLM_WORD + how + w3 + w4 + w5 + w6 + w7 + w8 + w9 + w10    
-
-
-    def gen_sf2(self, frame):
-        how = self.gen_how(subframe=2, frame=frame)
-
-        w3_bits_1_24 = dec_bin(self.sv_eph["IODE"], bits=8) + dec_bin(self.sv_eph["C_rs"], bits=16, scale_factor=2**-5)
-        w3 = self.gen_word(bits= w3_bits_1_24, D29_star=how[-2], D30_star=how[-1])
-
-        m0 = dec_bin(self.sv_eph["M0"] / xPI, bits=32, scale_factor=2**-31)
-        w4_bits_1_24 = dec_bin(self.sv_eph["Delta_n"] / xPI, bits= 16, scale_factor=2**-43) + m0[:8]
-        w4 = self.gen_word(w4_bits_1_24, D29_star=w3[-2], D30_star=w3[-1])
-
-        w5_bits_1_24 = m0[8:]
-        w5 = self.gen_word(w5_bits_1_24, D29_star=w4[-2], D30_star=w4[-1])
-
-        e = dec_bin(self.sv_eph["e"], bits=32, scale_factor=2**-33)
-        w6_bits_1_24 = dec_bin(self.sv_eph["C_uc"], bits=16, scale_factor=2**-29) + e[:8]
-        w6 = self.gen_word(w6_bits_1_24, D29_star= w5[-2], D30_star=w5[-1])
-
-        w7_bits_1_24 = e[8:]
-        w7 = self.gen_word(w7_bits_1_24, D29_star=w6[-2], D30_star=w6[-1])
-
-        sqrtA = dec_bin(self.sv_eph["sqrtA"], bits=32, scale_factor=2**-19)
-        w8_bits_1_24 = dec_bin(self.sv_eph["C_us"], bits=16, scale_factor=2**-29) + sqrtA[:8]
-        w8 = self.gen_word(w8_bits_1_24, D29_star=w7[-2], D30_star=w7[-1])
-
-        w9_bits_1_24 = sqrtA[8:]
-        w9 = self.gen_word(w9_bits_1_24, D29_star=w8[-2], D30_star=w8[-1])
-
-        w10_bits_1_16 = dec_bin(self.sv_eph["toe"], bits=16, scale_factor=2**4)
-        fit_flag = [1] if self.sv_eph["FitInterval"] > 4 else [0]
-        AODO = 0 #TODO: Look for what it is upposed to be, 0 is just a place holder.
-        AODO_bin = dec_bin(AODO, bits=5, scale_factor=900)
-        w10_bits_1_22 = w10_bits_1_16 + fit_flag + AODO_bin
-        w10_bits_1_24 = w10_bits_1_22 + self.gen_t(w10_bits_1_22, D29_star=w9[-2], D30_star=w9[-1])
-        w10 = self.gen_word(w10_bits_1_24, D29_star=w9[-2], D30_star=w9[-1])
-
-        return TLM_WORD + how + w3 + w4 + w5 + w6 + w7 + w8 + w9 + w10   
+    def sf1_data(self, frame):                                   
+        ### URA and the SV health (word 3 bits 13 - 22) are sent as 0
+        eph = self.sv_eph
+        values = {
+            "GPSWeek"       :   int(eph.GPSWeek) % 1024,
+            "L2ChannelCode" :   eph.L2ChannelCode,
+            "IODC"          :   eph.IODC,
+            "L2PDataFlag"   :   int(eph.L2PDataFlag),
+            "TGD"           :   eph.TGD,
+            "toc"           :   eph.toc,
+            "Af2"           :   eph.Af2,
+            "Af1"           :   eph.Af1,
+            "Af0"           :   eph.Af0,
+        }
+        return [TLM_DATA, self.how_word(1, frame)] + packing.SUBFRAMES[1].pack(values)[2:]
+
+
+    def sf2_data(self, frame):
+        eph = self.sv_eph
+        values = {
+            "IODE"          :   eph.IODE,
+            "C_rs"          :   eph.C_rs,
+            "Delta_n"       :   eph.Delta_n,
+            "M0"            :   eph.M0,
+            "C_uc"          :   eph.C_uc,
+            "e"             :   eph.e,
+            "C_us"          :   eph.C_us,
+            "sqrtA"         :   eph.sqrtA,
+            "toe"           :   eph.toe,
+            "FitFlag"       :   1 if eph.FitInterval > 4 else 0,
+            "AODO"          :   0,          #TODO: Look for what it is upposed to be, 0 is just a place holder.
+        }
+        return [TLM_DATA, self.how_word(2, frame)] + packing.SUBFRAMES[2].pack(values)[2:]
     
 
-    def gen_sf3(self, frame):
-        how = self.gen_how(subframe=3, frame=frame)
-        
-        Omega0 = dec_bin(self.sv_eph["Omega"] / xPI, bits=32, scale_factor=2**-31)
-        w3_bits_1_24 = dec_bin(self.sv_eph["C_ic"], bits=16, scale_factor=2**-29) + Omega0[:8]
-        w3 = self.gen_word(w3_bits_1_24, D29_star=how[-2], D30_star=how[-1])
-
-        w4_bits_1_24 = Omega0[8:]
-        w4 = self.gen_word(w4_bits_1_24, D29_star=w3[-2], D30_star=w3[-1])
-
-        i0 = dec_bin(self.sv_eph["i0"] / xPI, bits=32, scale_factor=2**-31)
-        w5_bits_1_24 = dec_bin(self.sv_eph["C_is"], bits=16, scale_factor=2**-29) + i0[:8]
-        w5 = self.gen_word(w5_bits_1_24, D29_star=w4[-2], D30_star=w4[-1])
-
-        w6_bits_1_24 = i0[8:]
-        w6 = self.gen_word(w6_bits_1_24, D29_star=w5[-2], D30_star=w5[-1])
-
-        omega = dec_bin(self.sv_eph["omega"] / xPI, bits=32, scale_factor=2**-31)
-        w7_bits_1_24 = dec_bin(self.sv_eph["C_rc"], bits=16, scale_factor=2**-5) + omega[:8]
-        w7 = self.gen_word(w7_bits_1_24, D29_star=w6[-2], D30_star=w6[-1])
-
-        w8_bits_1_24 = omega[8:]
-        w8 = self.gen_word(w8_bits_1_24, D29_star=w7[-2], D30_star=w7[-1])
-
-        w9_bits_1_24 = dec_bin(self.sv_eph["OmegaDot"] / xPI, bits=24, scale_factor=2**-43)
-        w9 = self.gen_word(w9_bits_1_24, D29_star=w8[-2], D30_star=w8[-1])
-
-        w10_bits_1_22 = dec_bin(self.sv_eph["IODE"], bits=8) + dec_bin(self.sv_eph["IDOT"] / xPI, bits=14, scale_factor=2**-43) 
-        w10_bits_1_24 = w10_bits_1_22 + self.gen_t(w10_bits_1_22, D29_star=w9[-2], D30_star=w9[-1])
-        w10 = self.gen_word(w10_bits_1_24, D29_star=w9[-2], D30_star=w9[-1])
-
-        return TLM_WORD + how + w3 + w4 + w5 + w6 + w7 + w8 + w9 + w10   
+    def sf3_data(self, frame):
+        eph = self.sv_eph
+        values = {
+            "C_ic"          :   eph.C_ic,
+            "Omega"         :   eph.Omega,
+            "C_is"          :   eph.C_is,
+            "i0"            :   eph.i0,
+            "C_rc"          :   eph.C_rc,
+            "omega"         :   eph.omega,
+            "OmegaDot"      :   eph.OmegaDot,
+            "IODE"          :   eph.IODE,
+            "IDOT"          :   eph.IDOT,
+        }
+        return [TLM_DATA, self.how_word(3, frame)] + packing.SUBFRAMES[3].pack(values)[2:]
 
 
-    def gen_sf4(self, frame, message="No message sent"):
-        data_id = [0,1]                             ### Used to indicate data structure, which is LNAV here. (per my understanding of pg.113 IS-GPS-200 August 2022)
+    def sf4_data(self, frame, message="No message sent"):
         reserved_pages = {                          ### Refer to pg. 113 IS-GPS-200,, August 2022
             1   :   57,
             6   :   57,
@@ -396,214 +329,195 @@ class Bitgenerator:
             24  :   62,
         }
 
-        how = self.gen_how(subframe=4, frame=frame)
+        how = self.how_word(4, frame)
 
         if frame in reserved_pages:
-            sv_id = dec_bin(reserved_pages[frame], bits=6)
-            w3 = self.gen_word( data_id + sv_id + [0] * 16, D29_star=how[-2], D30_star=how[-1])
-
-            w4_9 = self.gen_word([0] * 24, D29_star=w3[-2], D30_star=w3[-1])
-            for i in range(5):
-                w4_9 += self.gen_word([0] * 24, D29_star=w4_9[-2], D30_star=w4_9[-1])
-            
-            w10_bits_1_24 =[0] * 22 + self.gen_t([0] * 22, D29_star=w4_9[-2], D30_star=w4_9[-1])
-            w10 = self.gen_word(w10_bits_1_24, D29_star=w4_9[-2], D30_star=w4_9[-1])
-
-            return TLM_WORD + how + w3 + w4_9 + w10
+            return [TLM_DATA, how] + packing.PAGE_ID.pack({"data_id": DATA_ID, "sv_id": reserved_pages[frame]})[2:]
         
         elif frame == 13:                ### This frame contains the NMCT(Navigation Message Correction Table)
-            sv_id = dec_bin(52, bits=6)
-            av_indicator = [0, 0]        ### These 2 bits are the availability indicators for the NMCT. Since I couldn't find it in a Rinex file, I will set it to all zeros. See pg. 123 IS-GPS-200, August 2022
-
-            w3 = self.gen_word( data_id + sv_id + av_indicator + [0] * 14, D29_star=how[-2], D30_star=how[-1])
-
-            w4_9 = self.gen_word([0] * 24, D29_star=w3[-2], D30_star=w3[-1])
-            for i in range(5):
-                w4_9 += self.gen_word([0] * 24, D29_star=w4_9[-2], D30_star=w4_9[-1])
-            
-            w10_bits_1_24 =[0] * 22 + self.gen_t([0] * 22, D29_star=w4_9[-2], D30_star=w4_9[-1])
-            w10 = self.gen_word(w10_bits_1_24, D29_star=w4_9[-2], D30_star=w4_9[-1])
-
-            return TLM_WORD + how + w3 + w4_9 + w10
+            ### The 2 availability indicator bits of the NMCT are left 0, since I couldn't find it in a Rinex file. See pg. 123 IS-GPS-200, August 2022
+            return [TLM_DATA, how] + packing.PAGE_ID.pack({"data_id": DATA_ID, "sv_id": 52})[2:]
         
-        elif frame == 17:           ### This frame contains a special messagede coded in ASCII
-            sv_id = dec_bin(55, bits = 6)
-
-            message = to_ascii(message)
-
-            w3_9 = self.gen_word(data_id + sv_id + message[:16], D29_star=how[-2], D30_star=how[-1])
-
-            for i in range(6):
-                w3_9 += self.gen_word(message[(24 * i) + 16 : (24 * (i + 1) + 16)], D29_star=w3_9[-2], D30_star=w3_9[-1])
-
-            w10_bits_1_22 = message[160:] + [0] * 6
-            w10_bits_1_24 = w10_bits_1_22 + self.gen_t(w10_bits_1_22, D29_star=w3_9[-2], D30_star=w3_9[-1])
-            w10 = self.gen_word(w10_bits_1_24, D29_star=w3_9[-2], D30_star=w3_9[-1])
-
-            return TLM_WORD + how + w3_9 + w10
+        elif frame == 17:           ### This frame contains a special messagede coded in ASCII, cut or padded with spaces to 22 characters
+            values = {f"char{i}": ord(letter) for i, letter in enumerate(message[:22].ljust(22))}
+            values.update({"data_id": DATA_ID, "sv_id": 55})
+            return [TLM_DATA, how] + packing.PAGES[55].pack(values)[2:]
         
         elif frame == 18:           ### This frame contains Iono parameters, they're not available in every rinex navigation file.
             ############################ Description of these parameters is given in pg.125-128 IS-GPS-200, August 2022 #####################################
-            alpha0 = alpha1 = alpha2 = alpha3 = [0] * 8     ### Not provided in current RINEX file we are using, 0 used
-            beta0 = beta1 = beta2 = beta3 = [0] * 8         ### Not provided in current RINEX file we are using, 0 used
-            A0 = 0                                          ### Not provided in current RINEX file we are using, 0 used
-            A1 = 0                                          ### Not provided in current RINEX file we are using, 0 used
-            Dt_LS = 18                                      ### Not provided in current RINEX file we are using, 0 used
-            tot = 0                                         ### Not provided in current RINEX file we are using, 0 used
+            ### alpha0 - 3, beta0 - 3, A0, A1 and tot aren't provided in current RINEX file we are using, 0 used
             WNt = 2149 % 256              ### Not sure about this
-            WN_LSF = WNt % 256                              ### Not sure about this
-            DN = 1                                          ### Not sure about this
-            Dt_LSF = 18                                     ### Not sure about this
-            ############################# Word Generation Algorithm ###########################################################################################
-            sv_id = dec_bin(56, bits=6)
-            w3 = self.gen_word( data_id + sv_id + alpha0 + alpha1, D29_star=how[-2], D30_star=how[-1])
-
-            w4 = self.gen_word(alpha2 + alpha3 + beta0, D29_star=w3[-2], D30_star=w3[-1])
-
-            w5 = self.gen_word(beta1 + beta2 + beta3, D29_star=w4[-2], D30_star=w4[-1])
-
-            w6 = self.gen_word(dec_bin(A1, bits=24, scale_factor=2**-50), D29_star=w5[-2], D30_star=w5[-1])
-
-            A0_bin = dec_bin(A0, bits=32, scale_factor= 2**-30)
-            w7 = self.gen_word(A0_bin[:24], D29_star=w6[-2], D30_star=w6[-1])
-
-            w8 = self.gen_word(A0_bin[24:] + dec_bin(tot, bits=8, scale_factor=2**12) + dec_bin(WNt, bits = 8), D29_star=w7[-2], D30_star=w7[-1])
-
-            w9 = self.gen_word(dec_bin(Dt_LS, bits=8) + dec_bin(WN_LSF,bits=8) + dec_bin(DN, bits=8), D29_star=w8[-2], D30_star=w8[-1])
-
-            w10_bits_1_22 = dec_bin(Dt_LSF, bits=8) + [0] * 14
-            w10 = self.gen_word(w10_bits_1_22 + self.gen_t(w10_bits_1_22, D29_star=w9[-2], D30_star=w9[-1]), D29_star=w9[-2], D30_star=w9[-1])
-
-            return TLM_WORD + how + w3 + w4 + w5 + w6 + w7 + w8 + w9 + w10
+            values = {
+                "data_id"   :   DATA_ID,
+                "sv_id"     :   56,
+                "WNt"       :   WNt,
+                "Dt_LS"     :   18,
+                "WN_LSF"    :   WNt % 256,      ### Not sure about this
+                "DN"        :   1,              ### Not sure about this
+                "Dt_LSF"    :   18,             ### Not sure about this
+            }
+            return [TLM_DATA, how] + packing.PAGES[56].pack(values)[2:]
         
-        elif frame == 25:
-            sv_id = dec_bin(63, bits=6)
-            w3_bits_1_24 = data_id + sv_id
-            for i in range(1, 5):
-                as_config = self.gen_sv_config(i)
-                w3_bits_1_24 += as_config
-            
-            w3_8 = self.gen_word(w3_bits_1_24, D29_star=how[-2], D30_star=how[-1])
-
-            for i in range(5):
-                bits_1_24 = []
-                for n in range(6):
-                    prn = 5 + n + i * 6 
-                    if prn <= 32:
-                        as_config = self.gen_sv_config(prn)
-                    else:
-                        sys_bits = [0] * 2
-                        bits_1_24 += sys_bits + self.gen_sv_health(25)
-                        break
-                    bits_1_24 += as_config
-                w3_8 += self.gen_word(bits_1_24, D29_star=w3_8[-2], D30_star=w3_8[-1])
-            
-            sv_healths = []
-            for i in range(7):
-                sv_healths += self.gen_sv_health(26 + i)
-            
-            w9 = self.gen_word(sv_healths[:24], D29_star=w3_8[-2], D30_star=w3_8[-1])
-
-            w10_bits_1_22 = sv_healths[24:] + [0] * 4
-
-            w10_bits_1_24 = w10_bits_1_22 + self.gen_t(w10_bits_1_22, D29_star=w9[-2], D30_star=w9[-1])
-            w10 = self.gen_word(w10_bits_1_24, D29_star=w9[-2], D30_star=w9[-1])
-
-            return TLM_WORD + how + w3_8 + w9 + w10
+        elif frame == 25:           ### A-S flags/SV configurations of SV 1 - 32 and health of SV 25 - 32
+            values = {f"config{prn}": self.sv_config(prn) for prn in range(1, 33)}
+            values.update({f"health{prn}": self.sv_health(prn) for prn in range(25, 33)})
+            values.update({"data_id": DATA_ID, "sv_id": 63})
+            return [TLM_DATA, how] + packing.PAGES[63].pack(values)[2:]
         else:
             prn = frame + 23 if frame < 6 else frame + 22
 
-            return self.gen_alm_sv(prn, how)
+            return [TLM_DATA, how] + self.alm_sv_data(prn)
 
     
-    def gen_sf5(self, frame):
-        how = self.gen_how(subframe=5, frame=frame)
-
-        data_id = [0,1]
-        sv_id = dec_bin(51, bits=6)         ### Used only for Frame 25
+    def sf5_data(self, frame):
+        how = self.how_word(5, frame)
 
         if frame < 25:
-            return self.gen_alm_sv(frame, how)
+            return [TLM_DATA, how] + self.alm_sv_data(frame)
         else:
-            w3 = self.gen_word(data_id + sv_id + dec_bin(self.alm["toa"], bits=8, scale_factor=2**12) + dec_bin(self.alm["WNa"], bits=8), D29_star=how[-2], D30_star=how[-1])
-
-            sv_healths = []
-            for i in range(1, 25):
-                sv_healths += self.gen_sv_health(i)
-            
-            w3_9 = w3
-            for i in range(6):
-                w3_9 += self.gen_word(sv_healths[i * 24:(i + 1) * 24], D29_star=w3_9[-2], D30_star=w3_9[-1])
-            
-            w10 = self.gen_word([0] * 22 + self.gen_t([0] * 22, D29_star=w3_9[-2], D30_star=w3_9[-1]), D29_star=w3_9[-2], D30_star=w3_9[-1])
-            
-            return TLM_WORD + how + w3_9 + w10
-            
-
-    def gen_frame(self, frame, message="No message sent"):
-        return self.gen_sf1(frame) + self.gen_sf2(frame) + self.gen_sf3(frame) + self.gen_sf4(frame, message) + self.gen_sf5(frame) 
-    
-
-    def gen_data(self, message="No message sent"):
-        data = []
-        for i in range(1, 26):
-            data += self.gen_frame(i, message=message)
-        return data
-
-    
-
-
+            values = {f"health{prn}": self.sv_health(prn) for prn in range(1, 25)}
+            values.update({"data_id": DATA_ID, "sv_id": 51, "toa": self.alm["toa"], "WNa": self.alm["WNa"]})
+            return [TLM_DATA, how] + packing.PAGES[51].pack(values)[2:]
+
+
+    def sf_data(self, subframe, frame, message="No message sent"):
+        ### The 10 source data words (24-bit ints, parity not applied yet) of one subframe, packed from the layouts tables
+        if subframe == 1:
+            return self.sf1_data(frame)
+        elif subframe == 2:
+            return self.sf2_data(frame)
+        elif subframe == 3:
+            return self.sf3_data(frame)
+        elif subframe == 4:
+            return self.sf4_data(frame, message)
+        return self.sf5_data(frame)
+
+
+    def encoded_how(self, subframe, frame, how_tow=None):
+        how = self.how_word(subframe, frame, how_tow)
+        return parity.encode_after(how | parity.solve_t(how >> 2, TLM_WORD[-2], TLM_WORD[-1]), TLM_ENCODED)
+
+
+    def encoded_subframe(self, subframe, frame, message="No message sent", how_tow=None):
+        ### The HOW (word 2) always ends in 00, so words 3 - 10 don't depend on the TOW and are encoded only once
+        ### per ephemeris (subframes 1 - 3) or almanac page (subframes 4, 5)
+        if subframe <= 3:
+            cache = self.eph_cache
+            key = (self.sv, self.sv_eph.IODE, subframe)
+        else:
+            cache = self.alm_cache
+            key = (subframe, frame, message if subframe == 4 and frame == 17 else None)
 
-            
+        body = cache.get(key)
+        if body is None:
+            with PROFILER.stage("quantize"):
+                data = self.sf_data(subframe, frame, message)
+            with PROFILER.stage("parity"):
+                body = parity.encode_subframe(data)[2:]
+            PROFILER.count("words_encoded", 8)
+            cache[key] = body
 
+        return [TLM_ENCODED, self.encoded_how(subframe, frame, how_tow)] + body
 
 
-        
+    def gen_subframe(self, subframe, frame, message="No message sent"):
+        words = self.encoded_subframe(subframe, frame, message)
+        bits = []
+        for word in words:
+            bits += parity.int_to_bits(word, 30)
+        return bits
 
 
+    def gen_sf1(self, frame):
+        return self.gen_subframe(1, frame)
 
-        
-            
 
-        
+    def gen_sf2(self, frame):
+        return self.gen_subframe(2, frame)
 
 
-            
+    def gen_sf3(self, frame):
+        return self.gen_subframe(3, frame)
 
 
+    def gen_sf4(self, frame, message="No message sent"):
+        return self.gen_subframe(4, frame, message)
 
 
+    def gen_sf5(self, frame):
+        return self.gen_subframe(5, frame)
             
 
+    def gen_frame(self, frame, message="No message sent"):
+        return self.gen_sf1(frame) + self.gen_sf2(frame) + self.gen_sf3(frame) + self.gen_sf4(frame, message) + self.gen_sf5(frame) 
 
-        
 
-            
+    def gen_data_words(self, message="No message sent"):
+        ### Source data words of the whole 25 frame stream as a (25 frames, 5 subframes, 10 words) uint32 array
+        return np.array([[self.sf_data(sf, frame, message) for sf in range(1, 6)] for frame in range(1, 26)], dtype=np.uint32)
 
 
+    def gen_message(self, message="No message sent", vectorized=False):
+        with PROFILER.stage("gen_message"):
+            if vectorized:
+                with PROFILER.stage("quantize"):
+                    data = self.gen_data_words(message)
+                with PROFILER.stage("parity"):
+                    words = parity.encode_subframes(data)
+                PROFILER.count("words_encoded", words.size - words[..., 0].size)     ### TLM is a constant
+                return NavMessage(words)
 
-
-            
+            words = [[self.encoded_subframe(sf, frame, message) for sf in range(1, 6)] for frame in range(1, 26)]
+            PROFILER.count("words_encoded", 25 * 5)         ### HOWs, the bodies are counted when they're cached
+            return NavMessage(words)
     
 
+    def gen_data(self, message="No message sent", vectorized=False, packed=False):
+        ### packed=True returns the NavMessage itself instead of the legacy list of bits
+        nav_message = self.gen_message(message, vectorized=vectorized)
+        return nav_message if packed else nav_message.to_list()
 
 
+    def stream_start(self):
+        ### GPS seconds of the start of frame 1 of gen_message, the TransTime of the ephemeris (TransTime is counted
+        ### from the week of the Toe, so a negative one is in the week before)
+        return (self.sv_eph.GPSWeek * TOW_COUNTS_PER_WEEK + round(self.sv_eph.TransTime / 6)) * SUBFRAME_SECONDS
 
 
+    def subframe_position(self, time):
+        """(frame, subframe, bit) transmitted at time, a GPS time (datetime) or a TOW in seconds.
 
+        Positions are those of the stream gen_message starts at TransTime, carried on past its 25 frames: frame f
+        holds page (f - 1) % 25 + 1 and the HOW counts on. A TOW is taken in the week of the start of the stream, or
+        the next one once it's earlier than the start. bit is the offset (from 0) of time in the subframe. A time
+        before TransTime (a file that doesn't go back far enough for an ephemeris already uploaded at time, see
+        EphemerisStore.broadcast) gets a frame <= 0 of the stream carried back, as iter_subframes does.
+        """
+        if isinstance(time, datetime.datetime):
+            seconds = gps_seconds(time) - self.stream_start()
+        else:
+            seconds = (time - self.how_tow * SUBFRAME_SECONDS) % SECS_PER_WEEK
+        index, offset = divmod(seconds, SUBFRAME_SECONDS)
+        frame, subframe = divmod(int(index), 5)
+        return frame + 1, subframe + 1, int(offset * BIT_RATE)
 
 
+    def stream_subframe(self, frame, subframe, message="No message sent"):
+        ### The 10 encoded words of subframe of frame of the stream, see subframe_position
+        how_tow = (self.how_tow + (frame - 1) * 5 + subframe) % TOW_COUNTS_PER_WEEK
+        return self.encoded_subframe(subframe, (frame - 1) % PAGES + 1, message, how_tow)
 
 
+    def subframe_at(self, time, message="No message sent"):
+        """The 10 encoded words of the subframe transmitted at time (see subframe_position), without generating the
+        rest of the stream: one subframe encode, or none once its words 3 - 10 are cached.
+        """
+        frame, subframe, _ = self.subframe_position(time)
+        return self.stream_subframe(frame, subframe, message)
 
 
-                                  
-    
-
-
-
-
-        
-
-
-
+    def subframes_at(self, time, count, message="No message sent"):
+        ### (count, 10) uint32 array, the encoded words of count subframes starting with the one transmitted at time
+        frame, subframe, _ = self.subframe_position(time)
+        index = (frame - 1) * 5 + subframe - 1
+        return np.array([self.stream_subframe(i // 5 + 1, i % 5 + 1, message) for i in range(index, index + count)], dtype=np.uint32)
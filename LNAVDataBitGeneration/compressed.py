@@ -0,0 +1,244 @@
+### Transparent reading of compressed navigation and almanac files: gzip (.gz), bzip2 (.bz2) and Unix compress (.Z),
+### the way IGS/CDDIS archives distribute them. The format is told by the file's magic bytes, not its name, and the
+### file is decompressed as it's read, so the parsers see the same text as the uncompressed file without it ever
+### being held in memory or written to disk.
+import bz2
+import gzip
+import io
+import queue
+import threading
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+LZW_MAGIC = b"\x1f\x9d"
+BZIP2_MAGIC = b"BZh"
+CHUNK = 1 << 16                 ### Bytes per read of the compressed file and per decompressed block
+QUEUE_DEPTH = 8                 ### Decompressed blocks the background thread may get ahead of the parser
+
+### compress(1) LZW constants
+LZW_INIT_BITS = 9
+LZW_CLEAR = 256
+LZW_BITS_MASK = 0x1F
+LZW_BLOCK_MODE = 0x80
+
+BACKGROUND = False              ### Decompress on a background thread by default, see enable_background
+
+
+def enable_background(enabled=True):
+    ### Every compressed file opened from now on is decompressed on its own thread, overlapping with parsing. zlib and
+    ### bz2 release the GIL while they decompress, the pure Python LZW decoder doesn't gain from it
+    global BACKGROUND
+    BACKGROUND = enabled
+
+
+def compression(path):
+    ### "gzip", "bzip2", "compress" or None for a file that isn't compressed
+    with open(path, "rb") as file:
+        magic = file.read(3)
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic.startswith(LZW_MAGIC):
+        return "compress"
+    if magic.startswith(BZIP2_MAGIC):
+        return "bzip2"
+    return None
+
+
+class LZWReader(io.RawIOBase):
+    """Streaming decoder of Unix compress (.Z) files, which the standard library has no module for.
+
+    Codes are read a group at a time: compress writes them in groups of 8 codes of n_bits each (n_bits bytes), and
+    when the code width grows or the table is cleared the rest of the group is padding. Each group's strings are
+    looked up in a table of bytes objects, so a code costs one list index and one append.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        header = file.read(3)
+        if len(header) < 3 or not header.startswith(LZW_MAGIC):
+            raise ValueError(f"{getattr(file, 'name', file)} is not a compress (.Z) file")
+        self.max_bits = header[2] & LZW_BITS_MASK
+        self.block_mode = bool(header[2] & LZW_BLOCK_MODE)
+        if not LZW_INIT_BITS <= self.max_bits <= 16:
+            raise ValueError(f"{getattr(file, 'name', file)} uses {self.max_bits} bit codes, 9 - 16 are supported")
+        self.blocks = self.decode()
+        self.pending = b""
+
+
+    def decode(self):
+        ### Yields the decompressed data, about CHUNK bytes at a time
+        max_max_code = 1 << self.max_bits
+        n_bits = LZW_INIT_BITS
+        max_code = (1 << n_bits) - 1
+        mask = (1 << n_bits) - 1
+        table = [bytes((i,)) for i in range(256)]
+        if self.block_mode:
+            table.append(b"")               ### LZW_CLEAR, never looked up
+        previous = None
+        data = b""
+        position = 0
+        out = []
+        size = 0
+
+        while True:
+            if len(data) - position < n_bits:
+                data = data[position:] + self.file.read(CHUNK)
+                position = 0
+            group = data[position:position + n_bits]
+            if not group:
+                break
+            position += len(group)
+            value = int.from_bytes(group, "little")
+
+            for _ in range(len(group) * 8 // n_bits):
+                code = value & mask
+                value >>= n_bits
+
+                if previous is None:
+                    if code >= 256:
+                        raise ValueError("corrupt compress (.Z) data, the first code isn't a byte")
+                    previous = table[code]
+                    out.append(previous)
+                    size += 1
+                    continue
+
+                if code == LZW_CLEAR and self.block_mode:
+                    del table[256:]             ### The next code's entry lands on 256, never looked up either
+                    n_bits = LZW_INIT_BITS
+                    max_code = (1 << n_bits) - 1
+                    mask = (1 << n_bits) - 1
+                    break                       ### The rest of the group is padding
+
+                free = len(table)
+                if code < free:
+                    entry = table[code]
+                elif code == free:
+                    entry = previous + previous[:1]
+                else:
+                    raise ValueError(f"corrupt compress (.Z) data, code {code} with {free} table entries")
+                out.append(entry)
+                size += len(entry)
+                if free < max_max_code:
+                    table.append(previous + entry[:1])
+                previous = entry
+
+                if len(table) > max_code and n_bits < self.max_bits:
+                    n_bits += 1
+                    max_code = max_max_code if n_bits == self.max_bits else (1 << n_bits) - 1
+                    mask = (1 << n_bits) - 1
+                    break                       ### The rest of the group is padding
+
+            if size >= CHUNK:
+                yield b"".join(out)
+                out = []
+                size = 0
+        if out:
+            yield b"".join(out)
+
+
+    def readable(self):
+        return True
+
+
+    def readinto(self, buffer):
+        while not self.pending:
+            self.pending = next(self.blocks, None)
+            if self.pending is None:
+                self.pending = b""
+                return 0
+        n = min(len(buffer), len(self.pending))
+        buffer[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+class BackgroundReader(io.RawIOBase):
+    """Reads a binary stream ahead on a thread, QUEUE_DEPTH blocks of CHUNK bytes at most.
+
+    Decompression then runs while the caller parses the previous blocks. An error of the thread is raised by the
+    read that reaches it.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.blocks = queue.Queue(maxsize=QUEUE_DEPTH)
+        self.stopped = threading.Event()
+        self.pending = b""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                block = self.file.read(CHUNK)
+                self.blocks.put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self.blocks.put(e)
+
+
+    def readable(self):
+        return True
+
+
+    def readinto(self, buffer):
+        while not self.pending:
+            block = self.blocks.get()
+            if isinstance(block, Exception):
+                self.blocks.put(block)
+                raise block
+            if not block:
+                self.blocks.put(block)          ### Later reads see the end too
+                return 0
+            self.pending = block
+        n = min(len(buffer), len(self.pending))
+        buffer[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+
+    def close(self):
+        if not self.closed:
+            ### Unblock the thread if it's waiting on a full queue, it stops before its next read
+            self.stopped.set()
+            while self.thread.is_alive():
+                try:
+                    self.blocks.get(timeout=0.01)
+                except queue.Empty:
+                    pass
+            self.file.close()
+        super().close()
+
+
+def open_binary(path, background=None):
+    ### Decompressed contents of path as a binary file object, read on a background thread if background (default
+    ### BACKGROUND)
+    kind = compression(path)
+    if kind == "gzip":
+        file = gzip.open(path, "rb")
+    elif kind == "bzip2":
+        file = bz2.open(path, "rb")
+    elif kind == "compress":
+        file = io.BufferedReader(LZWReader(open(path, "rb")), CHUNK)
+    else:
+        file = open(path, "rb")
+    if background is None:
+        background = BACKGROUND and kind is not None
+    if background:
+        file = io.BufferedReader(BackgroundReader(file), CHUNK)
+    return file
+
+
+def open_text(path, background=None):
+    ### Same as open(path, "r"), for compressed files as well
+    if compression(path) is None and not background:
+        return open(path, "r")
+    return io.TextIOWrapper(open_binary(path, background))
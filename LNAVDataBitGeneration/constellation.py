@@ -0,0 +1,146 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from bit_generator import Bitgenerator, read_sem_almanac
+from ephemeris_store import EphemerisStore
+from nav_message import NavMessage
+from profiling import PROFILER
+from records import EPH_FIELDS, Ephemeris
+from writers import MmapStreamFile
+
+
+class ConstellationGenerator:
+    """Generates the navigation message of every GPS satellite available at a time.
+
+    The RINEX and SEM files are parsed once and shared by the Bitgenerator of every PRN. Almanac pages (subframes 4
+    and 5) are the same for all satellites apart from the HOW, so their encoded words are shared as well.
+    """
+
+    def __init__(self, rinex_file, alm_file, time):
+        self.time = time
+        if isinstance(rinex_file, EphemerisStore):
+            self.store = rinex_file
+        else:
+            with PROFILER.stage("load_rinex"):
+                self.store = EphemerisStore.load(rinex_file)
+        with PROFILER.stage("select_ephemerides"):
+            self.eph = self.store.broadcast_at(time)
+        PROFILER.count("svs_loaded", len(self.eph))
+
+        self.alm = alm_file if isinstance(alm_file, dict) else read_sem_almanac(alm_file)
+
+        self.prns = [int(sv[1:]) for sv in self.eph]
+        self.alm_cache = {}
+
+
+    def generator(self, prn):
+        bit_generator = Bitgenerator(self.eph, self.alm, self.time, prn)
+        bit_generator.store = self.store
+        bit_generator.alm_cache = self.alm_cache
+        return bit_generator
+
+
+    def gen_messages(self, message="No message sent", prns=None, processes=None):
+        ### {prn: NavMessage} for every PRN with a valid ephemeris, or the given ones.
+        ### With processes the PRNs are split over a process pool, processes=0 uses every core.
+        prns = self.prns if prns is None else list(prns)
+        if processes is None:
+            return {prn: self.generator(prn).gen_message(message) for prn in prns}
+
+        processes = processes or os.cpu_count()
+        chunks = [prns[i::processes] for i in range(processes) if prns[i::processes]]
+        shm, svs = share_ephemerides(self.eph)
+        try:
+            ### Workers have their own PROFILER, only the time spent waiting on the pool is reported here
+            with PROFILER.stage("process_pool"), ProcessPoolExecutor(max_workers=len(chunks), initializer=init_worker,
+                                                                     initargs=(shm.name, svs, self.alm, self.time)) as pool:
+                results = {}
+                for words in pool.map(gen_words, chunks, [message] * len(chunks)):
+                    results.update({prn: NavMessage(w) for prn, w in words.items()})
+        finally:
+            shm.close()
+            shm.unlink()
+        return {prn: results[prn] for prn in prns}
+
+
+    def write_npy(self, fname, message="No message sent", prns=None, processes=None):
+        ### Streams of all PRNs into one pre-sized memory mapped file (see writers.MmapStreamFile), with processes
+        ### every worker writes its own rows straight into the file
+        prns = self.prns if prns is None else list(prns)
+        stream_file = MmapStreamFile.create(fname, len(prns), 25 * 5 * 10)
+        if processes is None:
+            for row, prn in enumerate(prns):
+                bit_generator = self.generator(prn)
+                stream_file.write(row, bit_generator.gen_message(message), prn, bit_generator.how_tow * 6)
+            stream_file.flush()
+            return
+
+        stream_file.flush()
+        del stream_file
+        processes = processes or os.cpu_count()
+        rows = list(enumerate(prns))
+        chunks = [rows[i::processes] for i in range(processes) if rows[i::processes]]
+        shm, svs = share_ephemerides(self.eph)
+        try:
+            with PROFILER.stage("process_pool"), ProcessPoolExecutor(max_workers=len(chunks), initializer=init_worker,
+                                                                     initargs=(shm.name, svs, self.alm, self.time)) as pool:
+                list(pool.map(write_rows, chunks, [message] * len(chunks), [fname] * len(chunks)))
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+    def gen_words(self, message="No message sent", prns=None, processes=None):
+        ### Encoded words of all PRNs stacked into one (PRNs, 25, 5, 10) uint32 array, in the order of prns
+        messages = self.gen_messages(message, prns=prns, processes=processes)
+        return np.stack([nav_message.words for nav_message in messages.values()])
+
+
+### Process pool side. The ephemerides travel through a shared memory block that every worker reads once.
+worker_state = {}
+
+
+def share_ephemerides(eph):
+    svs = list(eph)
+    table = np.array([[eph[sv][field] for field in EPH_FIELDS] for sv in svs], dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+    np.ndarray(table.shape, dtype=np.float64, buffer=shm.buf)[:] = table
+    return shm, svs
+
+
+def init_worker(shm_name, svs, alm, time):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    table = np.ndarray((len(svs), len(EPH_FIELDS)), dtype=np.float64, buffer=shm.buf)
+    eph = {sv: Ephemeris(*row) for sv, row in zip(svs, table.tolist())}
+    del table
+    shm.close()
+
+    worker_state.update(eph=eph, alm=alm, time=time, alm_cache={})
+
+
+def worker_generator(prn):
+    bit_generator = Bitgenerator(worker_state["eph"], worker_state["alm"], worker_state["time"], prn)
+    bit_generator.alm_cache = worker_state["alm_cache"]
+    return bit_generator
+
+
+def gen_words(prns, message):
+    words = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for prn in prns:
+            words[prn] = worker_generator(prn).gen_message(message).words
+    return words
+
+
+def write_rows(rows, message, fname):
+    stream_file = MmapStreamFile.open(fname)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for row, prn in rows:
+            bit_generator = worker_generator(prn)
+            stream_file.write(row, bit_generator.gen_message(message), prn, bit_generator.how_tow * 6)
+    stream_file.flush()
@@ -0,0 +1,228 @@
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import layouts
+import parity
+import writers
+from bit_generator import xPI
+from nav_message import BITS_PER_SUBFRAME, BITS_PER_WORD, NavMessage
+
+
+PREAMBLE = 0b10001011
+
+
+def load_bits(source):
+    ### Bits of a generated stream: NavMessage, list/array of 0/1, packed bytes or a .txt/.bin file
+    if isinstance(source, NavMessage):
+        return source.bits()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return np.unpackbits(np.frombuffer(source, dtype=np.uint8))
+    if isinstance(source, str):
+        return load_streams(source)[0][1].bits()
+    return np.asarray(source, dtype=np.uint8)
+
+
+def load_streams(fname):
+    ### [(prn, NavMessage)] of a file written by writers, PRN 0 when the format doesn't record it
+    extension = os.path.splitext(fname)[1]
+    if extension == ".txt":
+        return [(0, writers.read_text(fname))]
+    if extension == ".bin":
+        prn, _, nav_message = writers.read_binary(fname)
+        return [(prn, nav_message)]
+    if extension == ".npy":
+        stream_file = writers.MmapStreamFile.open(fname, mode="r")
+        return [stream_file.read(row)[0::2] for row in range(stream_file.num_rows)]
+    raise ValueError(f"Unknown bitstream file type {extension}")
+
+
+def bits_to_words(bits):
+    ### (n * 30) bits -> n 30-bit words
+    bits = np.asarray(bits, dtype=np.uint8).reshape(-1, BITS_PER_WORD)
+    padded = np.concatenate([np.zeros((bits.shape[0], 32 - BITS_PER_WORD), dtype=np.uint8), bits], axis=1)
+    return np.packbits(padded, axis=1).view(">u4").reshape(-1).astype(np.uint32)
+
+
+def find_preamble(bits):
+    """Offset of the first subframe in a bit stream: the first TLM preamble whose TLM and HOW pass parity
+    and which is followed by another preamble one subframe later (when the stream is that long).
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    if bits.size < 2 * BITS_PER_WORD:
+        return None
+    codes = np.zeros(bits.size - 7, dtype=np.uint8)
+    for k in range(8):
+        codes |= bits[k:bits.size - 7 + k] << (7 - k)
+
+    for offset in np.flatnonzero(codes == PREAMBLE):
+        offset = int(offset)
+        if offset + 2 * BITS_PER_WORD > bits.size:
+            break
+        next_subframe = offset + BITS_PER_SUBFRAME
+        if next_subframe + 8 <= bits.size and codes[next_subframe] != PREAMBLE:
+            continue
+        ok, _ = check_parity(bits_to_words(bits[offset:offset + 2 * BITS_PER_WORD]))
+        if ok.all():
+            return offset
+    return None
+
+
+def to_subframes(source):
+    ### (subframes, 10) array of encoded words, from any source load_bits takes or an array of words
+    if isinstance(source, NavMessage):
+        return source.words.reshape(-1, 10)
+    bits = load_bits(source)
+    offset = find_preamble(bits)
+    if offset is None:
+        raise ValueError("No TLM preamble found")
+    count = (bits.size - offset) // BITS_PER_SUBFRAME
+    return bits_to_words(bits[offset:offset + count * BITS_PER_SUBFRAME]).reshape(-1, 10)
+
+
+def check_parity(words):
+    """Parity check of every word (IS-GPS-200, Table 20-XIV), D29*/D30* chained in transmission order.
+
+    Returns the per word result and the source data words (d1 - d24, D30* complement removed).
+    The first word is checked with D29* = D30* = 0, as if it followed a word 10.
+    """
+    words = np.asarray(words, dtype=np.uint32)
+    flat = words.reshape(-1)
+    previous = np.concatenate([np.zeros(1, dtype=np.uint32), flat[:-1]])
+    stars = previous & 0b11
+    data = (flat >> 6) ^ np.where(stars & 1, np.uint32(parity.DATA_MASK), np.uint32(0))
+    expected = parity.parity_batch(data) ^ parity.STAR_PARITY_ARRAY[stars]
+    return (expected == (flat & 0x3F)).reshape(words.shape), data.reshape(words.shape)
+
+
+def extract(data, fields):
+    ### {name: values} of fields from (n, 10) source data words, in engineering units
+    values = {}
+    for field in fields:
+        raw = np.zeros(data.shape[0], dtype=np.int64)
+        width = 0
+        for word, first, bits in field.pieces:
+            raw = (raw << bits) | ((data[:, word - 1].astype(np.int64) >> (25 - first - bits)) & ((1 << bits) - 1))
+            width += bits
+        if field.signed:
+            raw = raw - ((raw >> (width - 1)) << width)
+        if field.scale == 1 and not field.semicircles:
+            values[field.name] = raw
+        else:
+            values[field.name] = raw * field.scale * (xPI if field.semicircles else 1)
+    return values
+
+
+def decode(words):
+    """Decode (subframes, 10) encoded words back into engineering units.
+
+    Returns "parity_ok" per word, "subframe"/"TOW" (TOW count of the next subframe) per subframe and, per message
+    type, a dict of field arrays with "index" pointing back at the subframes they came from. Page 17 text is given
+    as "message" strings.
+    """
+    ok, data = check_parity(words)
+    how = extract(data, layouts.HOW)
+    decoded = {"parity_ok": ok, "subframe": how["subframe"], "TOW": how["TOW"]}
+
+    for subframe, layout in ((1, layouts.SUBFRAME_1), (2, layouts.SUBFRAME_2), (3, layouts.SUBFRAME_3)):
+        index = np.flatnonzero(how["subframe"] == subframe)
+        decoded[f"subframe{subframe}"] = dict(extract(data[index], layout), index=index)
+
+    pages = np.flatnonzero((how["subframe"] == 4) | (how["subframe"] == 5))
+    sv_id = extract(data[pages], layouts.PAGE_ID)["sv_id"]
+    groups = {
+        "almanac": layouts.ALMANAC,
+        "health": layouts.HEALTH,
+        "message": layouts.MESSAGE,
+        "iono_utc": layouts.IONO_UTC,
+        "config_health": layouts.CONFIG_HEALTH,
+    }
+    for name, layout in groups.items():
+        ids = [i for i, page_layout in layouts.PAGE_LAYOUTS.items() if page_layout is layout]
+        index = pages[np.isin(sv_id, ids)]
+        decoded[name] = dict(extract(data[index], layout), index=index)
+
+    chars = np.stack([decoded["message"][f"char{i}"] for i in range(22)], axis=-1).astype(np.uint8)
+    decoded["message"]["message"] = [row.tobytes().decode("ascii", errors="replace") for row in chars]
+    return decoded
+
+
+def verify(source):
+    ### Parity summary of a stream
+    words = to_subframes(source)
+    ok, _ = check_parity(words)
+    bad = np.argwhere(~ok)
+    return {
+        "subframes": int(words.shape[0]),
+        "words": int(words.size),
+        "parity_errors": int(bad.shape[0]),
+        "first_errors": [(int(sf), int(w) + 1) for sf, w in bad[:10]],
+    }
+
+
+def roundtrip_errors(decoded, sv_eph=None, alm=None):
+    """Largest difference, in LSBs, between decoded fields and the ephemeris/almanac they were generated from.
+
+    Anything above 0.5 LSB means a field didn't survive quantization, encoding and decoding.
+    """
+    errors = {}
+
+    def compare(name, values, expected, field):
+        lsb = field.scale * (xPI if field.semicircles else 1)
+        if len(values):
+            errors[name] = max(errors.get(name, 0.0), float(np.max(np.abs(np.asarray(values, dtype=np.float64) - expected)) / lsb))
+
+    if sv_eph is not None:
+        for subframe, layout in ((1, layouts.SUBFRAME_1), (2, layouts.SUBFRAME_2), (3, layouts.SUBFRAME_3)):
+            for field in layout:
+                if field.name in sv_eph:
+                    expected = sv_eph[field.name] % 1024 if field.name == "GPSWeek" else sv_eph[field.name]
+                    compare(f"subframe{subframe}.{field.name}", decoded[f"subframe{subframe}"][field.name], expected, field)
+
+    if alm is not None:
+        almanac = decoded["almanac"]
+        for row, sv_id in enumerate(almanac["sv_id"]):
+            sv = "G%02d" % sv_id
+            if sv not in alm:
+                continue
+            for field in layouts.ALMANAC[2:]:
+                if field.name == "toa":
+                    expected = alm["toa"]
+                elif field.name == "health":
+                    expected = alm[sv]["health"] & 0x1F        ### Only the 5 low bits are generated
+                else:
+                    expected = alm[sv][field.name]
+                compare(f"almanac.{field.name}", almanac[field.name][row:row + 1], expected, field)
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the parity of generated navigation message files (.txt, .bin, .npy) and optionally round trip check them against their RINEX/SEM inputs")
+    parser.add_argument("files", help="Bitstream files", nargs="+")
+    parser.add_argument("-r", "--rinex_path", help="Path of the RINEX file the streams were generated from (optional)", type=str)
+    parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file the streams were generated from (optional)", type=str)
+    parser.add_argument("-t", "--time", help="Generation time YYYY-MM-DDTHH:MM:SS, needed with --rinex_path", type=str)
+    parser.add_argument("-p", "--prn", help="PRN of .txt files, which don't record it", type=int, default=0)
+    args = parser.parse_args()
+
+    eph = alm = None
+    if args.rinex_path:
+        from ephemeris_store import EphemerisStore
+        eph = EphemerisStore.load(args.rinex_path).broadcast_at(datetime.datetime.strptime(args.time, "%Y-%m-%dT%H:%M:%S"))
+    if args.almanac:
+        from bit_generator import read_sem_almanac
+        alm = read_sem_almanac(args.almanac)
+
+    report = {}
+    for fname in args.files:
+        for prn, nav_message in load_streams(fname):
+            prn = prn or args.prn
+            result = verify(nav_message)
+            if eph is not None or alm is not None:
+                decoded = decode(nav_message.words.reshape(-1, 10))
+                sv_eph = eph.get("G%02d" % prn) if eph is not None else None
+                result["max_error_lsb"] = max(roundtrip_errors(decoded, sv_eph, alm).values(), default=0.0)
+            report[f"{fname}:G{prn:02d}"] = result
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,143 @@
+import numpy as np
+import input_cache
+import rinex_reader
+from gps_time import LEAP_SECONDS, SECS_PER_WEEK, gps_seconds
+from records import Ephemeris, georinex_array, records_to_array
+
+
+DEFAULT_FIT_HOURS = 4           ### IS-GPS-200 fit interval flag 0, also used when RINEX leaves it empty or 0
+
+
+class EphemerisStore:
+    """Per-SV index of every ephemeris record of a navigation file, sorted by Toc.
+
+    Built once per file, lookup(sv, time) then returns the record valid at any time in O(log n).
+    """
+
+    def __init__(self, records):
+        ### records: rinex_reader records or an EPH_DTYPE array of them. Each SV's records are kept as a slice of one
+        ### structured array, turned into an Ephemeris only when they're looked up
+        array = records if isinstance(records, np.ndarray) else records_to_array(records)
+        array = array[~np.isnan(array["IODE"])]
+        array = array[np.lexsort((array["epoch"], array["sv"]))]          ### Stable, so file order breaks ties
+        svs, starts = np.unique(array["sv"], return_index=True)
+
+        self.records = {}
+        self.toc = {}
+        self.toe = {}
+        self.trans_time = {}
+        self.iode = {}
+        self.fit = {}
+        self.max_span = 0
+
+        for sv, start, end in zip(svs.tolist(), starts.tolist(), starts[1:].tolist() + [len(array)]):
+            sv_records = array[start:end]
+            toc = sv_records["epoch"].astype(np.float64)
+            week = sv_records["GPSWeek"] * SECS_PER_WEEK
+            toe = week + sv_records["toe"]
+            trans_time = week + sv_records["TransTime"]
+            trans_time -= np.round((trans_time - toe) / SECS_PER_WEEK) * SECS_PER_WEEK    ### TransTime may belong to the adjacent week
+            fit = sv_records["FitInterval"]
+            fit = np.where(np.isnan(fit) | (fit <= 0), DEFAULT_FIT_HOURS, fit) * 3600 / 2
+
+            self.records[sv] = sv_records
+            self.toc[sv] = toc
+            self.toe[sv] = toe
+            self.trans_time[sv] = trans_time
+            self.iode[sv] = sv_records["IODE"]
+            self.fit[sv] = fit
+            self.max_span = max(self.max_span, np.max(fit + np.abs(toc - toe)))
+
+
+    @classmethod
+    def from_rinex(cls, rinex_file):
+        ### Goes through the input cache when it's enabled
+        if input_cache.CACHE is not None:
+            return cls(input_cache.CACHE.gps_nav_records(rinex_file))
+        return cls(rinex_reader.read_gps_nav(rinex_file))
+
+
+    @classmethod
+    def from_georinex(cls, rinex_file):
+        ### For the files from_rinex can't parse (RINEX 2), slower and not cached
+        import georinex as gr
+        return cls(georinex_array(gr.load(rinex_file)))
+
+
+    @classmethod
+    def load(cls, rinex_file):
+        ### Any GPS navigation file: from_rinex, falling back to georinex when it isn't RINEX 3
+        try:
+            return cls.from_rinex(rinex_file)
+        except ValueError:
+            return cls.from_georinex(rinex_file)
+
+
+    @property
+    def svs(self):
+        return list(self.records)
+
+
+    def is_valid(self, sv, i, t, transmitted):
+        if abs(t - self.toe[sv][i]) > self.fit[sv][i]:
+            return False
+        return not transmitted or self.trans_time[sv][i] <= t
+
+
+    def lookup_index(self, sv, time, transmitted=False):
+        if sv not in self.toc:
+            return None
+
+        t = gps_seconds(time)
+        toc = self.toc[sv]
+        right = int(np.searchsorted(toc, t, side="left"))
+        left = right - 1
+
+        # Walk outwards from t in order of Toc distance, the first valid record is the nearest one
+        while left >= 0 or right < len(toc):
+            if right < len(toc) and (left < 0 or toc[right] - t <= t - toc[left]):
+                i = right
+                right += 1
+            else:
+                i = left
+                left -= 1
+            if abs(toc[i] - t) > self.max_span:
+                return None
+            if self.is_valid(sv, i, t, transmitted):
+                return i
+        return None
+
+
+    def lookup(self, sv, time, transmitted=False):
+        ### Ephemeris of sv valid at time (within its fit interval), None if there's none.
+        ### With transmitted=True, records whose TransTime is still in the future are skipped as well.
+        i = self.lookup_index(sv, time, transmitted=transmitted)
+        if i is None:
+            return None
+
+        return Ephemeris(*self.records[sv][i].tolist()[2:], float(self.toc[sv][i] % SECS_PER_WEEK + LEAP_SECONDS))
+
+
+    def broadcast(self, sv, time):
+        ### Ephemeris sv is transmitting at time: the valid one nearest by Toc among those already uploaded (TransTime
+        ### not in the future), or the nearest valid one when the file doesn't go back far enough for that
+        return self.lookup(sv, time, transmitted=True) or self.lookup(sv, time)
+
+
+    def at(self, time, transmitted=False):
+        eph = {}
+        for sv in self.records:
+            sv_eph = self.lookup(sv, time, transmitted=transmitted)
+            if sv_eph is not None:
+                eph[sv] = sv_eph
+        return eph
+
+
+    def broadcast_at(self, time):
+        ### {sv: broadcast(sv, time)}, what every SV is transmitting at time
+        eph = {}
+        for sv in self.records:
+            sv_eph = self.broadcast(sv, time)
+            if sv_eph is not None:
+                eph[sv] = sv_eph
+        return eph
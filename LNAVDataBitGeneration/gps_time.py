@@ -0,0 +1,16 @@
+import datetime
+
+
+GPS_EPOCH = datetime.datetime(1980, 1, 6, 0, 0, 0, 0)
+LEAP_SECONDS = 18
+SECS_PER_WEEK = (7 * 24 * 3600)
+
+
+def gps_seconds(time):
+    ### Seconds elapsed since the GPS epoch (time is taken to be in GPS time already)
+    return (time - GPS_EPOCH).total_seconds()
+
+
+def gps_week_tow(time):
+    seconds = gps_seconds(time)
+    return int(seconds // SECS_PER_WEEK), seconds % SECS_PER_WEEK
@@ -0,0 +1,139 @@
+### On-disk cache of parsed RINEX navigation and SEM almanac files, shared by every process of the machine.
+### Entries are .npy structured arrays named after the source file name, the parser version and the hash of the
+### file's contents. They're opened memory mapped, so a warm start parses nothing and concurrent processes share
+### the same pages. Writing an entry evicts the entries of older contents of the same file, and the least recently
+### used ones past max_entries.
+import hashlib
+import os
+import re
+import tempfile
+
+import numpy as np
+import rinex_reader
+from profiling import PROFILER
+from records import almanac_to_array, array_to_almanac, records_to_array
+
+
+PARSER_VERSION = 1          ### Has to be bumped whenever rinex_reader or readSemAlmanac change what they return
+MAX_ENTRIES = 64
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lnav")
+### Names of the entries (see entry_name), nothing else in the directory is ever evicted or cleared
+ENTRY = re.compile(r"(rinex|sem)-.+-[0-9a-f]{8}-v\d+-[0-9a-f]{32}\.npy")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+class InputCache:
+    def __init__(self, directory=DEFAULT_DIR, max_entries=MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+
+    def entry_prefix(self, kind, path):
+        ### Same for every version/contents of one source file
+        location = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+        return f"{kind}-{os.path.basename(path)}-{location}-"
+
+
+    def entry_name(self, kind, path):
+        return f"{self.entry_prefix(kind, path)}v{PARSER_VERSION}-{file_hash(path)}.npy"
+
+
+    def entries(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if ENTRY.fullmatch(name)]
+
+
+    def load(self, name):
+        ### Memory mapped entry, None on a miss
+        fname = os.path.join(self.directory, name)
+        try:
+            array = np.load(fname, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        try:
+            os.utime(fname)                 ### Last use, for the eviction
+        except OSError:
+            pass
+        return array
+
+
+    def save(self, name, array, prefix):
+        ### Written next to its final name and renamed, so other processes never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, array)
+        os.replace(tmp, os.path.join(self.directory, name))
+        self.evict(name, prefix)
+
+
+    def evict(self, keep, prefix):
+        ### Other versions/contents of the same source file (same prefix) are stale, past max_entries the least
+        ### recently used entries go
+        for fname in self.entries():
+            if os.path.basename(fname).startswith(prefix) and os.path.basename(fname) != keep:
+                remove(fname)
+
+        entries = [fname for fname in self.entries() if os.path.basename(fname) != keep]
+        entries.sort(key=lambda fname: os.path.getmtime(fname) if os.path.exists(fname) else 0)
+        for fname in entries[:max(0, len(entries) + 1 - self.max_entries)]:
+            remove(fname)
+
+
+    def clear(self):
+        for fname in self.entries():
+            remove(fname)
+
+
+    def gps_nav_records(self, path):
+        ### EPH_DTYPE rows of the records of a navigation file, memory mapped on a hit (see EphemerisStore)
+        name = self.entry_name("rinex", path)
+        array = self.load(name)
+        if array is None:
+            PROFILER.count("cache_misses")
+            array = records_to_array(rinex_reader.read_gps_nav(path))
+            self.save(name, array, self.entry_prefix("rinex", path))
+        else:
+            PROFILER.count("cache_hits")
+        return array
+
+
+    def almanac(self, path, parse):
+        ### parse() is only called on a miss
+        name = self.entry_name("sem", path)
+        array = self.load(name)
+        if array is None:
+            PROFILER.count("cache_misses")
+            alm = parse()
+            self.save(name, almanac_to_array(alm), self.entry_prefix("sem", path))
+            return alm
+        PROFILER.count("cache_hits")
+        return array_to_almanac(array)
+
+
+def remove(fname):
+    try:
+        os.remove(fname)
+    except OSError:             ### Already evicted by another process
+        pass
+
+
+### Disabled until enable() is called, e.g. by main.py --cache
+CACHE = None
+
+
+def enable(directory=DEFAULT_DIR, max_entries=MAX_ENTRIES):
+    global CACHE
+    CACHE = InputCache(directory, max_entries)
+    return CACHE
+
+
+def disable():
+    global CACHE
+    CACHE = None
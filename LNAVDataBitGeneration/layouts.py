@@ -0,0 +1,131 @@
+### LNAV subframe and page layouts (IS-GPS-200, Figures 20-1 and 20-2), as written by Bitgenerator.
+### Words and bits are numbered from 1 like in the ICD, bits 1 - 24 of a word are its data bits.
+from collections import namedtuple
+
+
+xPI = 3.1415926535898           ### IS-GPS-200 value of pi for semicircles, here so packing can share it with bit_generator
+
+### pieces: ((word, first bit, width), ...) most significant piece first
+### semicircles: the value is kept in radians and divided by xPI when it's quantized
+Field = namedtuple("Field", "name pieces scale signed semicircles", defaults=(1, False, False))
+
+
+HOW = (
+    Field("TOW", ((2, 1, 17),)),
+    Field("alert", ((2, 18, 1),)),
+    Field("AS", ((2, 19, 1),)),
+    Field("subframe", ((2, 20, 3),)),
+)
+
+SUBFRAME_1 = (
+    Field("GPSWeek", ((3, 1, 10),)),
+    Field("L2ChannelCode", ((3, 11, 2),)),
+    Field("URA", ((3, 13, 4),)),
+    Field("health", ((3, 17, 6),)),
+    Field("IODC", ((3, 23, 2), (8, 1, 8))),
+    Field("L2PDataFlag", ((4, 1, 1),)),
+    Field("TGD", ((7, 17, 8),), 2**-31, True),
+    Field("toc", ((8, 9, 16),), 2**4),
+    Field("Af2", ((9, 1, 8),), 2**-55, True),
+    Field("Af1", ((9, 9, 16),), 2**-43, True),
+    Field("Af0", ((10, 1, 22),), 2**-31, True),
+)
+
+SUBFRAME_2 = (
+    Field("IODE", ((3, 1, 8),)),
+    Field("C_rs", ((3, 9, 16),), 2**-5, True),
+    Field("Delta_n", ((4, 1, 16),), 2**-43, True, True),
+    Field("M0", ((4, 17, 8), (5, 1, 24)), 2**-31, True, True),
+    Field("C_uc", ((6, 1, 16),), 2**-29, True),
+    Field("e", ((6, 17, 8), (7, 1, 24)), 2**-33),
+    Field("C_us", ((8, 1, 16),), 2**-29, True),
+    Field("sqrtA", ((8, 17, 8), (9, 1, 24)), 2**-19),
+    Field("toe", ((10, 1, 16),), 2**4),
+    Field("FitFlag", ((10, 17, 1),)),
+    Field("AODO", ((10, 18, 5),), 900),
+)
+
+SUBFRAME_3 = (
+    Field("C_ic", ((3, 1, 16),), 2**-29, True),
+    Field("Omega", ((3, 17, 8), (4, 1, 24)), 2**-31, True, True),
+    Field("C_is", ((5, 1, 16),), 2**-29, True),
+    Field("i0", ((5, 17, 8), (6, 1, 24)), 2**-31, True, True),
+    Field("C_rc", ((7, 1, 16),), 2**-5, True),
+    Field("omega", ((7, 17, 8), (8, 1, 24)), 2**-31, True, True),
+    Field("OmegaDot", ((9, 1, 24),), 2**-43, True, True),
+    Field("IODE", ((10, 1, 8),)),
+    Field("IDOT", ((10, 9, 14),), 2**-43, True, True),
+)
+
+PAGE_ID = (
+    Field("data_id", ((3, 1, 2),)),
+    Field("sv_id", ((3, 3, 6),)),
+)
+
+### Subframe 4 pages 2 - 5, 7 - 10 and subframe 5 pages 1 - 24. Almanac angles are in semicircles already (SEM).
+ALMANAC = PAGE_ID + (
+    Field("e", ((3, 9, 16),), 2**-21),
+    Field("toa", ((4, 1, 8),), 2**12),
+    Field("delta_i", ((4, 9, 16),), 2**-19, True),
+    Field("OmegaDot", ((5, 1, 16),), 2**-38, True),
+    Field("health", ((5, 17, 8),)),
+    Field("sqrtA", ((6, 1, 24),), 2**-11),
+    Field("Omega0", ((7, 1, 24),), 2**-23, True),
+    Field("omega", ((8, 1, 24),), 2**-23, True),
+    Field("M0", ((9, 1, 24),), 2**-23, True),
+    Field("Af0", ((10, 1, 8), (10, 20, 3)), 2**-20, True),
+    Field("Af1", ((10, 9, 11),), 2**-38, True),
+)
+
+### Subframe 4 page 18
+IONO_UTC = PAGE_ID + (
+    Field("alpha0", ((3, 9, 8),), 2**-30, True),
+    Field("alpha1", ((3, 17, 8),), 2**-27, True),
+    Field("alpha2", ((4, 1, 8),), 2**-24, True),
+    Field("alpha3", ((4, 9, 8),), 2**-24, True),
+    Field("beta0", ((4, 17, 8),), 2**11, True),
+    Field("beta1", ((5, 1, 8),), 2**14, True),
+    Field("beta2", ((5, 9, 8),), 2**16, True),
+    Field("beta3", ((5, 17, 8),), 2**16, True),
+    Field("A1", ((6, 1, 24),), 2**-50, True),
+    Field("A0", ((7, 1, 24), (8, 1, 8)), 2**-30, True),
+    Field("tot", ((8, 9, 8),), 2**12),
+    Field("WNt", ((8, 17, 8),)),
+    Field("Dt_LS", ((9, 1, 8),), 1, True),
+    Field("WN_LSF", ((9, 9, 8),)),
+    Field("DN", ((9, 17, 8),)),
+    Field("Dt_LSF", ((10, 1, 8),), 1, True),
+)
+
+### Subframe 4 page 17: 22 ASCII characters, 2 in word 3, 3 in each of words 4 - 9 and 2 in word 10
+MESSAGE = PAGE_ID + tuple(
+    Field(f"char{i}", ((3 + (i + 1) // 3, 1 + 8 * ((i + 1) % 3), 8),)) for i in range(22)
+)
+
+### Subframe 4 page 25: A-S flags/SV configurations of SV 1 - 32 and health of SV 25 - 32
+CONFIG_HEALTH = PAGE_ID + tuple(
+    Field(f"config{prn}", ((3 + (prn + 1) // 6, 1 + 4 * ((prn + 1) % 6), 4),)) for prn in range(1, 33)
+) + (
+    Field("health25", ((8, 19, 6),)),
+) + tuple(
+    Field(f"health{prn}", ((9 + (prn - 26) // 4, 1 + 6 * ((prn - 26) % 4), 6),)) for prn in range(26, 33)
+)
+
+### Subframe 5 page 25: almanac reference time/week and health of SV 1 - 24
+HEALTH = PAGE_ID + (
+    Field("toa", ((3, 9, 8),), 2**12),
+    Field("WNa", ((3, 17, 8),)),
+) + tuple(
+    Field(f"health{prn}", ((4 + (prn - 1) // 4, 1 + 6 * ((prn - 1) % 4), 6),)) for prn in range(1, 25)
+)
+
+
+### Subframe 4/5 page layouts by the SV ID in word 3 (IS-GPS-200, Table 20-V)
+PAGE_LAYOUTS = {
+    51  :   HEALTH,
+    55  :   MESSAGE,
+    56  :   IONO_UTC,
+    63  :   CONFIG_HEALTH,
+}
+for sv_id in range(1, 33):
+    PAGE_LAYOUTS[sv_id] = ALMANAC
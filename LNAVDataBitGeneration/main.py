@@ -1,6 +1,12 @@
 import datetime
+import os
 from bit_generator import Bitgenerator
 import argparse
+import compressed
+import input_cache
+from almanac_archive import AlmanacArchive
+import writers
+from profiling import PROFILER
 
 desc = "This program takes a time, a rinex file and a SEM almanac file and uses them to generate a full navigation message bit stream"
 parser = argparse.ArgumentParser(description=desc)
@@ -8,43 +14,63 @@ parser = argparse.ArgumentParser(description=desc)
 
 
 parser.add_argument("-r", "--rinex_path", help="Path of the RINEX file", type=str)
-parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file", type=str)
+parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file, or of a directory of SEM/YUMA almanacs or an .npz almanac archive to pick the almanac closest to the time from", type=str)
 parser.add_argument("-t", "--time", help="YYYY-MM-DDTHH:MM:SS", type=str)
 parser.add_argument("-p", "--prn", help="Enter the PRN of the satellite that will transmit the data", type=int)
+parser.add_argument("--all-prns", help="Generate the navigation message of every PRN with a valid ephemeris, one file per PRN (file_name G05.txt, ...)", action="store_true")
+parser.add_argument("--processes", help="With --all-prns, split the PRNs over this many processes (0 = one per core)(optional)", type=int, default=None)
 parser.add_argument("-m", "--message", help="Enter the Message that you'd like to be sent on the Navigation message (22 characters max)(optional)", type=str, default="No Message")
 parser.add_argument("-f", "--file_name", help="Name of the file you'd like the navigation message to be stored in (without extension)(default=Navigation Message Bitstream)",type=str , default="Navigation Message Bitstream")
+parser.add_argument("--profile", help="Time the generation stages, count SVs/words/dummy pages/bytes written and print them as JSON at the end (optional)", action="store_true")
+parser.add_argument("--cprofile", help="Also dump cProfile stats of the generation (pstats format) to this file (optional)", type=str, default=None)
+parser.add_argument("--cache", help=f"Keep the parsed RINEX/SEM files in an on-disk cache shared by every run, in this directory (default={input_cache.DEFAULT_DIR})(optional)", nargs="?", const=input_cache.DEFAULT_DIR, default=None)
+parser.add_argument("--decompress-thread", help="Decompress gzip/bzip2/compress (.Z) input files on a background thread while they're parsed (optional)", action="store_true")
+parser.add_argument("--format", help="Output format: annotated text (txt), packed binary with a PRN/TOW header (bin) or a memory mapped multi PRN array (npy)(default=txt)", choices=sorted(writers.WRITERS), default="txt")
 
 args = parser.parse_args()
+if args.profile:
+    PROFILER.enable()
+if args.cache:
+    input_cache.enable(args.cache)
+if args.decompress_thread:
+    compressed.enable_background()
 
 time = datetime.datetime.strptime(args.time, "%Y-%m-%dT%H:%M:%S")
 rinex_file = args.rinex_path
 alm_file = args.almanac
+if alm_file and (os.path.isdir(alm_file) or alm_file.endswith(".npz")):
+    alm_file = AlmanacArchive.open(alm_file, reference_time=time).at(time)
 prn = args.prn
 message= args.message 
-fname = args.file_name + ".txt"
+fname = args.file_name + "." + args.format
+write = writers.WRITERS[args.format]
 
-# rinex_file = "GODS00USA_R_20240830000_01D_GN.rnx"
-# alm_file = "gpsAlmanac.txt"
-# # filename = "brdc0830.24n"
-# time = datetime.datetime(2024, 3, 23, 2, 0, 0, 0)
-# prn = 5
-# # frame = 18
-bit_generator = Bitgenerator(rinex_file, alm_file, time, prn)
-# message = "mohanad is awesome"
-
-navigation_message = bit_generator.gen_data(message=message)
-
-
-with open("Navigation Message Bitstream.txt", "w", newline="") as file:
-    for frame in range(1, 26):
-        for sf in range(1,6):
-            file.write(f"F-{frame} SF-{sf} \n")
-            for w in range(1, 11):
-                ws = (frame - 1) * 1500 + (sf - 1) * 300 + (w-1) * 30
-                we = ws + 30
-                word = [str(a) for a in navigation_message[ws:we]]
-                file.write("".join(word) + '\n')
-            file.write("\n")
+if args.all_prns:
+    from constellation import ConstellationGenerator        ### Process pool machinery, only needed here
+    constellation = ConstellationGenerator(rinex_file, alm_file, time)
+    if args.format == "npy":                ### One file for all PRNs, filled by the workers directly
+        with PROFILER.cprofile(args.cprofile):
+            constellation.write_npy(fname, message=message, processes=args.processes)
+    else:
+        with PROFILER.cprofile(args.cprofile):
+            messages = constellation.gen_messages(message=message, processes=args.processes)
+        for prn, navigation_message in messages.items():
+            start_tow = constellation.generator(prn).how_tow * 6
+            write(f"{args.file_name} G{prn:02d}.{args.format}", navigation_message, prn, start_tow)
+else:
+    # rinex_file = "GODS00USA_R_20240830000_01D_GN.rnx"
+    # alm_file = "gpsAlmanac.txt"
+    # # filename = "brdc0830.24n"
+    # time = datetime.datetime(2024, 3, 23, 2, 0, 0, 0)
+    # prn = 5
+    # # frame = 18
+    bit_generator = Bitgenerator(rinex_file, alm_file, time, prn)
+    # message = "mohanad is awesome"
 
+    with PROFILER.cprofile(args.cprofile):
+        navigation_message = bit_generator.gen_data(message=message, packed=True)
 
+    write(fname, navigation_message, prn, bit_generator.how_tow * 6)
 
+if args.profile:
+    print(PROFILER.to_json())
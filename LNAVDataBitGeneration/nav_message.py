@@ -0,0 +1,85 @@
+import numpy as np
+import parity
+
+
+BITS_PER_WORD = 30
+WORDS_PER_SUBFRAME = 10
+SUBFRAMES_PER_FRAME = 5
+BITS_PER_SUBFRAME = BITS_PER_WORD * WORDS_PER_SUBFRAME
+BITS_PER_FRAME = BITS_PER_SUBFRAME * SUBFRAMES_PER_FRAME
+
+
+def words_to_bits(words):
+    ### One uint8 per bit of any number of 30-bit words, in transmission order (big endian bytes of every word, minus
+    ### its 2 unused top bits)
+    word_bytes = np.ascontiguousarray(words, dtype=">u4").view(np.uint8).reshape(-1, 4)
+    return np.unpackbits(word_bytes, axis=1)[:, 32 - BITS_PER_WORD:].reshape(-1)
+
+
+class NavMessage:
+    """Generated navigation message kept as 30-bit words in a (frames, 5, 10) uint32 array.
+
+    Frames, subframes and words are numbered from 1 as in the rest of the generator, and frame()/subframe()
+    return views into the same buffer. to_list() gives back the legacy list of 0/1 ints.
+    """
+
+    def __init__(self, words):
+        self.words = np.ascontiguousarray(words, dtype=np.uint32).reshape(-1, SUBFRAMES_PER_FRAME, WORDS_PER_SUBFRAME)
+
+
+    @classmethod
+    def from_bits(cls, bits):
+        bits = np.asarray(bits, dtype=np.uint32).reshape(-1, BITS_PER_WORD)
+        return cls(bits @ (1 << parity.WORD_SHIFTS))
+
+
+    @classmethod
+    def from_packed(cls, packed, num_bits=None):
+        bits = np.unpackbits(np.asarray(packed, dtype=np.uint8))
+        if num_bits is None:            ### Drop the padding packbits added to the last byte
+            num_bits = bits.size - bits.size % BITS_PER_SUBFRAME
+        return cls.from_bits(bits[:num_bits])
+
+
+    @property
+    def num_frames(self):
+        return self.words.shape[0]
+
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+
+    def __len__(self):
+        return self.words.size * BITS_PER_WORD
+
+
+    def __eq__(self, other):
+        return isinstance(other, NavMessage) and np.array_equal(self.words, other.words)
+
+
+    def frame(self, frame):
+        return self.words[frame - 1]
+
+
+    def subframe(self, frame, subframe):
+        return self.words[frame - 1, subframe - 1]
+
+
+    def word(self, frame, subframe, word):
+        return int(self.words[frame - 1, subframe - 1, word - 1])
+
+
+    def bits(self):
+        ### One uint8 per bit, in transmission order
+        return words_to_bits(self.words)
+
+
+    def packed(self):
+        ### 8 bits per byte, in transmission order
+        return np.packbits(self.bits())
+
+
+    def to_list(self):
+        return self.bits().tolist()
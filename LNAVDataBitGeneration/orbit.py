@@ -0,0 +1,273 @@
+import argparse
+import datetime
+import json
+
+import numpy as np
+from bit_generator import J_ITER, MU, REL_FACTOR, C, OmegaDotE, xPI
+from gps_time import LEAP_SECONDS, SECS_PER_WEEK, gps_seconds
+
+
+### WGS-84
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+KEPLER_TOLERANCE = 1e-13        ### rad, Kepler iterations stop early once every SV and time is this close
+CHUNK = 2048                    ### Times propagated at once, keeps the temporaries of a chunk in cache
+SMALL_STEP = 1e-3               ### rad, Kepler steps below this update sin/cos E with add_small instead of trig functions
+HARMONICS = ("C_uc", "C_us", "C_rc", "C_rs", "C_ic", "C_is")
+
+PARAMS = ("sqrtA", "e", "Delta_n", "M0", "omega", "Omega", "OmegaDot", "i0", "IDOT", "C_uc", "C_us", "C_rc", "C_rs",
+          "C_ic", "C_is", "toe", "toc", "Af0", "Af1", "Af2", "TGD")
+
+
+def eph_params(eph):
+    """(svs, {param: (SVs,) array}) from ephemerides as selected by Bitgenerator.readRinexFile ({sv: eph}).
+
+    toe/toc become seconds since the GPS epoch. The "toc" of the dicts carries the LEAP_SECONDS offset readRinexFile
+    has always added, it's taken off here.
+    """
+    svs = list(eph)
+    params = {name: np.array([float(eph[sv][name]) for sv in svs]) for name in PARAMS if name not in ("toe", "toc")}
+    week = np.array([float(eph[sv]["GPSWeek"]) for sv in svs]) * SECS_PER_WEEK
+    params["toe"] = week + np.array([float(eph[sv]["toe"]) for sv in svs])
+    toc = np.array([float(eph[sv]["toc"]) for sv in svs]) - LEAP_SECONDS
+    params["toc"] = week + toc - np.round((toc - params["toe"] + week) / SECS_PER_WEEK) * SECS_PER_WEEK
+    return svs, params
+
+
+def alm_params(alm, reference):
+    """Same as eph_params for an almanac as returned by readSemAlmanac, angles go from semicircles to radians.
+
+    The almanac week is only known modulo 1024 (SEM) so toa is placed in the week closest to reference (GPS seconds).
+    """
+    svs = sorted(sv for sv in alm if sv.startswith("G"))
+    get = lambda name: np.array([float(alm[sv][name]) for sv in svs])
+    zeros = np.zeros(len(svs))
+
+    week = alm["WNa"] + 1024 * round((reference / SECS_PER_WEEK - alm["WNa"]) / 1024)
+    toa = week * SECS_PER_WEEK + alm["toa"]
+    params = {name: zeros for name in PARAMS}
+    params.update({
+        "sqrtA"     :   get("sqrtA"),
+        "e"         :   get("e"),
+        "M0"        :   get("M0") * xPI,
+        "omega"     :   get("omega") * xPI,
+        "Omega"     :   get("Omega0") * xPI,
+        "OmegaDot"  :   get("OmegaDot") * xPI,
+        "i0"        :   (0.3 + get("delta_i")) * xPI,
+        "toe"       :   zeros + toa,
+        "toc"       :   zeros + toa,
+        "Af0"       :   get("Af0"),
+        "Af1"       :   get("Af1"),
+    })
+    return svs, params
+
+
+def time_grid(start, end, step=1.0):
+    ### GPS seconds from start (included) to end (excluded) every step seconds
+    return np.arange(gps_seconds(start), gps_seconds(end), step)
+
+
+def as_gps_seconds(times):
+    if isinstance(times, datetime.datetime):
+        times = [times]
+    times = list(times) if not isinstance(times, np.ndarray) else times
+    if len(times) and isinstance(times[0], datetime.datetime):
+        return np.array([gps_seconds(time) for time in times])
+    return np.asarray(times, dtype=np.float64)
+
+
+def add_small(sin_a, cos_a, d):
+    ### sin/cos of a + d for |d| << 1 (harmonic corrections, IDOT drift) from those of a, without evaluating trig functions
+    d2 = d * d
+    sin_d = d * (1 - d2 / 6 * (1 - d2 / 20))
+    cos_d = 1 - d2 / 2 * (1 - d2 / 12)
+    return sin_a * cos_d + cos_a * sin_d, cos_a * cos_d - sin_a * sin_d
+
+
+def propagate(params, times, chunk=CHUNK):
+    """ECEF positions (m) and clock corrections (s) of every SV at every time (IS-GPS-200, Tables 20-IV and 20-VI).
+
+    params as returned by eph_params/alm_params, times in GPS seconds (or datetimes). Returns xyz (SVs, times, 3)
+    and clock (SVs, times), the clock correction includes the relativistic term and TGD (L1 C/A user).
+    Kepler's equation is solved by Newton iterations (at most J_ITER), the true anomaly, argument of latitude and
+    inclination are carried as sin/cos pairs so that only the Kepler initial guess and the node need trig functions.
+    Corrections that are 0 for every SV (all of them for an almanac) are skipped.
+    """
+    t = as_gps_seconds(times)
+    num_svs = len(params["sqrtA"])
+    xyz = np.empty((num_svs, t.size, 3))
+    clock = np.empty((num_svs, t.size))
+    for sl, x, y, z, sv_clock in propagate_chunks(params, t, chunk):
+        xyz[:, sl, 0] = x
+        xyz[:, sl, 1] = y
+        xyz[:, sl, 2] = z
+        clock[:, sl] = sv_clock
+    return xyz, clock
+
+
+def propagate_chunks(params, t, chunk=CHUNK, clock=True):
+    ### propagate chunk times of t (GPS seconds) at a time: yields (slice of t, x, y, z, clock) with (SVs, chunk)
+    ### arrays, clock is None with clock=False
+    p = {name: value[:, None] for name, value in params.items()}
+
+    e = p["e"]
+    A = p["sqrtA"] ** 2
+    n = np.sqrt(MU / A ** 3) + p["Delta_n"]
+    root = np.sqrt(1 - e ** 2)
+    sin_w, cos_w = np.sin(p["omega"]), np.cos(p["omega"])
+    sin_i0, cos_i0 = np.sin(p["i0"]), np.cos(p["i0"])
+    Omega_rate = p["OmegaDot"] - OmegaDotE
+    Omega_0 = p["Omega"] - OmegaDotE * (p["toe"] % SECS_PER_WEEK)
+    e_max = float(np.max(params["e"], initial=0))
+    harmonics = any(np.any(params[name]) for name in HARMONICS)
+    drift = bool(np.any(params["IDOT"]))
+
+    for start in range(0, t.size, chunk):
+        sl = slice(start, start + chunk)
+        tk = t[None, sl] - p["toe"]
+        M = p["M0"] + n * tk
+
+        E = M + e * np.sin(M)
+        sin_E, cos_E = np.sin(E), np.cos(E)
+        for _ in range(J_ITER):
+            dE = (E - e * sin_E - M) / (1 - e * cos_E)
+            E -= dE
+            max_dE = float(np.max(np.abs(dE), initial=0))
+            if max_dE < SMALL_STEP:
+                sin_E, cos_E = add_small(sin_E, cos_E, -dE)
+            else:
+                sin_E, cos_E = np.sin(E), np.cos(E)
+            if e_max * max_dE * max_dE < KEPLER_TOLERANCE:        ### Newton converges quadratically, the next step is below tolerance
+                break
+
+        ### True anomaly nu, argument of latitude phi = nu + omega
+        denominator = 1 - e * cos_E
+        sin_nu = root * sin_E / denominator
+        cos_nu = (cos_E - e) / denominator
+        sin_phi = sin_nu * cos_w + cos_nu * sin_w
+        cos_phi = cos_nu * cos_w - sin_nu * sin_w
+        if harmonics:
+            sin_2phi = 2 * sin_phi * cos_phi
+            cos_2phi = cos_phi * cos_phi - sin_phi * sin_phi
+            sin_u, cos_u = add_small(sin_phi, cos_phi, p["C_us"] * sin_2phi + p["C_uc"] * cos_2phi)
+            r = A * denominator + p["C_rs"] * sin_2phi + p["C_rc"] * cos_2phi
+            di = p["IDOT"] * tk + p["C_is"] * sin_2phi + p["C_ic"] * cos_2phi
+        else:
+            sin_u, cos_u = sin_phi, cos_phi
+            r = A * denominator
+            di = p["IDOT"] * tk if drift else None
+        sin_i, cos_i = (sin_i0, cos_i0) if di is None else add_small(sin_i0, cos_i0, di)
+        Omega = Omega_0 + Omega_rate * tk
+
+        x_orbit, y_orbit = r * cos_u, r * sin_u
+        sin_O, cos_O = np.sin(Omega), np.cos(Omega)
+        y_cos_i = y_orbit * cos_i
+        x = x_orbit * cos_O - y_cos_i * sin_O
+        y = x_orbit * sin_O + y_cos_i * cos_O
+        z = y_orbit * sin_i
+
+        sv_clock = None
+        if clock:
+            dt = t[None, sl] - p["toc"]
+            sv_clock = p["Af0"] + (p["Af1"] + p["Af2"] * dt) * dt + REL_FACTOR * e * p["sqrtA"] * sin_E - p["TGD"]
+        yield sl, x, y, z, sv_clock
+
+
+def geodetic_to_ecef(lat, lon, height=0.0):
+    ### WGS-84 latitude/longitude (degrees) and ellipsoidal height (m) -> ECEF (m)
+    lat, lon = np.radians(lat), np.radians(lon)
+    N = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat) ** 2)
+    return np.array([
+        (N + height) * np.cos(lat) * np.cos(lon),
+        (N + height) * np.cos(lat) * np.sin(lon),
+        (N * (1 - WGS84_E2) + height) * np.sin(lat),
+    ])
+
+
+def enu_rotation(lat, lon):
+    ### Rows of the ECEF -> east/north/up rotation at a WGS-84 latitude/longitude (degrees)
+    phi, lam = np.radians(lat), np.radians(lon)
+    return (
+        (-np.sin(lam), np.cos(lam), 0.0),
+        (-np.sin(phi) * np.cos(lam), -np.sin(phi) * np.sin(lam), np.cos(phi)),
+        (np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)),
+    )
+
+
+def components_az_el(x, y, z, user, enu, earth_rotation=True):
+    ### az_el of positions given as x, y, z arrays, user as geodetic_to_ecef and enu as enu_rotation return
+    dx, dy, dz = x - user[0], y - user[1], z - user[2]
+    if earth_rotation:
+        ### The rotation is a few microradians, its sin/cos are their first terms
+        theta = np.sqrt(dx * dx + dy * dy + dz * dz)
+        theta *= OmegaDotE / C
+        cos_theta = 1 - theta * theta / 2
+        dx, dy = x * cos_theta + y * theta - user[0], y * cos_theta - x * theta - user[1]
+    east, north, up = (row[0] * dx + row[1] * dy + row[2] * dz for row in enu)
+    azimuth = np.degrees(np.arctan2(east, north))
+    azimuth %= 360
+    return azimuth, np.degrees(np.arctan2(up, np.hypot(east, north)))
+
+
+def az_el(xyz, lat, lon, height=0.0, earth_rotation=True, chunk=CHUNK):
+    """Azimuth and elevation (degrees) of ECEF positions (..., 3) seen from a WGS-84 user position.
+
+    With earth_rotation the positions are rotated by the Earth's rotation during the signal travel time (Sagnac).
+    Positions (SVs, times, 3) are done chunk times at a time, as in propagate.
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    user = geodetic_to_ecef(lat, lon, height)
+    enu = enu_rotation(lat, lon)
+    if xyz.ndim < 2:
+        return components_az_el(*xyz, user, enu, earth_rotation)
+
+    azimuth = np.empty(xyz.shape[:-1])
+    elevation = np.empty(xyz.shape[:-1])
+    for start in range(0, xyz.shape[-2], chunk):
+        sl = slice(start, start + chunk)
+        positions = xyz[..., sl, :]
+        azimuth[..., sl], elevation[..., sl] = components_az_el(positions[..., 0], positions[..., 1], positions[..., 2], user, enu, earth_rotation)
+    return azimuth, elevation
+
+
+def skyplot(eph, times, lat, lon, height=0.0, alm=None, chunk=CHUNK):
+    """(svs, azimuth, elevation) of every SV over times, (SVs, times) arrays in degrees.
+
+    Positions come from the ephemerides (eph, {sv: eph}), or from the almanac when alm is given instead. They're
+    propagated and turned into az/el chunk times at a time, the positions of the whole span are never held.
+    """
+    t = as_gps_seconds(times)
+    svs, params = eph_params(eph) if alm is None else alm_params(alm, float(np.mean(t)))
+    user = geodetic_to_ecef(lat, lon, height)
+    enu = enu_rotation(lat, lon)
+    azimuth = np.empty((len(svs), t.size))
+    elevation = np.empty((len(svs), t.size))
+    for sl, x, y, z, _ in propagate_chunks(params, t, chunk, clock=False):
+        azimuth[:, sl], elevation[:, sl] = components_az_el(x, y, z, user, enu)
+    return svs, azimuth, elevation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the azimuth/elevation of the GPS satellites seen from a position at a time, from RINEX ephemerides or a SEM almanac")
+    parser.add_argument("-r", "--rinex_path", help="Path of the RINEX file", type=str)
+    parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file, used when no RINEX file is given", type=str)
+    parser.add_argument("-t", "--time", help="GPS time YYYY-MM-DDTHH:MM:SS", type=str, required=True)
+    parser.add_argument("--lat", help="User latitude (degrees)", type=float, required=True)
+    parser.add_argument("--lon", help="User longitude (degrees)", type=float, required=True)
+    parser.add_argument("--height", help="User ellipsoidal height (m)(default=0)", type=float, default=0.0)
+    parser.add_argument("--mask", help="Elevation mask (degrees)(default=0)", type=float, default=0.0)
+    args = parser.parse_args()
+
+    time = datetime.datetime.strptime(args.time, "%Y-%m-%dT%H:%M:%S")
+    if args.rinex_path:
+        from ephemeris_store import EphemerisStore
+        svs, azimuth, elevation = skyplot(EphemerisStore.load(args.rinex_path).at(time), [time], args.lat, args.lon, args.height)
+    else:
+        from bit_generator import read_sem_almanac
+        svs, azimuth, elevation = skyplot(None, [time], args.lat, args.lon, args.height, alm=read_sem_almanac(args.almanac))
+
+    visible = {sv: {"azimuth": round(float(az[0]), 2), "elevation": round(float(el[0]), 2)}
+               for sv, az, el in zip(svs, azimuth, elevation) if el[0] >= args.mask}
+    print(json.dumps(visible, indent=2))
@@ -0,0 +1,90 @@
+### Packing of engineering values into LNAV source data words, compiled from the layouts tables.
+import numpy as np
+import layouts
+
+
+NUM_WORDS = 10
+
+
+class Packer:
+    """A layout (tuple of layouts.Field) compiled to shift/mask packing of 24-bit source data words.
+
+    pack({name: value}) quantizes every field at once (value / xPI for semicircle fields, / scale, rounded half to
+    even like round()), checks all of them against their widths in one go and ORs the pieces into the words. Fields
+    missing from values are 0, words outside the layout (TLM, HOW) are left 0 for the caller.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.names = tuple(field.name for field in self.fields)
+        widths = np.array([sum(bits for _, _, bits in field.pieces) for field in self.fields], dtype=np.int64)
+        signed = np.array([field.signed for field in self.fields])
+
+        self.divisor = np.array([layouts.xPI if field.semicircles else 1.0 for field in self.fields])
+        self.scale = np.array([float(field.scale) for field in self.fields])
+        self.low = np.where(signed, -(1 << (widths - 1)), 0)
+        self.high = np.where(signed, (1 << (widths - 1)) - 1, (1 << widths) - 1)
+        self.mask = (1 << widths) - 1
+
+        ### One entry per piece: which field, how far to shift the field down, the piece mask and where it goes
+        field_index, value_shift, piece_mask, word_shift, word_index = [], [], [], [], []
+        for i, field in enumerate(self.fields):
+            remaining = int(widths[i])
+            for word, first, bits in field.pieces:
+                remaining -= bits
+                field_index.append(i)
+                value_shift.append(remaining)
+                piece_mask.append((1 << bits) - 1)
+                word_shift.append(25 - first - bits)
+                word_index.append(word - 1)
+        self.field_index = np.array(field_index, dtype=np.intp)
+        self.value_shift = np.array(value_shift, dtype=np.int64)
+        self.piece_mask = np.array(piece_mask, dtype=np.int64)
+        self.word_shift = np.array(word_shift, dtype=np.int64)
+        ### Pieces never overlap, so summing them into their words (a matrix product) is the same as ORing them
+        self.placement = np.zeros((len(field_index), NUM_WORDS), dtype=np.int64)
+        self.placement[np.arange(len(field_index)), word_index] = 1
+
+
+    def shift(self, name):
+        ### Position of a single piece field within its word, for callers that pack it by hand
+        field = self.fields[self.names.index(name)]
+        (word, first, bits), = field.pieces
+        return 25 - first - bits
+
+
+    def quantize(self, values):
+        """Two's complement integers of the fields, (fields,) for scalar values or (n, fields) for (n,) arrays.
+
+        Raises ValueError naming every field that doesn't fit its width.
+        """
+        raw = np.array([values.get(name, 0) for name in self.names], dtype=np.float64).T
+        quantized = np.rint(raw / self.divisor / self.scale)
+        overflow = ~((quantized >= self.low) & (quantized <= self.high))       ### NaN fails both
+        if overflow.any():
+            bad = np.flatnonzero(overflow.reshape(-1, len(self.names)).any(axis=0))
+            raise ValueError("Can't be represented in their bits: " + ", ".join(
+                f"{self.names[i]}={values.get(self.names[i])}" for i in bad))
+        return quantized.astype(np.int64) & self.mask
+
+
+    def pack(self, values):
+        ### 10 source data words as ints from {name: scalar}, or a (n, 10) array from {name: (n,) array}
+        quantized = self.quantize(values)
+        pieces = ((quantized[..., self.field_index] >> self.value_shift) & self.piece_mask) << self.word_shift
+        words = pieces @ self.placement
+        return words.tolist() if words.ndim == 1 else words
+
+
+HOW = Packer(layouts.HOW)
+SUBFRAMES = {
+    1   :   Packer(layouts.SUBFRAME_1),
+    2   :   Packer(layouts.SUBFRAME_2),
+    3   :   Packer(layouts.SUBFRAME_3),
+}
+PAGE_ID = Packer(layouts.PAGE_ID)
+
+### Subframe 4/5 pages by SV ID, the almanac pages share one compiled layout
+PAGES = {}
+for _sv_id, _layout in layouts.PAGE_LAYOUTS.items():
+    PAGES[_sv_id] = next((packer for packer in PAGES.values() if packer.fields == _layout), None) or Packer(_layout)
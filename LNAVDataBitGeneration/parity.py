@@ -0,0 +1,195 @@
+### LNAV word parity (IS-GPS-200, Table 20-XIV) on 30-bit words held as ints.
+### Bit D1 of a word is its most significant bit, D30 the least significant one, data bits d1 - d24 are bits 29 - 6.
+import numpy as np
+
+
+### Source data bits (0 = d1) entering each of D25 - D30, on top of D29* or D30* of the previous word
+PARITY_INDICES = (
+    (0, 1, 2, 4, 5, 9, 10, 11, 12, 13, 16, 17, 19, 22),                     ### D25, ^ D29*
+    (1, 2, 3, 5, 6, 10, 11, 12, 13, 14, 17, 18, 20, 23),                    ### D26, ^ D30*
+    (0, 2, 3, 4, 6, 7, 11, 12, 13, 14, 15, 18, 19, 21),                     ### D27, ^ D29*
+    (1, 3, 4, 5, 7, 8, 12, 13, 14, 15, 16, 19, 20, 22),                     ### D28, ^ D30*
+    (0, 2, 4, 5, 6, 8, 9, 13, 14, 15, 16, 17, 20, 21, 23),                  ### D29, ^ D30*
+    (2, 4, 5, 7, 8, 9, 10, 12, 14, 18, 21, 22, 23),                         ### D30, ^ D29*
+)
+PARITY_MASKS = tuple(sum(1 << (23 - i) for i in indices) for indices in PARITY_INDICES)
+
+DATA_MASK = 0xFFFFFF
+D29_STAR_PARITY = 0b101001      ### D29* enters D25, D27, D30
+D30_STAR_PARITY = 0b010110      ### D30* enters D26, D28, D29
+
+
+def popcount_parity(value):
+    return bin(value).count("1") & 1
+
+
+def parity_table(shift):
+    ### Parity bits D25 - D30 (without the D29*/D30* terms) contributed by one byte of the data word.
+    ### The parity is linear, so each entry is the entry without the byte's lowest set bit XOR that bit's entry.
+    single = []
+    for bit in range(8):
+        data = 1 << (bit + shift)
+        bits = 0
+        for mask in PARITY_MASKS:
+            bits = (bits << 1) | popcount_parity(data & mask)
+        single.append(bits)
+
+    table = [0]
+    for byte in range(1, 256):
+        table.append(table[byte & (byte - 1)] ^ single[(byte & -byte).bit_length() - 1])
+    return tuple(table)
+
+
+PARITY_HIGH = parity_table(16)
+PARITY_MID = parity_table(8)
+PARITY_LOW = parity_table(0)
+
+### Indexed by (D29* << 1) | D30*, i.e. by the two last bits of the previous word.
+### XORing a word with STAR_XOR applies both the D30* complement of d1 - d24 and the star terms of the parity.
+STAR_XOR = (
+    0,
+    (DATA_MASK << 6) | D30_STAR_PARITY,
+    D29_STAR_PARITY,
+    (DATA_MASK << 6) | D29_STAR_PARITY | D30_STAR_PARITY,
+)
+STAR_PARITY = (0, D30_STAR_PARITY, D29_STAR_PARITY, D29_STAR_PARITY | D30_STAR_PARITY)
+
+
+def parity(data, D29_star=0, D30_star=0):
+    ### D25 - D30 of a 24-bit source data word as a 6-bit int
+    return PARITY_HIGH[data >> 16] ^ PARITY_MID[(data >> 8) & 0xFF] ^ PARITY_LOW[data & 0xFF] ^ STAR_PARITY[(D29_star << 1) | D30_star]
+
+
+def encode_word(data, D29_star=0, D30_star=0):
+    ### 24-bit source data word -> 30-bit transmitted word
+    word = (data << 6) | PARITY_HIGH[data >> 16] ^ PARITY_MID[(data >> 8) & 0xFF] ^ PARITY_LOW[data & 0xFF]
+    return word ^ STAR_XOR[(D29_star << 1) | D30_star]
+
+
+def encode_after(data, previous_word):
+    ### Same as encode_word, with D29*/D30* taken from the previous 30-bit word
+    word = (data << 6) | PARITY_HIGH[data >> 16] ^ PARITY_MID[(data >> 8) & 0xFF] ^ PARITY_LOW[data & 0xFF]
+    return word ^ STAR_XOR[previous_word & 0b11]
+
+
+def solve_t(data22, D29_star=0, D30_star=0):
+    ### Bits 23 and 24 of words 2 and 10 are chosen so that D29 and D30 come out as 0 (IS-GPS-200, 20.3.5.2)
+    p = parity(data22 << 2, D29_star, D30_star)
+    d24 = (p >> 1) & 1
+    d23 = (p & 1) ^ d24
+    return (d23 << 1) | d24
+
+
+def append_t(data22, D29_star=0, D30_star=0):
+    return (data22 << 2) | solve_t(data22, D29_star, D30_star)
+
+
+def encode_subframe(data):
+    ### 10 source words of a subframe -> 10 transmitted words.
+    ### Bits 23, 24 of words 2 (HOW) and 10 are left as 0 in data and solved here. Word 1 (TLM) follows a word 10,
+    ### which always ends in 00, so it's encoded with D29* = D30* = 0.
+    words = [encode_word(data[0])]
+    for i in range(1, 10):
+        d = data[i]
+        if i == 1 or i == 9:
+            stars = words[-1] & 0b11
+            d |= solve_t(d >> 2, stars >> 1, stars & 1)
+        words.append(encode_after(d, words[-1]))
+    return words
+
+
+### Conversion between the bit lists used by Bitgenerator and ints
+BYTE_BITS = tuple(tuple((byte >> (7 - i)) & 1 for i in range(8)) for byte in range(256))
+
+
+def bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def int_to_bits(value, bits):
+    out = []
+    for shift in range(((bits - 1) // 8) * 8, -1, -8):
+        out += BYTE_BITS[(value >> shift) & 0xFF]
+    return out[len(out) - bits:]
+
+
+### Batched encoding with NumPy. Without the D29*/D30* terms the parity is a fixed linear map over GF(2),
+### D25 - D30 = d1 - d24 @ PARITY_MATRIX (mod 2), only the star chaining between words has to be scanned.
+### The product is evaluated one byte of the data words at a time: the 256 possible products of each byte with
+### its 8 rows of PARITY_MATRIX are computed once, so a batch costs three gathers and two XORs per word.
+PARITY_MATRIX = np.array([[1 if i in indices else 0 for indices in PARITY_INDICES] for i in range(24)], dtype=np.uint8)
+PARITY_WEIGHTS = np.array([32, 16, 8, 4, 2, 1], dtype=np.uint32)
+WORD_SHIFTS = np.arange(29, -1, -1, dtype=np.uint32)
+STAR_XOR_ARRAY = np.array(STAR_XOR, dtype=np.uint32)
+STAR_PARITY_ARRAY = np.array(STAR_PARITY, dtype=np.uint32)
+SWAP_STARS = np.array([0b00, 0b10, 0b01, 0b11], dtype=np.uint32)      ### (D29*, D30*) -> (D30*, D29*)
+
+
+def unpack_words(words, bits=30):
+    ### (...) array of words -> (..., bits) uint8 array of bits, most significant first
+    words = np.asarray(words, dtype=np.uint32)
+    return ((words[..., None] >> WORD_SHIFTS[30 - bits:]) & 1).astype(np.uint8)
+
+
+def gf2_byte_products(rows):
+    byte_bits = unpack_words(np.arange(256), bits=8)
+    return (((byte_bits @ rows) & 1).astype(np.uint32) @ PARITY_WEIGHTS).astype(np.uint32)
+
+
+PARITY_HIGH_ARRAY = gf2_byte_products(PARITY_MATRIX[0:8])
+PARITY_MID_ARRAY = gf2_byte_products(PARITY_MATRIX[8:16])
+PARITY_LOW_ARRAY = gf2_byte_products(PARITY_MATRIX[16:24])
+
+
+def parity_batch(data):
+    ### D25 - D30 of every 24-bit word of data, without the D29*/D30* terms
+    data = np.asarray(data, dtype=np.uint32)
+    return PARITY_HIGH_ARRAY[data >> 16] ^ PARITY_MID_ARRAY[(data >> 8) & 0xFF] ^ PARITY_LOW_ARRAY[data & 0xFF]
+
+
+def encode_words(data, D29_star=0, D30_star=0):
+    """Encode chains of words along the last axis of data, every chain starting from the given D29*/D30*.
+
+    With S = (D29* << 1) | D30* the stars of word k, S[k + 1] = swap(S[k]) ^ U[k] where U[k] = (p29 << 1) | p30
+    are the star free D29, D30 parity bits of word k. Since swap is its own inverse that unrolls to
+    S[k] = swap^k(S[0] ^ XOR(j < k) swap^(j + 1)(U[j])), i.e. a cumulative XOR over the words.
+    """
+    data = np.asarray(data, dtype=np.uint32)
+    p = parity_batch(data)
+    u = p & 0b11
+    k = np.arange(data.shape[-1])
+    v = np.where(k % 2 == 0, SWAP_STARS[u], u)
+    x = np.bitwise_xor.accumulate(v, axis=-1)
+    x = np.concatenate([np.zeros_like(x[..., :1]), x[..., :-1]], axis=-1)       ### Exclusive scan
+    stars = np.asarray((np.asarray(D29_star, dtype=np.uint32) << 1) | np.asarray(D30_star, dtype=np.uint32))
+    stars = stars[..., None] ^ x
+    stars = np.where(k % 2 == 1, SWAP_STARS[stars], stars)
+    return ((data << 6) | p) ^ STAR_XOR_ARRAY[stars]
+
+
+def encode_subframes(data):
+    """Encode any number of subframes at once, data is a (..., 10) array of source words as taken by encode_subframe.
+
+    Leading axes can be anything, e.g. (frames, 5, 10) for one PRN or (PRNs, frames, 5, 10) for the constellation.
+    """
+    data = np.asarray(data, dtype=np.uint32)
+    words = np.empty(data.shape, dtype=np.uint32)
+
+    words[..., 0] = encode_words(data[..., 0:1])[..., 0]
+    words[..., 1] = encode_solved(data[..., 1], words[..., 0] & 0b11)
+    words[..., 2:9] = encode_words(data[..., 2:9])      ### Word 2 ends in 00, so each chain starts with D29* = D30* = 0
+    words[..., 9] = encode_solved(data[..., 9], words[..., 8] & 0b11)
+    return words
+
+
+def encode_solved(data, stars):
+    ### Words 2 and 10: solve bits 23, 24 for D29 = D30 = 0, then encode with the previous word's stars
+    p = parity_batch(data) ^ STAR_PARITY_ARRAY[stars]
+    d24 = (p >> 1) & 1
+    d23 = (p & 1) ^ d24
+    data = data | (d23 << 1) | d24
+    p = parity_batch(data)
+    return ((data << 6) | p) ^ STAR_XOR_ARRAY[stars]
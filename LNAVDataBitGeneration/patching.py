@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import writers
+from almanac_archive import FLOAT_FIELDS, INT_FIELDS
+from nav_message import SUBFRAMES_PER_FRAME, WORDS_PER_SUBFRAME
+from profiling import PROFILER
+from records import AlmanacEntry
+
+
+PAGES = 25
+MESSAGE_PAGE = (4, 17)          ### (subframe, page) of the special message
+ALMANAC_KEYS = ("id",) + INT_FIELDS + FLOAT_FIELDS
+
+
+def almanac_page(prn):
+    ### (subframe, page) of the almanac of prn, see Bitgenerator.sf4_data/sf5_data
+    if prn <= 24:
+        return 5, prn
+    return 4, prn - 23 if prn <= 28 else prn - 22
+
+
+def health_page(prn):
+    ### (subframe, page) of the page 25 carrying the health of prn
+    return (5, 25) if prn <= 24 else (4, 25)
+
+
+class StreamPatcher:
+    """Keeps a generated stream, and the file it was written to, up to date with message/health/almanac changes.
+
+    Only the subframes carrying the change are encoded again, through bit_generator, and only the words that came
+    out different are copied into nav_message and rewritten in the file (see writers.PATCHERS), so an update costs
+    in proportion to the change and not to the stream. Words 3 - 10 don't depend on the HOW (its last 2 bits are
+    solved so D29 = D30 = 0) and word 10 ends in 00 as well, so nothing outside the patched subframes changes.
+
+    nav_message is the stream bit_generator generated with message, frame 1 of it being page first_page. fname, if
+    given, is the .txt/.bin/.npy file it was written to. Every set_* returns the flat indexes of the words that
+    changed.
+    """
+
+    def __init__(self, bit_generator, nav_message, message="No message sent", fname=None, first_page=1):
+        self.bit_generator = bit_generator
+        self.nav_message = nav_message
+        self.message = message
+        self.fname = fname
+        self.first_page = first_page
+        self.prn = int(bit_generator.sv[1:])
+
+
+    def set_message(self, message):
+        self.message = message
+        return self.patch([MESSAGE_PAGE])
+
+
+    def set_health(self, prn, health):
+        return self.set_almanac_entry(prn, health=health)
+
+
+    def set_almanac_entry(self, prn, **values):
+        """Change fields of the almanac of prn (readSemAlmanac names and units), a PRN missing from the almanac needs
+        all of them. Patches its almanac page, and the page 25 of its health and/or configuration if they changed.
+        """
+        sv = "G%02d" % prn
+        bit_generator = self.bit_generator
+        entry = dict(bit_generator.alm.get(sv, {}), **values)
+        missing = [key for key in ALMANAC_KEYS if key not in entry]
+        if missing:
+            raise ValueError(f"{sv} isn't in the almanac, {', '.join(missing)} must be given too")
+
+        alm = dict(bit_generator.alm)
+        alm[sv] = AlmanacEntry.from_mapping(entry)
+        ### A ConstellationGenerator shares its almanac and page cache between SVs, this SV gets its own from now on
+        bit_generator.alm_cache = {}
+        bit_generator.set_almanac(alm)
+
+        pages = [almanac_page(prn)]
+        if "health" in values:
+            pages.append(health_page(prn))
+        if "config" in values:
+            pages.append((4, 25))
+        return self.patch(pages)
+
+
+    def frames(self, page):
+        ### Frames (from 0) of the stream that carry page
+        return np.arange((page - self.first_page) % PAGES, self.nav_message.num_frames, PAGES)
+
+
+    def patch(self, pages):
+        """Encode the (subframe, page) subframes again and update the stream and the file where the words changed.
+
+        Returns the flat indexes of the changed words, sorted.
+        """
+        words = self.nav_message.words
+        changed = []
+        with PROFILER.stage("patch"):
+            for subframe, page in set(pages):
+                frames = self.frames(page)
+                if not frames.size:
+                    continue
+                body = np.array(self.bit_generator.encoded_subframe(subframe, page, self.message)[2:], dtype=np.uint32)
+                old = words[frames, subframe - 1, 2:]
+                rows, columns = np.nonzero(old != body)
+                words[frames[rows], subframe - 1, columns + 2] = body[columns]
+                changed.append((frames[rows] * SUBFRAMES_PER_FRAME + subframe - 1) * WORDS_PER_SUBFRAME + columns + 2)
+        indexes = np.sort(np.concatenate(changed)) if changed else np.zeros(0, dtype=np.int64)
+        PROFILER.count("words_patched", indexes.size)
+
+        if self.fname is not None and indexes.size:
+            extension = os.path.splitext(self.fname)[1][1:]
+            writers.PATCHERS[extension](self.fname, self.nav_message, indexes, self.prn)
+        return indexes
@@ -0,0 +1,100 @@
+### Opt-in per stage timers and counters. While disabled (the default) stage() hands back one shared no-op context
+### manager and count() returns after a single attribute check, so the instrumented code paths cost next to nothing.
+import contextlib
+import json
+import time
+
+
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds, calls = self.profiler.timers.get(self.name, (0.0, 0))
+        self.profiler.timers[self.name] = (seconds + time.perf_counter() - self.t0, calls + 1)
+        return False
+
+
+class Profiler:
+    """Accumulates the time spent in named stages and named counters.
+
+    Stages may nest (e.g. "parity" inside "gen_message"), each one is timed on its own so nested times are also
+    part of their parent's.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.counters = {}
+
+
+    def enable(self):
+        self.enabled = True
+
+
+    def disable(self):
+        self.enabled = False
+
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+
+
+    def stage(self, name):
+        return Stage(self, name) if self.enabled else NULL_STAGE
+
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+
+    def report(self):
+        return {
+            "stages": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.timers.items()},
+            "counters": dict(self.counters),
+        }
+
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2)
+
+
+    @contextlib.contextmanager
+    def cprofile(self, fname=None, top=0):
+        ### cProfile the block when fname is given and dump its pstats there, top > 0 also prints the top entries
+        if fname is None:
+            yield None
+            return
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            profile.dump_stats(fname)
+            if top:
+                pstats.Stats(profile).sort_stats("cumulative").print_stats(top)
+
+
+### The profiler every module reports to
+PROFILER = Profiler()
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import struct
+
+from bit_generator import read_sem_almanac
+from ephemeris_store import EphemerisStore
+from gps_time import GPS_EPOCH, LEAP_SECONDS, SECS_PER_WEEK, gps_seconds
+from streaming import SUBFRAME_SECONDS, iter_subframes
+
+
+### PRN, GPS week, TOW of the subframe start (s), subframe id, then the 10 words of the subframe, big endian
+PACKET = struct.Struct(">BHIB10I")
+
+
+def gps_now():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + datetime.timedelta(seconds=LEAP_SECONDS)
+
+
+def pack_subframe(prn, time, subframe, words):
+    week, tow = divmod(int(gps_seconds(time)), SECS_PER_WEEK)
+    return PACKET.pack(prn, week, tow, subframe, *words)
+
+
+class QueueSink:
+    ### Puts (prn, time, subframe, words) on an asyncio queue, for in-process consumers and local testing
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def open(self):
+        pass
+
+    def send(self, prn, time, subframe, words):
+        self.queue.put_nowait((prn, time, subframe, words))
+
+    def close(self):
+        pass
+
+
+class UdpSink:
+    ### One PACKET datagram per subframe
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.transport = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=self.address)
+
+    def send(self, prn, time, subframe, words):
+        self.transport.sendto(pack_subframe(prn, time, subframe, words))
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+class TcpSink:
+    ### PACKETs back to back on one TCP connection
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.writer = None
+
+    async def open(self):
+        _, self.writer = await asyncio.open_connection(*self.address)
+
+    def send(self, prn, time, subframe, words):
+        self.writer.write(pack_subframe(prn, time, subframe, words))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class SendStats:
+    def __init__(self):
+        self.sent = 0
+        self.misses = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+
+    def add(self, jitter, missed):
+        self.sent += 1
+        self.misses += missed
+        self.jitter_sum += abs(jitter)
+        self.jitter_max = max(self.jitter_max, abs(jitter))
+
+    def report(self):
+        return {
+            "sent": self.sent,
+            "deadline_misses": self.misses,
+            "mean_jitter_ms": self.jitter_sum / self.sent * 1e3 if self.sent else 0.0,
+            "max_jitter_ms": self.jitter_max * 1e3,
+        }
+
+
+class SubframePublisher:
+    """Emits every subscribed PRN's subframes in real time, one every 6 s aligned to GPS time.
+
+    Upcoming subframes are computed by one producer task per PRN, up to lookahead subframes before their deadline.
+    A send counts as a deadline miss when it's late by more than late_threshold seconds, or when its subframe wasn't
+    ready at the deadline. With start=None the stream follows the system clock (the next 6 s boundary of GPS time),
+    otherwise the first subframe boundary at or after start is emitted right away and speedup > 1 runs the schedule faster than real time.
+    """
+
+    def __init__(self, rinex_file, alm_file, start=None, message="No message sent", lookahead=3, speedup=1.0, late_threshold=0.005):
+        self.store = rinex_file if isinstance(rinex_file, EphemerisStore) else EphemerisStore.load(rinex_file)
+        self.alm = alm_file if isinstance(alm_file, dict) else read_sem_almanac(alm_file)
+
+        self.realtime = start is None
+        self.start = start
+        self.message = message
+        self.lookahead = lookahead
+        self.speedup = speedup
+        self.late_threshold = late_threshold
+        self.subscribers = {}
+        self.stats = {}
+
+
+    def subscribe(self, prn, sink):
+        self.subscribers.setdefault(prn, []).append(sink)
+        self.stats.setdefault(prn, SendStats())
+
+
+    def metrics(self):
+        return {"G%02d" % prn: stats.report() for prn, stats in self.stats.items()}
+
+
+    async def produce(self, prn, queue, start, count):
+        for i, subframe in enumerate(iter_subframes(self.store, self.alm, prn, start, message=self.message)):
+            if count is not None and i >= count:
+                break
+            await queue.put(subframe)
+
+
+    async def next_subframe(self, prn, queue, producer):
+        ### The next subframe of prn's queue. Raises the producer's exception when it failed (e.g. no ephemeris for prn)
+        ### instead of waiting for a subframe that will never come
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait((getter, producer), return_when=asyncio.FIRST_COMPLETED)
+        if not getter.done():
+            getter.cancel()
+            if not producer.cancelled() and producer.exception() is not None:
+                raise producer.exception()
+            raise RuntimeError(f"The subframe stream of G{prn:02d} ended")
+        return getter.result()
+
+
+    async def run(self, count=None):
+        ### Publishes count subframes per PRN (forever with None) and returns metrics()
+        loop = asyncio.get_running_loop()
+        now = gps_now() if self.realtime else self.start
+        start = GPS_EPOCH + datetime.timedelta(seconds=math.ceil(gps_seconds(now) / SUBFRAME_SECONDS) * SUBFRAME_SECONDS)
+        wall_zero, gps_zero = loop.time(), gps_seconds(now)
+
+        for sinks in self.subscribers.values():
+            for sink in sinks:
+                await sink.open()
+
+        queues = {prn: asyncio.Queue(maxsize=self.lookahead) for prn in self.subscribers}
+        producers = [asyncio.create_task(self.produce(prn, queue, start, count)) for prn, queue in queues.items()]
+
+        try:
+            step = 0
+            while count is None or step < count:
+                time = start + datetime.timedelta(seconds=step * SUBFRAME_SECONDS)
+                deadline = wall_zero + (gps_seconds(time) - gps_zero) / self.speedup
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+                for (prn, queue), producer in zip(queues.items(), producers):
+                    ready = not queue.empty()
+                    sf_time, subframe, _, words = await self.next_subframe(prn, queue, producer)
+                    for sink in self.subscribers[prn]:
+                        sink.send(prn, sf_time, subframe, words)
+                    jitter = loop.time() - deadline
+                    self.stats[prn].add(jitter, missed=not ready or jitter > self.late_threshold)
+                step += 1
+        finally:
+            for producer in producers:
+                producer.cancel()
+            for sinks in self.subscribers.values():
+                for sink in sinks:
+                    sink.close()
+
+        return self.metrics()
+
+
+async def loopback_demo(args):
+    ### Publishes to a UDP socket on localhost and checks every subframe arrives
+    start = datetime.datetime.strptime(args.time, "%Y-%m-%dT%H:%M:%S") if args.time else None
+    publisher = SubframePublisher(args.rinex_path, args.almanac, start=start, message=args.message, speedup=args.speedup)
+
+    received = asyncio.Queue()
+
+    class Receiver(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            received.put_nowait(PACKET.unpack(data))
+
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(Receiver, local_addr=("127.0.0.1", args.port))
+    try:
+        for prn in args.prns:
+            publisher.subscribe(prn, UdpSink("127.0.0.1", args.port))
+        metrics = await publisher.run(count=args.count)
+        await asyncio.sleep(0.1)
+    finally:
+        transport.close()
+
+    metrics["received_packets"] = received.qsize()
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish navigation message subframes in real time to a loopback UDP sink and print send metrics")
+    parser.add_argument("-r", "--rinex_path", help="Path of the RINEX file", type=str, required=True)
+    parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file", type=str, required=True)
+    parser.add_argument("-t", "--time", help="GPS time of the first subframe, YYYY-MM-DDTHH:MM:SS (default: follow the system clock)", type=str, default=None)
+    parser.add_argument("-p", "--prns", help="PRNs to publish", type=int, nargs="+", required=True)
+    parser.add_argument("-m", "--message", help="Subframe 4 page 17 message (optional)", type=str, default="No Message")
+    parser.add_argument("-n", "--count", help="Number of subframes per PRN", type=int, default=5)
+    parser.add_argument("--speedup", help="Run the schedule this many times faster than real time (only with --time)", type=float, default=1.0)
+    parser.add_argument("--port", help="Loopback UDP port", type=int, default=50600)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(loopback_demo(args)), indent=2))
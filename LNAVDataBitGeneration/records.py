@@ -0,0 +1,258 @@
+### Typed, compact ephemeris and almanac records. Many ephemerides are held as one NumPy structured array (a row per
+### record, see EphemerisStore and input_cache), the ones selected for a time and the almanac entries as __slots__
+### objects the encoders read by attribute. Records still answer record["name"], get(), keys() and dict(record) for
+### the code that reads them by name.
+import numpy as np
+import rinex_reader
+from gps_time import GPS_EPOCH, LEAP_SECONDS, SECS_PER_WEEK, gps_seconds
+
+
+EPH_FIELDS = rinex_reader.GPS_NAV_FIELDS + ("toc",)
+ALM_FIELDS = ("id", "SVID", "URA", "e", "delta_i", "OmegaDot", "sqrtA", "Omega0", "omega", "M0", "Af0", "Af1", "health", "config")
+
+### One row per navigation record, epoch in seconds since the GPS epoch
+EPH_DTYPE = np.dtype([("sv", "U3"), ("epoch", "i8")] + [(field, "f8") for field in rinex_reader.GPS_NAV_FIELDS])
+
+### One row per SV, the almanac header is repeated on every row
+ALM_HEADER = ("num_svs", "WNa", "toa")
+ALM_INT_FIELDS = ("id", "SVID", "URA", "health", "config")
+ALM_FLOAT_FIELDS = ("e", "delta_i", "OmegaDot", "sqrtA", "Omega0", "omega", "M0", "Af0", "Af1")
+ALM_DTYPE = np.dtype([(field, "i4") for field in ALM_HEADER + ALM_INT_FIELDS] + [(field, "f8") for field in ALM_FLOAT_FIELDS])
+
+### georinex variable of every ephemeris field (from_georinex, georinex_array)
+GEORINEX_NAMES = {
+    "Af0"           :   "SVclockBias",
+    "Af1"           :   "SVclockDrift",
+    "Af2"           :   "SVclockDriftRate",
+    "IODE"          :   "IODE",
+    "C_rs"          :   "Crs",
+    "Delta_n"       :   "DeltaN",
+    "M0"            :   "M0",
+    "C_uc"          :   "Cuc",
+    "e"             :   "Eccentricity",
+    "C_us"          :   "Cus",
+    "sqrtA"         :   "sqrtA",
+    "toe"           :   "Toe",
+    "C_ic"          :   "Cic",
+    "Omega"         :   "Omega0",
+    "C_is"          :   "Cis",
+    "i0"            :   "Io",
+    "C_rc"          :   "Crc",
+    "omega"         :   "omega",
+    "OmegaDot"      :   "OmegaDot",
+    "IDOT"          :   "IDOT",
+    "L2ChannelCode" :   "CodesL2",
+    "GPSWeek"       :   "GPSWeek",
+    "L2PDataFlag"   :   "L2Pflag",
+    "SVAcc"         :   "SVacc",
+    "health"        :   "health",
+    "TGD"           :   "TGD",
+    "IODC"          :   "IODC",
+    "TransTime"     :   "TransTime",
+    "FitInterval"   :   "FitIntvl",
+}
+
+
+class Record:
+    ### Fields are the __slots__ of the subclass, in the order of its __init__ arguments
+    __slots__ = ()
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        ### A record of the fields of a dict (or record), extra keys are ignored
+        if isinstance(mapping, cls):
+            return mapping
+        return cls(*[mapping[field] for field in cls.__slots__])
+
+
+    def replace(self, **changes):
+        record = type(self)(*self.values())
+        for field, value in changes.items():
+            setattr(record, field, value)
+        return record
+
+
+    def values(self):
+        return [getattr(self, field) for field in self.__slots__]
+
+
+    def keys(self):
+        return self.__slots__
+
+
+    def items(self):
+        return zip(self.__slots__, self.values())
+
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in self.__slots__ else default
+
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+
+    def __setitem__(self, name, value):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+
+    def __contains__(self, name):
+        return name in self.__slots__
+
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+
+    def __len__(self):
+        return len(self.__slots__)
+
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        return isinstance(other, dict) and dict(self.items()) == other
+
+    __hash__ = None
+
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{field}={value!r}' for field, value in self.items())})"
+
+
+class Ephemeris(Record):
+    ### Broadcast ephemeris of one SV, rinex_reader.GPS_NAV_FIELDS and toc (s of week, + LEAP_SECONDS as always)
+    __slots__ = EPH_FIELDS
+
+    def __init__(self, Af0, Af1, Af2, IODE, C_rs, Delta_n, M0, C_uc, e, C_us, sqrtA, toe, C_ic, Omega, C_is, i0,
+                 C_rc, omega, OmegaDot, IDOT, L2ChannelCode, GPSWeek, L2PDataFlag, SVAcc, health, TGD, IODC,
+                 TransTime, FitInterval, toc):
+        self.Af0 = Af0
+        self.Af1 = Af1
+        self.Af2 = Af2
+        self.IODE = IODE
+        self.C_rs = C_rs
+        self.Delta_n = Delta_n
+        self.M0 = M0
+        self.C_uc = C_uc
+        self.e = e
+        self.C_us = C_us
+        self.sqrtA = sqrtA
+        self.toe = toe
+        self.C_ic = C_ic
+        self.Omega = Omega
+        self.C_is = C_is
+        self.i0 = i0
+        self.C_rc = C_rc
+        self.omega = omega
+        self.OmegaDot = OmegaDot
+        self.IDOT = IDOT
+        self.L2ChannelCode = L2ChannelCode
+        self.GPSWeek = GPSWeek
+        self.L2PDataFlag = L2PDataFlag
+        self.SVAcc = SVAcc
+        self.health = health
+        self.TGD = TGD
+        self.IODC = IODC
+        self.TransTime = TransTime
+        self.FitInterval = FitInterval
+        self.toc = toc
+
+
+class AlmanacEntry(Record):
+    ### One SV of a SEM almanac, in readSemAlmanac's units (angles in semicircles)
+    __slots__ = ALM_FIELDS
+
+    def __init__(self, id, SVID, URA, e, delta_i, OmegaDot, sqrtA, Omega0, omega, M0, Af0, Af1, health, config):
+        self.id = id
+        self.SVID = SVID
+        self.URA = URA
+        self.e = e
+        self.delta_i = delta_i
+        self.OmegaDot = OmegaDot
+        self.sqrtA = sqrtA
+        self.Omega0 = Omega0
+        self.omega = omega
+        self.M0 = M0
+        self.Af0 = Af0
+        self.Af1 = Af1
+        self.health = health
+        self.config = config
+
+
+def as_almanac(alm):
+    ### alm with every SV entry an AlmanacEntry, alm itself when they already are
+    if all(isinstance(value, AlmanacEntry) for key, value in alm.items() if key not in ALM_HEADER):
+        return alm
+    return {key: value if key in ALM_HEADER else AlmanacEntry.from_mapping(value) for key, value in alm.items()}
+
+
+def records_to_array(records):
+    ### rinex_reader records -> EPH_DTYPE array
+    array = np.zeros(len(records), dtype=EPH_DTYPE)
+    array["sv"] = [record["sv"] for record in records]
+    array["epoch"] = [round(gps_seconds(record["epoch"])) for record in records]
+    for field in rinex_reader.GPS_NAV_FIELDS:
+        array[field] = [record[field] for record in records]
+    return array
+
+
+def ephemerides(array, toc):
+    ### {sv: Ephemeris} of EPH_DTYPE rows, one column extraction per field. toc: (rows,) values of the toc field
+    columns = [array[field].tolist() for field in rinex_reader.GPS_NAV_FIELDS] + [np.asarray(toc, dtype=np.float64).tolist()]
+    return {sv: Ephemeris(*values) for sv, *values in zip(array["sv"].tolist(), *columns)}
+
+
+def from_georinex(dataset, time):
+    """{sv: Ephemeris} of the GPS SVs of a georinex navigation dataset with a record at time (pandas Timestamp).
+
+    One selection of every SV and one array extraction per field, instead of a scalar lookup per SV and field. toc
+    is the time of week of time (+ LEAP_SECONDS as always).
+    """
+    in_file = set(dataset.sv.values.tolist())
+    svs = [sv for sv in ("G%02d" % svn for svn in range(1, 33)) if sv in in_file]
+    selected = dataset.sel(sv=svs, time=time)
+    array = np.zeros(len(svs), dtype=EPH_DTYPE)
+    array["sv"] = svs
+    for field, name in GEORINEX_NAMES.items():
+        array[field] = selected[name].values
+    array = array[~np.isnan(array["IODE"])]             ### PRN not found
+    toc = (time - GPS_EPOCH).total_seconds() % SECS_PER_WEEK + LEAP_SECONDS
+    return ephemerides(array, np.full(len(array), toc))
+
+
+def georinex_array(dataset):
+    ### EPH_DTYPE rows of every GPS record of a georinex navigation dataset, for the files rinex_reader can't parse
+    ### (RINEX 2). georinex puts the records on a (time, sv) grid, the cells without an IODE aren't records
+    gps = dataset.sel(sv=[sv for sv in dataset.sv.values.tolist() if sv.startswith("G")])
+    times, svs = np.nonzero(~np.isnan(gps["IODE"].values))
+    array = np.zeros(len(times), dtype=EPH_DTYPE)
+    array["sv"] = gps.sv.values[svs]
+    array["epoch"] = (gps.time.values[times] - np.datetime64(GPS_EPOCH, "ns")) // np.timedelta64(1, "s")
+    for field, name in GEORINEX_NAMES.items():
+        array[field] = gps[name].values[times, svs]
+    return array
+
+
+def almanac_to_array(alm):
+    svs = sorted(sv for sv in alm if sv not in ALM_HEADER)
+    array = np.zeros(len(svs), dtype=ALM_DTYPE)
+    for field in ALM_HEADER:
+        array[field] = alm[field]
+    for field in ALM_INT_FIELDS + ALM_FLOAT_FIELDS:
+        array[field] = [alm[sv][field] for sv in svs]
+    return array
+
+
+def array_to_almanac(array):
+    ### The almanac readSemAlmanac returns, from ALM_DTYPE rows
+    almanac = {field: int(array[field][0]) if len(array) else 0 for field in ALM_HEADER}
+    columns = [array[field].tolist() for field in ALM_FIELDS]
+    for values in zip(*columns):
+        entry = AlmanacEntry(*values)
+        almanac["G%02d" % entry.id] = entry
+    return almanac
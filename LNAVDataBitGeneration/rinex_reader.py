@@ -0,0 +1,85 @@
+import datetime
+
+import compressed
+
+
+### Order of the broadcast orbit values in a RINEX 3.0x GPS navigation record (RINEX 3.04, Table A8),
+### named the same way as the ephemeris dicts used by Bitgenerator.gen_sf1 - gen_sf3
+GPS_NAV_FIELDS = (
+    "Af0", "Af1", "Af2",
+    "IODE", "C_rs", "Delta_n", "M0",
+    "C_uc", "e", "C_us", "sqrtA",
+    "toe", "C_ic", "Omega", "C_is",
+    "i0", "C_rc", "omega", "OmegaDot",
+    "IDOT", "L2ChannelCode", "GPSWeek", "L2PDataFlag",
+    "SVAcc", "health", "TGD", "IODC",
+    "TransTime", "FitInterval",
+)
+
+GPS_NAV_LINES = 8           ### SV/EPOCH/SV CLK line + 7 BROADCAST ORBIT lines
+FIELD_WIDTH = 19
+
+
+def rinex_float(text):
+    text = text.strip()
+    if not text:
+        return float("nan")
+    return float(text.replace("D", "E").replace("d", "e"))
+
+
+def read_header(file):
+    header = {}
+    for line in file:
+        label = line[60:].strip()
+        if label == "RINEX VERSION / TYPE":
+            header["version"] = float(line[:9])
+            header["file_type"] = line[20]
+            header["system"] = line[40]
+        elif label == "LEAP SECONDS":
+            header["leap_seconds"] = int(line[:6])
+        elif label == "END OF HEADER":
+            return header
+    raise ValueError(f"{getattr(file, 'name', file)} has no END OF HEADER line")
+
+
+def parse_gps_record(lines):
+    first = lines[0]
+    epoch = datetime.datetime(int(first[4:8]), int(first[9:11]), int(first[12:14]),
+                              int(first[15:17]), int(first[18:20]), int(first[21:23]))
+    values = [rinex_float(first[23 + FIELD_WIDTH * i: 23 + FIELD_WIDTH * (i + 1)]) for i in range(3)]
+    for line in lines[1:]:
+        values += [rinex_float(line[4 + FIELD_WIDTH * i: 4 + FIELD_WIDTH * (i + 1)]) for i in range(4)]
+
+    record = {"sv": first[:3].replace(" ", "0"), "epoch": epoch}
+    record.update(zip(GPS_NAV_FIELDS, values))
+    return record
+
+
+def iter_gps_nav(file):
+    """Yield one dict per GPS record of an open RINEX 3.0x navigation file.
+
+    Records of other constellations are skipped line by line without being converted.
+    """
+    header = read_header(file)
+    if int(header.get("version", 0)) != 3 or header.get("file_type") != "N":
+        raise ValueError(f"{getattr(file, 'name', file)} is not a RINEX 3 navigation file")
+
+    line = file.readline()
+    while line:
+        if line[0] != "G":
+            line = file.readline()
+            while line and line[0] == " ":      ### Continuation lines of a non GPS record
+                line = file.readline()
+            continue
+
+        lines = [line]
+        for _ in range(GPS_NAV_LINES - 1):
+            lines.append(file.readline())
+        yield parse_gps_record(lines)
+        line = file.readline()
+
+
+def read_gps_nav(path):
+    ### Records are parsed as the file is read, a compressed file (see compressed) is decompressed on the way
+    with compressed.open_text(path) as file:
+        return list(iter_gps_nav(file))
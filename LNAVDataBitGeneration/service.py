@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import writers
+from bit_generator import Bitgenerator, read_sem_almanac
+from ephemeris_store import EphemerisStore
+
+
+MAX_ENTRIES = 256               ### Encoded results kept by the LRU cache
+LATENCY_SAMPLES = 1000          ### Latencies kept per endpoint for the percentiles
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+CONTENT_TYPES = {
+    "bin"   :   "application/octet-stream",
+    "txt"   :   "text/plain",
+    "json"  :   "application/json",
+}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class LRUCache:
+    ### Bounded mapping that drops the least recently used entry, with hit/miss/eviction counts
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class Latency:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def report(self):
+        recent = np.array(self.recent) * 1e3
+        return {
+            "requests": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": float(np.percentile(recent, 50)) if recent.size else 0.0,
+            "p95_ms": float(np.percentile(recent, 95)) if recent.size else 0.0,
+            "max_ms": float(recent.max()) if recent.size else 0.0,
+        }
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BitstreamService:
+    """Long running local HTTP service serving navigation messages out of resident ephemerides and almanac.
+
+    The RINEX and SEM files are parsed once. Encoded results are kept in an LRU cache keyed by PRN, time and message
+    (and subframe/frame). Concurrent requests for the same key share one generation. Generation runs on a single
+    worker thread, so cache hits and /stats are answered while a miss is being encoded.
+
+        GET /data?prn=5&time=2024-03-23T02:00:00[&message=...][&format=bin|txt|json]
+            the 25 frames gen_data generates: .bin/.txt file contents (see writers) or {"words": [[[...]]]}
+        GET /subframe?prn=5&time=...&subframe=4&frame=17[&message=...]
+            {"words": [...]}, the 10 encoded words of one subframe
+        GET /stats
+            cache hits/misses/evictions and latencies per endpoint
+    """
+
+    def __init__(self, rinex_file, alm_file, max_entries=MAX_ENTRIES):
+        self.store = rinex_file if isinstance(rinex_file, EphemerisStore) else EphemerisStore.load(rinex_file)
+        self.alm = alm_file if isinstance(alm_file, dict) else read_sem_almanac(alm_file)
+
+        self.cache = LRUCache(max_entries)
+        self.pending = {}
+        self.coalesced = 0              ### Misses that waited on a generation already running for the same key
+        self.latency = collections.defaultdict(Latency)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.started = time.time()
+        self.routes = {
+            "/data"     :   self.data,
+            "/subframe" :   self.subframe,
+            "/stats"    :   self.stats,
+        }
+
+
+    def generator(self, prn, time):
+        try:
+            return Bitgenerator(self.store, self.alm, time, prn)
+        except KeyError:
+            raise RequestError(404, f"No valid ephemeris for G{prn:02d} at {time}")
+
+
+    def gen_message(self, prn, time, message):
+        bit_generator = self.generator(prn, time)
+        return bit_generator.gen_message(message), bit_generator.how_tow * 6
+
+
+    def gen_subframe(self, prn, time, subframe, frame, message):
+        return self.generator(prn, time).encoded_subframe(subframe, frame, message)
+
+
+    async def cached(self, key, fn, *args):
+        ### Result of fn(*args) from the cache, or computed on the worker thread once for every request waiting on key
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        if key in self.pending:
+            self.coalesced += 1
+        else:
+            self.pending[key] = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        future = self.pending[key]
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            if self.pending.get(key) is future and future.done():
+                del self.pending[key]
+        self.cache.put(key, value)
+        return value
+
+
+    async def data(self, query):
+        prn, time, message = parse_stream(query)
+        output = query.get("format", "bin")
+        if output not in CONTENT_TYPES:
+            raise RequestError(400, f"format must be one of {', '.join(CONTENT_TYPES)}")
+        nav_message, start_tow = await self.cached(("data", prn, time, message), self.gen_message, prn, time, message)
+
+        if output == "bin":
+            return CONTENT_TYPES[output], writers.binary_bytes(nav_message, prn, start_tow)
+        if output == "txt":
+            return CONTENT_TYPES[output], writers.text_bytes(nav_message)
+        return as_json({"prn": prn, "start_tow": start_tow, "words": nav_message.words.tolist()})
+
+
+    async def subframe(self, query):
+        prn, time, message = parse_stream(query)
+        subframe, frame = parse_int(query, "subframe", 1, 5), parse_int(query, "frame", 1, 25)
+        if not (subframe == 4 and frame == 17):
+            message = None          ### Only page 17 of subframe 4 carries the message
+        key = ("subframe", prn, time, subframe, frame, message)
+        words = await self.cached(key, self.gen_subframe, prn, time, subframe, frame, message)
+        return as_json({"prn": prn, "subframe": subframe, "frame": frame, "words": words})
+
+
+    async def stats(self, query):
+        return as_json({
+            "uptime_s": time.time() - self.started,
+            "cache": self.cache.stats(),
+            "in_flight": len(self.pending),
+            "coalesced": self.coalesced,
+            "latency": {path: latency.report() for path, latency in sorted(self.latency.items())},
+        })
+
+
+    async def handle(self, reader, writer):
+        ### One client connection, HTTP/1.1 with keep-alive
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                t0 = time.perf_counter()
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                url = urllib.parse.urlsplit(target)
+                status, content_type, body = await self.respond(method, url.path, dict(urllib.parse.parse_qsl(url.query)))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                              f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body)
+                await writer.drain()
+                self.latency[url.path if url.path in self.routes else "other"].add(time.perf_counter() - t0)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def respond(self, method, path, query):
+        if path not in self.routes:
+            return error(404, f"Unknown path {path}, use {', '.join(self.routes)}")
+        if method != "GET":
+            return error(405, "Only GET is supported")
+        try:
+            return (200,) + await self.routes[path](query)
+        except RequestError as e:
+            return error(e.status, str(e))
+        except ValueError as e:
+            return error(400, str(e))
+
+
+    async def serve(self, host="127.0.0.1", port=8620, unix=None):
+        ### Serves until cancelled, on a Unix socket when unix is given, otherwise on host:port
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle, path=unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def parse_int(query, name, low, high):
+    try:
+        value = int(query[name])
+    except (KeyError, ValueError):
+        raise RequestError(400, f"{name} is required, an integer from {low} to {high}")
+    if not low <= value <= high:
+        raise RequestError(400, f"{name} must be from {low} to {high}")
+    return value
+
+
+def parse_stream(query):
+    prn = parse_int(query, "prn", 1, 32)
+    try:
+        time = datetime.datetime.strptime(query["time"], TIME_FORMAT)
+    except (KeyError, ValueError):
+        raise RequestError(400, "time is required, YYYY-MM-DDTHH:MM:SS")
+    return prn, time, query.get("message", "No message sent")
+
+
+def as_json(value):
+    return CONTENT_TYPES["json"], json.dumps(value).encode()
+
+
+def error(status, message):
+    return (status,) + as_json({"error": message})
+
+
+async def get(path, host="127.0.0.1", port=8620, unix=None):
+    ### Minimal client: -> (status, body) of one GET request on its own connection
+    if unix is not None:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, await reader.readexactly(length)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve navigation messages over HTTP from a long running process that keeps the RINEX/SEM data parsed and caches the results")
+    parser.add_argument("-r", "--rinex_path", help="Path of the RINEX file", type=str, required=True)
+    parser.add_argument("-a", "--almanac", help="Path of the SEM Almanac file", type=str, required=True)
+    parser.add_argument("--host", help="Address to listen on (default=127.0.0.1)", type=str, default="127.0.0.1")
+    parser.add_argument("--port", help="Port to listen on (default=8620)", type=int, default=8620)
+    parser.add_argument("--unix", help="Listen on this Unix socket instead of host:port (optional)", type=str, default=None)
+    parser.add_argument("--max-entries", help=f"Encoded results kept in the LRU cache (default={MAX_ENTRIES})", type=int, default=MAX_ENTRIES)
+    args = parser.parse_args()
+
+    service = BitstreamService(args.rinex_path, args.almanac, args.max_entries)
+    print(f"Serving on {args.unix or f'http://{args.host}:{args.port}'}", flush=True)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
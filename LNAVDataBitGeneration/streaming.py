@@ -0,0 +1,57 @@
+import datetime
+import math
+import warnings
+
+from bit_generator import Bitgenerator
+from ephemeris_store import EphemerisStore
+from gps_time import GPS_EPOCH, SECS_PER_WEEK, gps_seconds
+
+
+SUBFRAME_SECONDS = 6
+
+
+def iter_subframes(rinex_file, alm_file, prn, start, end=None, message="No message sent"):
+    """Yield (time, subframe, page, words) for every subframe transmitted by prn from start until end.
+
+    Subframes start on the 6 s GPS time grid at or after start, words are the 10 encoded 30-bit words. The subframe
+    4/5 page follows the TOW (page 1 at the start of every week), the HOW carries the TOW count of the next subframe
+    and rolls over at the end of the week, and subframe 1 carries the week being transmitted. The ephemeris is
+    looked up again at every frame boundary and switched when its IODE/Toe changes, through gaps in the file the last
+    one is kept. With end=None the stream never stops. Only the current subframe and the encoded words of the
+    current ephemeris and almanac pages are kept, so memory doesn't grow with the span.
+    """
+    store = rinex_file if isinstance(rinex_file, EphemerisStore) else EphemerisStore.load(rinex_file)
+    bit_generator = Bitgenerator(store, alm_file, start, prn)
+    sv = bit_generator.sv
+
+    seconds = math.ceil(gps_seconds(start) / SUBFRAME_SECONDS) * SUBFRAME_SECONDS
+    end_seconds = None if end is None else gps_seconds(end)
+    eph_key = None
+    stale = False
+
+    while end_seconds is None or seconds < end_seconds:
+        week, tow = divmod(seconds, SECS_PER_WEEK)
+        subframe = int(tow // SUBFRAME_SECONDS) % 5 + 1
+        page = int(tow // (5 * SUBFRAME_SECONDS)) % 25 + 1
+        time = GPS_EPOCH + datetime.timedelta(seconds=seconds)
+
+        if subframe == 1 or eph_key is None:
+            sv_eph = store.broadcast(sv, time)
+            if sv_eph is None:
+                ### Gap in the file, the SV keeps broadcasting its last ephemeris past its fit interval
+                if not stale:
+                    warnings.warn(f"No valid ephemeris for {sv} at {time}, the previous one is kept")
+                    stale = True
+                sv_eph = bit_generator.sv_eph
+            else:
+                stale = False
+            sv_eph = sv_eph.replace(GPSWeek=week)
+            key = (sv_eph.IODE, sv_eph.toe, week)
+            if key != eph_key:
+                bit_generator.sv_eph = sv_eph
+                bit_generator.eph_cache.clear()
+                eph_key = key
+
+        how_tow = int((tow + SUBFRAME_SECONDS) % SECS_PER_WEEK) // SUBFRAME_SECONDS
+        yield time, subframe, page, bit_generator.encoded_subframe(subframe, page, message, how_tow=how_tow)
+        seconds += SUBFRAME_SECONDS
@@ -0,0 +1,264 @@
+import argparse
+import collections
+import datetime
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import input_cache
+import writers
+from almanac_archive import AlmanacArchive
+from constellation import ConstellationGenerator
+from ephemeris_store import EphemerisStore
+from gps_time import GPS_EPOCH, gps_seconds
+
+
+NAV_FILE = re.compile(r"(\.rnx|\.\d\d[nN])(\.gz|\.Z|\.bz2)?$")      ### RINEX 3 (..._GN.rnx) and RINEX 2 (brdc0830.24n) GPS navigation files, compressed or not
+DEFAULT_STEP = 7200             ### s, one epoch per ephemeris upload interval
+MAX_STORES = 4                  ### Parsed navigation files each worker keeps
+JOURNAL = "sweep.jsonl"
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def nav_files(paths):
+    ### Navigation files of the given files and directories (searched recursively), sorted
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in sorted(os.walk(path)):
+                files += [os.path.join(directory, name) for name in sorted(names) if NAV_FILE.search(name)]
+        else:
+            files.append(path)
+    return files
+
+
+def load_manifest(fname, defaults):
+    """Jobs of a JSON manifest: a list of {"rinex": file or directory, ...} where "almanac", "start", "end", "step",
+    "prns" and "message" override defaults. Relative paths are relative to the manifest.
+    """
+    with open(fname) as file:
+        entries = json.load(file)
+    base = os.path.dirname(os.path.abspath(fname))
+    specs = []
+    for entry in entries:
+        entry = dict(defaults, **entry)
+        if entry.get("almanac"):
+            entry["almanac"] = os.path.join(base, entry["almanac"])
+        for rinex_file in nav_files([os.path.join(base, entry["rinex"])]):
+            specs.append(dict(entry, rinex=rinex_file))
+    return specs
+
+
+class Journal:
+    """Append only JSON lines record of finished tasks, the checkpoint a sweep resumes from.
+
+    Every line is flushed and fsynced before the next task is recorded, a line cut short by an interruption is
+    ignored when the journal is read back.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.file = None
+
+
+    def completed(self):
+        ### Keys of the tasks that finished without an error
+        done = set()
+        if not os.path.exists(self.fname):
+            return done
+        with open(self.fname) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "error" not in entry:
+                    done.add(entry["key"])
+        return done
+
+
+    def record(self, entry):
+        if self.file is None:
+            self.file = open(self.fname, "a")
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def job_name(spec):
+    ### The file name and a hash of everything but the epoch that changes the output of a job, so two jobs on the same
+    ### file with other PRNs or messages, or on two files of the same name, never share outputs or journal keys
+    job = [os.path.abspath(spec["rinex"]), os.path.abspath(spec["almanac"]), sorted(spec.get("prns") or []), spec["message"]]
+    digest = hashlib.sha1(json.dumps(job).encode()).hexdigest()[:8]
+    return f"{os.path.basename(spec['rinex'])}-{digest}"
+
+
+def task_key(spec, epoch):
+    return f"{job_name(spec)}/{epoch.replace(':', '').replace('-', '')}"
+
+
+### Process pool side
+worker_state = {"stores": collections.OrderedDict(), "almanacs": {}}
+
+
+def init_worker(cache_dir):
+    warnings.simplefilter("ignore")
+    if cache_dir:
+        input_cache.enable(cache_dir)
+
+
+def load_store(path):
+    ### Parsed navigation file, kept for the next tasks of this worker. With the input cache, a file parsed by any
+    ### worker is only memory mapped by the others
+    stores = worker_state["stores"]
+    if path in stores:
+        stores.move_to_end(path)
+        return stores[path]
+    stores[path] = EphemerisStore.load(path)
+    while len(stores) > MAX_STORES:
+        stores.popitem(last=False)
+    return stores[path]
+
+
+def load_almanac(path, time):
+    ### SEM file, or the almanac closest to time out of a directory of SEM/YUMA files or an .npz archive
+    if path not in worker_state["almanacs"]:
+        if os.path.isdir(path) or path.endswith(".npz"):
+            worker_state["almanacs"][path] = AlmanacArchive.open(path, reference_time=time)
+        else:
+            worker_state["almanacs"][path] = path
+    almanac = worker_state["almanacs"][path]
+    return almanac.at(time) if isinstance(almanac, AlmanacArchive) else almanac
+
+
+def plan_file(spec):
+    ### Parses the file (filling the input cache for the other workers) -> epochs to generate, as TIME_FORMAT strings
+    store = load_store(spec["rinex"])
+    step = spec["step"]
+    if spec.get("start"):
+        first = gps_seconds(datetime.datetime.strptime(spec["start"], TIME_FORMAT))
+        last = gps_seconds(datetime.datetime.strptime(spec["end"], TIME_FORMAT)) if spec.get("end") else first
+    else:
+        ### The span of the file's Tocs, on the step grid
+        tocs = [toc for sv_toc in store.toc.values() for toc in (sv_toc[0], sv_toc[-1])]
+        if not tocs:
+            return []
+        first, last = math.ceil(min(tocs) / step) * step, max(tocs)
+    return [(GPS_EPOCH + datetime.timedelta(seconds=seconds)).strftime(TIME_FORMAT)
+            for seconds in range(int(first), int(last) + 1, int(step))]
+
+
+def run_epoch(spec, epoch, fname):
+    ### Streams of every requested PRN with an ephemeris at epoch -> one .npy (see writers.MmapStreamFile), written
+    ### under a temporary name and renamed so an interrupted task never leaves a partial output
+    t0 = time.perf_counter()
+    epoch_time = datetime.datetime.strptime(epoch, TIME_FORMAT)
+    constellation = ConstellationGenerator(load_store(spec["rinex"]), load_almanac(spec["almanac"], epoch_time), epoch_time)
+    prns = [prn for prn in constellation.prns if not spec.get("prns") or prn in spec["prns"]]
+    if prns:
+        messages = constellation.gen_messages(spec["message"], prns=prns)
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        tmp = f"{fname}.{os.getpid()}.partial"
+        writers.write_npy(tmp, {prn: (messages[prn], constellation.generator(prn).how_tow * 6) for prn in prns})
+        os.replace(tmp, fname)
+    return {"prns": prns, "seconds": time.perf_counter() - t0}
+
+
+def sweep(specs, out_dir, processes=None, cache_dir=None, log=None):
+    """Generate every (navigation file, epoch) of specs over a process pool, resuming from the journal in out_dir.
+
+    Every file is first planned (parsed once, epochs listed) by a pool task, its epochs are queued as soon as that
+    finishes. Idle workers take the next task from the shared queue, so a slow file or epoch never holds up the
+    others. Each epoch task writes out_dir/<job_name>/<epoch>.npy with one row per PRN and is recorded in the journal
+    when it's done, tasks already in it are skipped. Returns a summary dict.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for fname in glob.glob(os.path.join(glob.escape(out_dir), "*", "*.partial")):      ### Left by an interrupted run
+        os.remove(fname)
+    journal = Journal(os.path.join(out_dir, JOURNAL))
+    done = journal.completed()
+    summary = {"files": len(specs), "tasks": 0, "skipped": 0, "done": 0, "failed": 0, "streams": 0}
+    t0 = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=init_worker, initargs=(cache_dir,))
+    try:
+        futures = {pool.submit(plan_file, spec): (spec, None) for spec in specs}
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                spec, epoch = futures.pop(future)
+                if epoch is None:
+                    try:
+                        epochs = future.result()
+                    except Exception as e:
+                        journal.record({"key": job_name(spec), "rinex": spec["rinex"], "error": repr(e)})
+                        summary["failed"] += 1
+                        continue
+                    for epoch in epochs:
+                        key = task_key(spec, epoch)
+                        summary["tasks"] += 1
+                        if key in done:
+                            summary["skipped"] += 1
+                            continue
+                        fname = os.path.join(out_dir, key + ".npy")
+                        futures[pool.submit(run_epoch, spec, epoch, fname)] = (spec, epoch)
+                    continue
+
+                entry = {"key": task_key(spec, epoch), "rinex": spec["rinex"], "epoch": epoch}
+                try:
+                    entry.update(future.result())
+                    summary["done"] += 1
+                    summary["streams"] += len(entry["prns"])
+                except Exception as e:
+                    entry["error"] = repr(e)
+                    summary["failed"] += 1
+                journal.record(entry)
+                if log:
+                    log(entry)
+    finally:
+        journal.close()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the navigation messages of many RINEX files, epochs and PRNs over a process pool, resumable after an interruption")
+    parser.add_argument("paths", help="RINEX navigation files or directories of them", nargs="*")
+    parser.add_argument("-a", "--almanac", help="SEM Almanac file, or a directory of SEM/YUMA almanacs or an .npz almanac archive to pick the almanac closest to each epoch from", type=str)
+    parser.add_argument("-o", "--out", help="Output directory, also holds the journal a sweep resumes from", type=str, required=True)
+    parser.add_argument("--manifest", help="JSON list of jobs ({\"rinex\": ..., \"almanac\", \"start\", \"end\", \"step\", \"prns\", \"message\"}), instead of paths (optional)", type=str, default=None)
+    parser.add_argument("--start", help="First epoch YYYY-MM-DDTHH:MM:SS (default: the first Toc of each file)", type=str, default=None)
+    parser.add_argument("--end", help="Last epoch YYYY-MM-DDTHH:MM:SS (default: --start, or the last Toc of each file)", type=str, default=None)
+    parser.add_argument("--step", help=f"Seconds between epochs (default={DEFAULT_STEP})", type=int, default=DEFAULT_STEP)
+    parser.add_argument("-p", "--prns", help="Only these PRNs (default: every PRN with a valid ephemeris)", type=int, nargs="+", default=None)
+    parser.add_argument("-m", "--message", help="Subframe 4 page 17 message (optional)", type=str, default="No Message")
+    parser.add_argument("--processes", help="Worker processes (default: one per core)", type=int, default=None)
+    parser.add_argument("--cache", help=f"Input cache directory shared by the workers, so each file is parsed once (default=<out>/cache)", type=str, default=None)
+    parser.add_argument("-v", "--verbose", help="Print every finished task", action="store_true")
+    args = parser.parse_args()
+
+    defaults = {"almanac": args.almanac, "start": args.start, "end": args.end, "step": args.step, "prns": args.prns, "message": args.message}
+    specs = load_manifest(args.manifest, defaults) if args.manifest else [dict(defaults, rinex=path) for path in nav_files(args.paths)]
+    if any(not spec["almanac"] for spec in specs):
+        parser.error("an almanac is needed, with -a or in the manifest")
+
+    log = (lambda entry: print(json.dumps(entry), flush=True)) if args.verbose else None
+    try:
+        summary = sweep(specs, args.out, processes=args.processes, cache_dir=args.cache or os.path.join(args.out, "cache"), log=log)
+    except KeyboardInterrupt:
+        print(f"Interrupted, run the same command again to resume from {os.path.join(args.out, JOURNAL)}")
+    else:
+        print(json.dumps(summary, indent=2))
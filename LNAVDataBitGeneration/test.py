@@ -1,5 +1,6 @@
 import datetime
 from bit_generator import Bitgenerator
+from writers import write_text
 
 
 
@@ -11,16 +12,6 @@ message = "mohanad is awesome"
 
 bit_generator = Bitgenerator(rinex_file, alm_file, time, prn)
 
-navigation_message = bit_generator.gen_data(message=message)
+navigation_message = bit_generator.gen_data(message=message, packed=True)
 
-
-with open("Navigation Message Bitstream.txt", "w", newline="") as file:
-    for frame in range(1, 26):
-        for sf in range(1,6):
-            file.write(f"F-{frame} SF-{sf} \n")
-            for w in range(1, 11):
-                ws = (frame - 1) * 1500 + (sf - 1) * 300 + (w-1) * 30
-                we = ws + 30
-                word = [str(a) for a in navigation_message[ws:we]]
-                file.write("".join(word) + '\n')
-            file.write("\n")
\ No newline at end of file
+write_text("Navigation Message Bitstream.txt", navigation_message)
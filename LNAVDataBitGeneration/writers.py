@@ -0,0 +1,209 @@
+import struct
+
+import numpy as np
+from nav_message import BITS_PER_WORD, SUBFRAMES_PER_FRAME, WORDS_PER_SUBFRAME, NavMessage, words_to_bits
+from profiling import PROFILER
+
+
+### .bin: HEADER then the words' bits packed 8 per byte (np.packbits), in transmission order
+BIN_MAGIC = b"LNAV"
+BIN_VERSION = 1
+HEADER = struct.Struct("<4sHBxII")          ### magic, version, PRN, start TOW (s), word count
+
+### .npy (multi PRN, memory mapped): one uint32 row per PRN, [PRN, start TOW, words...]
+NPY_META_COLUMNS = 2
+
+### .txt: a "F-{frame} SF-{subframe} " header line per subframe, a line per word and a blank line after every subframe
+TEXT_HEADER = len("F- SF-1 \n")                     ### Without the digits of the frame number
+TEXT_LINE = BITS_PER_WORD + 1
+TEXT_SUBFRAME = WORDS_PER_SUBFRAME * TEXT_LINE + 1
+
+
+def write_text(fname, nav_message):
+    ### The annotated text format main.py has always written, one line of 30 bits per word
+    with PROFILER.stage("write"):
+        data = text_bytes(nav_message)
+        with open(fname, "wb") as file:
+            file.write(data)
+    PROFILER.count("bytes_written", len(data))
+
+
+def text_bytes(nav_message):
+    words = nav_message.words
+    num_frames = words.shape[0]
+    chars = nav_message.bits().reshape(num_frames, SUBFRAMES_PER_FRAME, -1, BITS_PER_WORD) + ord("0")
+    lines = np.concatenate([chars, np.full(chars.shape[:-1] + (1,), ord("\n"), dtype=np.uint8)], axis=-1)
+    bodies = np.concatenate([lines.reshape(num_frames, SUBFRAMES_PER_FRAME, -1),
+                             np.full((num_frames, SUBFRAMES_PER_FRAME, 1), ord("\n"), dtype=np.uint8)], axis=-1)
+
+    parts = []
+    for frame in range(num_frames):
+        for sf in range(SUBFRAMES_PER_FRAME):
+            parts.append(f"F-{frame + 1} SF-{sf + 1} \n".encode())
+            parts.append(bodies[frame, sf].tobytes())
+    return b"".join(parts)
+
+
+def digits_through(n):
+    ### Number of digits written for the frame numbers 1 - n
+    total, start, digits = 0, 1, 1
+    while start <= n:
+        total += (min(n, 10 * start - 1) - start + 1) * digits
+        start *= 10
+        digits += 1
+    return total
+
+
+def text_offset(index):
+    ### Byte offset of the line of word index (counted from 0 over the whole stream) in a file written by write_text
+    subframe, word = divmod(index, WORDS_PER_SUBFRAME)
+    frame, sf = divmod(subframe, SUBFRAMES_PER_FRAME)
+    headers = SUBFRAMES_PER_FRAME * (digits_through(frame) + TEXT_HEADER * frame) + (sf + 1) * (len(str(frame + 1)) + TEXT_HEADER)
+    return headers + subframe * TEXT_SUBFRAME + word * TEXT_LINE
+
+
+def patch_text(fname, nav_message, indexes):
+    ### Rewrites the lines of the given words (flat indexes) of a file written by write_text from nav_message
+    words = nav_message.words.reshape(-1)
+    lines = words_to_bits(words[indexes]).reshape(-1, BITS_PER_WORD) + ord("0")
+    with PROFILER.stage("write"), open(fname, "r+b") as file:
+        for index, line in zip(indexes, lines):
+            file.seek(text_offset(index))
+            file.write(line.tobytes())
+    PROFILER.count("bytes_written", lines.size)
+
+
+def read_text(fname):
+    with open(fname, "r") as file:
+        words = [int(line, 2) for line in file if len(line.strip()) == BITS_PER_WORD and not line.startswith("F-")]
+    return NavMessage(words)
+
+
+def write_binary(fname, nav_message, prn=0, start_tow=0):
+    with PROFILER.stage("write"), open(fname, "wb") as file:
+        data = binary_bytes(nav_message, prn, start_tow)
+        file.write(data)
+    PROFILER.count("bytes_written", len(data))
+
+
+def binary_bytes(nav_message, prn=0, start_tow=0):
+    return HEADER.pack(BIN_MAGIC, BIN_VERSION, prn, int(start_tow), nav_message.words.size) + nav_message.packed().tobytes()
+
+
+def read_binary(fname):
+    ### -> (prn, start TOW, NavMessage)
+    with open(fname, "rb") as file:
+        magic, version, prn, start_tow, num_words = HEADER.unpack(file.read(HEADER.size))
+        if magic != BIN_MAGIC or version != BIN_VERSION:
+            raise ValueError(f"{fname} isn't a version {BIN_VERSION} LNAV bitstream file")
+        packed = np.frombuffer(file.read(), dtype=np.uint8)
+    return prn, start_tow, NavMessage.from_packed(packed, num_bits=num_words * BITS_PER_WORD)
+
+
+def word_runs(indexes):
+    ### [first, last) ranges of consecutive word indexes
+    indexes = np.unique(indexes)
+    breaks = np.flatnonzero(np.diff(indexes) != 1) + 1
+    return [(int(run[0]), int(run[-1]) + 1) for run in np.split(indexes, breaks) if run.size]
+
+
+def patch_binary(fname, nav_message, indexes):
+    ### Rewrites only the bytes holding the given words of a file written by write_binary from nav_message. Bytes
+    ### shared with a neighbouring word are rewritten with that word's bits from nav_message as well
+    words = nav_message.words.reshape(-1)
+    written = 0
+    with PROFILER.stage("write"), open(fname, "r+b") as file:
+        for first, last in word_runs(indexes):
+            start, end = first * BITS_PER_WORD // 8, -(-last * BITS_PER_WORD // 8)
+            first_word = start * 8 // BITS_PER_WORD
+            last_word = min(-(-end * 8 // BITS_PER_WORD), words.size)
+            bits = words_to_bits(words[first_word:last_word])[start * 8 - first_word * BITS_PER_WORD:][:(end - start) * 8]
+            data = np.packbits(bits)            ### Pads the last byte of the stream with 0s like write_binary
+            file.seek(HEADER.size + start)
+            file.write(data.tobytes())
+            written += data.nbytes
+    PROFILER.count("bytes_written", written)
+
+
+class MmapStreamFile:
+    """Pre-sized .npy file holding the streams of many PRNs, one row each.
+
+    create() sizes the whole file up front, after that every process can open() it and fill its own rows
+    through the memory map without any locking.
+    """
+
+    def __init__(self, array):
+        self.array = array
+
+
+    @classmethod
+    def create(cls, fname, num_rows, num_words):
+        return cls(np.lib.format.open_memmap(fname, mode="w+", dtype=np.uint32, shape=(num_rows, NPY_META_COLUMNS + num_words)))
+
+
+    @classmethod
+    def open(cls, fname, mode="r+"):
+        return cls(np.load(fname, mmap_mode=mode))
+
+
+    @property
+    def num_rows(self):
+        return self.array.shape[0]
+
+
+    def write(self, row, nav_message, prn, start_tow=0):
+        self.array[row, 0] = prn
+        self.array[row, 1] = int(start_tow)
+        self.array[row, NPY_META_COLUMNS:] = nav_message.words.ravel()
+        PROFILER.count("bytes_written", self.array[row].nbytes)
+
+
+    def patch(self, row, nav_message, indexes):
+        ### Copies only the given words (flat indexes) of nav_message into row
+        self.array[row, NPY_META_COLUMNS + np.asarray(indexes)] = nav_message.words.reshape(-1)[indexes]
+        PROFILER.count("bytes_written", len(indexes) * self.array.itemsize)
+
+
+    def read(self, row):
+        ### -> (prn, start TOW, NavMessage), the NavMessage is a view of the file
+        return int(self.array[row, 0]), int(self.array[row, 1]), NavMessage(self.array[row, NPY_META_COLUMNS:])
+
+
+    def prns(self):
+        return self.array[:, 0].tolist()
+
+
+    def flush(self):
+        self.array.flush()
+
+
+def write_npy(fname, nav_messages):
+    ### nav_messages: {prn: (NavMessage, start TOW)}
+    with PROFILER.stage("write"):
+        num_words = max(nav_message.words.size for nav_message, _ in nav_messages.values())
+        stream_file = MmapStreamFile.create(fname, len(nav_messages), num_words)
+        for row, (prn, (nav_message, start_tow)) in enumerate(nav_messages.items()):
+            stream_file.write(row, nav_message, prn, start_tow)
+        stream_file.flush()
+
+
+def patch_npy(fname, nav_message, indexes, prn):
+    with PROFILER.stage("write"):
+        stream_file = MmapStreamFile.open(fname)
+        stream_file.patch(stream_file.prns().index(prn), nav_message, indexes)
+        stream_file.flush()
+
+
+### Single PRN writers by file extension, as used by main.py
+WRITERS = {
+    "txt": lambda fname, nav_message, prn, start_tow: write_text(fname, nav_message),
+    "bin": write_binary,
+    "npy": lambda fname, nav_message, prn, start_tow: write_npy(fname, {prn: (nav_message, start_tow)}),
+}
+
+### In place updates of the words at the given flat indexes of a file written above, by file extension
+PATCHERS = {
+    "txt": lambda fname, nav_message, indexes, prn: patch_text(fname, nav_message, indexes),
+    "bin": lambda fname, nav_message, indexes, prn: patch_binary(fname, nav_message, indexes),
+    "npy": patch_npy,
+}